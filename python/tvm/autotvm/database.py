@@ -19,9 +19,21 @@
 Database of MeasureInput/MeasureResult pair.
 This can be used for replaying measurement.
 """
+import contextlib
+import json
 import os
+import struct
+import tempfile
 
-from .record import encode, decode, measure_str_key
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .. import target as _target
+from .task import ConfigEntity, Task
+from .measure import MeasureInput, MeasureResult
+from .record import encode, decode, measure_str_key, clean_json_to_python, load_from_file
 
 
 class Database(object):
@@ -194,3 +206,395 @@ class DummyDatabase(RedisDatabase):
 
     def flush(self):
         self.db = {}
+
+
+class RecordStore(object):
+    """
+    Indexed, append-only binary store of tuning records.
+
+    Unlike the line based json log, a record store keeps a persistent index of
+    the best record for every (target key, workload) and (target model, workload) pair,
+    so a single best config can be fetched without decoding the whole history.
+
+    A store is a directory with three files:
+
+    * ``records.bin``: append-only sequence of binary frames, one per record.
+      Each frame contains fixed-width numeric columns followed by the config in json.
+    * ``tables.json``: append-only string tables for targets and workloads.
+      Records refer to them by integer id, so repeated strings are stored only once.
+    * ``best.idx``: the persistent best-config index. It records the length of
+      ``records.bin`` it covers, so frames appended afterwards (e.g. by a process
+      that was killed before :any:`flush`) are indexed incrementally on open.
+
+    Several processes can append to one store. Every append takes an exclusive
+    lock on ``store.lock``, and new table entries get the id of the row as it
+    lands in ``tables.json``.
+
+    The store can be used as a tuning callback via :any:`autotvm.callback.log_to_database`
+    and can be passed to :any:`autotvm.apply_history_best` directly.
+
+    Parameters
+    ----------
+    path: str
+        The directory of the store. It is created if it does not exist.
+    readonly: bool, optional
+        Open the store for reading only. The files are never modified,
+        and frames appended by a concurrent writer can be picked up with :any:`refresh`.
+    """
+    MAGIC = b"TVMRS001"
+    # payload_len, target_id, workload_id, error_no, mean_cost, all_cost, timestamp, n_costs
+    _HEADER = struct.Struct("<IIIBdddH")
+    _COST = struct.Struct("<d")
+
+    def __init__(self, path, readonly=False):
+        if not os.path.isdir(path):
+            if readonly:
+                raise RuntimeError("Record store does not exist: " + path)
+            os.makedirs(path)
+        self.path = path
+        self.readonly = readonly
+        self._targets = []
+        self._target_ids = {}
+        self._target_objs = {}
+        self._workloads = []
+        self._workload_ids = {}
+
+        self.best_by_targetkey = {}
+        self.best_by_model = {}
+        self._indexed_end = len(self.MAGIC)
+
+        self._load_tables()
+        data_file = os.path.join(path, "records.bin")
+        if readonly:
+            if not os.path.isfile(data_file):
+                raise RuntimeError("Invalid record store: " + path)
+            self._fdata = open(data_file, "rb")
+            self._ftables = None
+            self._flock = None
+        else:
+            self._fdata = open(data_file, "a+b")
+            self._ftables = open(os.path.join(path, "tables.json"), "a")
+            self._flock = open(os.path.join(path, "store.lock"), "a")
+        self._fdata.seek(0, os.SEEK_END)
+        if self._fdata.tell() == 0 and not readonly:
+            self._fdata.write(self.MAGIC)
+            self._fdata.flush()
+        else:
+            self._fdata.seek(0)
+            if self._fdata.read(len(self.MAGIC)) != self.MAGIC:
+                raise RuntimeError("Invalid record store: " + path)
+        self._load_index()
+        self._index_tail()
+
+    @staticmethod
+    def _workload_key(workload):
+        return json.dumps(workload)
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        """Exclusive lock against the other writers of the store"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._flock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._flock, fcntl.LOCK_UN)
+
+    def _repair_tables(self):
+        """Drop a row left partially written by a killed writer. Called under the lock."""
+        filename = os.path.join(self.path, "tables.json")
+        self._ftables.flush()
+        with open(filename, "rb") as fin:
+            fin.seek(0, os.SEEK_END)
+            if fin.tell() == 0:
+                return
+            fin.seek(-1, os.SEEK_END)
+            if fin.read(1) == b"\n":
+                return
+            fin.seek(0)
+            data = fin.read()
+        os.truncate(filename, data.rfind(b"\n") + 1)
+
+    def _load_tables(self):
+        """(Re)load the string tables. Rows already loaded are skipped,
+        so this also picks up entries appended by another writer."""
+        filename = os.path.join(self.path, "tables.json")
+        if not os.path.isfile(filename):
+            return
+        n_loaded = len(self._targets) + len(self._workloads)
+        with open(filename) as fin:
+            rows = [row for row in fin if row.strip()]
+        for row in rows[n_loaded:]:
+            if not row.endswith("\n"):
+                # partially written by a concurrent writer
+                break
+            kind, value = json.loads(row)
+            if kind == "t":
+                self._target_ids[value] = len(self._targets)
+                self._targets.append(value)
+            else:
+                entry = clean_json_to_python(value)
+                self._workload_ids[self._workload_key(entry[3])] = len(self._workloads)
+                self._workloads.append(entry)
+
+    def _intern_target(self, target):
+        """Get the id of a target, adding it to the tables. Called under the lock."""
+        tgt_str = str(target)
+        if tgt_str not in self._target_ids:
+            # the row may have been added by another writer meanwhile
+            self._load_tables()
+        if tgt_str not in self._target_ids:
+            self._ftables.write(json.dumps(["t", tgt_str]) + "\n")
+            self._ftables.flush()
+            self._load_tables()
+        return self._target_ids[tgt_str]
+
+    def _intern_task(self, tsk):
+        """Get the id of the workload of a task, adding it to the tables.
+        Called under the lock."""
+        key = self._workload_key(tsk.workload)
+        if key not in self._workload_ids:
+            self._load_tables()
+        if key not in self._workload_ids:
+            entry = (tsk.name, tsk.args, tsk.kwargs, tsk.workload)
+            self._ftables.write(json.dumps(["w", entry]) + "\n")
+            self._ftables.flush()
+            self._load_tables()
+        return self._workload_ids[key]
+
+    def _get_target(self, target_id):
+        if target_id not in self._target_objs:
+            self._target_objs[target_id] = _target.create(self._targets[target_id])
+        return self._target_objs[target_id]
+
+    def _load_index(self):
+        filename = os.path.join(self.path, "best.idx")
+        if not os.path.isfile(filename):
+            return
+        with open(filename) as fin:
+            index = json.load(fin)
+        self._fdata.seek(0, os.SEEK_END)
+        if index["end"] > self._fdata.tell():
+            # index is newer than the data file, rebuild it from scratch
+            return
+        n_workloads = len(self._workloads)
+        if any(entry[1] >= n_workloads
+               for entry in index["by_targetkey"] + index["by_model"]):
+            # index is newer than the string tables, rebuild it from scratch
+            return
+        for k, wkl_id, offset, cost in index["by_targetkey"]:
+            self.best_by_targetkey[(k, wkl_id)] = (offset, cost)
+        for model, wkl_id, offset, cost in index["by_model"]:
+            self.best_by_model[(model, wkl_id)] = (offset, cost)
+        self._indexed_end = index["end"]
+
+    def _update_index(self, target, workload_id, offset, cost):
+        for k in target.keys:
+            key = (k, workload_id)
+            if key not in self.best_by_targetkey or self.best_by_targetkey[key][1] > cost:
+                self.best_by_targetkey[key] = (offset, cost)
+        if target.model != 'unknown':
+            key = (target.model, workload_id)
+            if key not in self.best_by_model or self.best_by_model[key][1] > cost:
+                self.best_by_model[key] = (offset, cost)
+
+    def _index_tail(self):
+        """Index frames appended after the persistent index was written.
+        Only the fixed-width headers are read.
+
+        Indexing stops at the first frame that refers to a table entry which is
+        not on disk yet, and is resumed by the next :any:`refresh`; such frames are
+        never discarded. Only a writer truncates, and only a torn final frame."""
+        fdata = self._fdata
+        fdata.seek(0, os.SEEK_END)
+        end = fdata.tell()
+        offset = self._indexed_end
+        torn = False
+        while offset + self._HEADER.size <= end:
+            fdata.seek(offset)
+            header = self._HEADER.unpack(fdata.read(self._HEADER.size))
+            payload_len, target_id, workload_id, error_no, mean_cost = header[:5]
+            frame_end = offset + self._HEADER.size + payload_len
+            if frame_end > end:
+                torn = True
+                break
+            if target_id >= len(self._targets) or workload_id >= len(self._workloads):
+                self._load_tables()
+                if target_id >= len(self._targets) or workload_id >= len(self._workloads):
+                    break
+            if error_no == 0:
+                self._update_index(self._get_target(target_id), workload_id, offset, mean_cost)
+            offset = frame_end
+        if offset + self._HEADER.size > end and offset != end:
+            torn = True
+        if torn and not self.readonly:
+            with self._write_lock():
+                # a frame that grew meanwhile was being appended by another writer
+                fdata.seek(0, os.SEEK_END)
+                if fdata.tell() == end:
+                    fdata.truncate(offset)
+        self._indexed_end = offset
+
+    def refresh(self):
+        """Index the frames appended to the store since it was opened"""
+        self._index_tail()
+
+    def save(self, inp, res, extend=True):
+        """Append a record to the store
+
+        Parameters
+        ----------
+        inp: MeasureInput
+            The measure input
+        res: MeasureResult
+            The measure result
+        extend: bool, optional
+            Unused. Records are always appended.
+        """
+        # pylint: disable=unused-argument
+        if self.readonly:
+            raise RuntimeError("Cannot save to a read-only record store: " + self.path)
+        costs = tuple(res.costs) if res.error_no == 0 else (1e9,)
+        mean_cost = sum(costs) / len(costs)
+        config = json.dumps(inp.config.to_json_dict()).encode()
+        payload = b"".join([self._COST.pack(x) for x in costs]) + config
+
+        with self._write_lock():
+            self._repair_tables()
+            # string tables reach the disk before the frames that refer to them
+            target_id = self._intern_target(inp.target)
+            workload_id = self._intern_task(inp.task)
+            header = self._HEADER.pack(len(payload), target_id, workload_id, res.error_no,
+                                       mean_cost, res.all_cost, res.timestamp, len(costs))
+            self._fdata.seek(0, os.SEEK_END)
+            offset = self._fdata.tell()
+            self._fdata.write(header + payload)
+            self._fdata.flush()
+        if offset == self._indexed_end:
+            self._indexed_end = offset + len(header) + len(payload)
+        if res.error_no == 0:
+            self._update_index(inp.target, workload_id, offset, mean_cost)
+
+    def read(self, offset):
+        """Decode the record at a frame offset
+
+        Parameters
+        ----------
+        offset: int
+            The offset of the frame in the data file
+
+        Returns
+        -------
+        input: autotvm.tuner.MeasureInput
+        result: autotvm.tuner.MeasureResult
+        """
+        self._fdata.seek(offset)
+        header = self._HEADER.unpack(self._fdata.read(self._HEADER.size))
+        payload_len, target_id, workload_id, error_no, _, all_cost, timestamp, n_costs = header
+        payload = self._fdata.read(payload_len)
+        cost_len = n_costs * self._COST.size
+        costs = tuple(self._COST.unpack_from(payload, i * self._COST.size)[0]
+                      for i in range(n_costs))
+        config = ConfigEntity.from_json_dict(json.loads(payload[cost_len:].decode()))
+
+        task_name, task_args, _, workload = self._workloads[workload_id]
+        tsk = Task(task_name, task_args)
+        tsk.workload = workload
+        inp = MeasureInput(self._get_target(target_id), tsk, config)
+        return inp, MeasureResult(costs, error_no, all_cost, timestamp)
+
+    def __iter__(self):
+        """Iterate over all records in the order they were appended"""
+        offset = len(self.MAGIC)
+        while offset < self._indexed_end:
+            self._fdata.seek(offset)
+            payload_len = self._HEADER.unpack(self._fdata.read(self._HEADER.size))[0]
+            yield self.read(offset)
+            offset += self._HEADER.size + payload_len
+
+    def query_best(self, target, workload):
+        """Get the best record for a target and a workload.
+        Matching by target model takes precedence over matching by target keys,
+        which is the same rule used by :any:`ApplyHistoryBest`.
+
+        Parameters
+        ----------
+        target: Target
+            The target
+        workload: Workload
+            The workload
+
+        Returns
+        -------
+        record: Tuple of (MeasureInput, MeasureResult) or None
+            The best record, None if there is no valid record for this workload.
+        """
+        workload_id = self._workload_ids.get(self._workload_key(workload))
+        if workload_id is None:
+            return None
+        key = (target.model, workload_id)
+        if key in self.best_by_model:
+            return self.read(self.best_by_model[key][0])
+        for k in target.keys:
+            key = (k, workload_id)
+            if key in self.best_by_targetkey:
+                return self.read(self.best_by_targetkey[key][0])
+        return None
+
+    def flush(self):
+        """Write the best-config index to disk atomically"""
+        if self.readonly:
+            return
+        self._fdata.flush()
+        self._ftables.flush()
+        index = {
+            "end": self._indexed_end,
+            "by_targetkey": [[k, wkl_id, offset, cost] for (k, wkl_id), (offset, cost)
+                             in self.best_by_targetkey.items()],
+            "by_model": [[model, wkl_id, offset, cost] for (model, wkl_id), (offset, cost)
+                         in self.best_by_model.items()],
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as fout:
+            json.dump(index, fout)
+        os.replace(tmp_name, os.path.join(self.path, "best.idx"))
+
+    def close(self):
+        """Flush the index and close the underlying files"""
+        if self._fdata.closed:
+            return
+        self.flush()
+        self._fdata.close()
+        if self._ftables is not None:
+            self._ftables.close()
+            self._flock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ptype, value, trace):
+        self.close()
+
+
+def convert_to_store(in_file, out_path):
+    """Append all records of a json log file to a record store
+
+    Parameters
+    ----------
+    in_file: str
+        The filename of the json log
+    out_path: str
+        The directory of the record store
+
+    Returns
+    -------
+    store: RecordStore
+        The store. The caller is responsible for closing it.
+    """
+    store = RecordStore(out_path)
+    for inp, res in load_from_file(in_file):
+        store.save(inp, res)
+    store.flush()
+    return store
@@ -25,5 +25,7 @@ class AutotvmGlobalScope(object):
 
         self.cuda_target_arch = None
         self.in_tuning = False
+        # the statistic of measured costs used for ranking configs, see measure.result_cost
+        self.cost_statistic = 'mean'
 
 GLOBAL_SCOPE = AutotvmGlobalScope()
@@ -23,3 +23,6 @@
 INVALID_LAYOUT_TIME = 10e9
 
 MAX_OUTPUT_NODES = 16
+
+# Maximum number of output states evaluated at once in the DP backward pass.
+DP_CHUNK_SIZE = 1 << 22
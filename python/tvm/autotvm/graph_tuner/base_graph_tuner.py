@@ -17,6 +17,7 @@
 # pylint: disable=too-many-arguments,too-many-locals,too-many-statements,too-many-instance-attributes,too-many-branches,too-many-nested-blocks,invalid-name,unused-argument,unused-variable,no-member,no-value-for-parameter
 """Base class for graph tuner."""
 import logging
+import os
 from abc import abstractmethod
 
 import numpy as np
@@ -55,6 +56,41 @@ def layout_transform(*args):
     return sch, [data, out]
 
 
+def _layout_transform_bytes(ltf_workload):
+    """Number of bytes read and written by a layout transformation workload."""
+    _, shape, dtype = ltf_workload[1]
+    return 2 * np.prod(shape) * np.dtype(dtype).itemsize
+
+
+def _is_layout_sample(record):
+    """Whether a record is a measured layout transformation usable for fitting"""
+    cost = record[1].costs[0]
+    return record[0].task is not None and isinstance(cost, float) and \
+        cost < INVALID_LAYOUT_TIME
+
+
+def _fit_layout_transform_model(records):
+    """Fit a linear model of layout transformation time on the bytes moved.
+
+    Returns the intercept and the slope. With fewer than two distinct sizes,
+    or if the least squares line is not physical, the model falls back to a
+    line through the origin with the average time per byte.
+    """
+    nbytes, times = [], []
+    for record in records:
+        if _is_layout_sample(record):
+            nbytes.append(_layout_transform_bytes(record[0].task.workload))
+            times.append(record[1].costs[0])
+    if not nbytes:
+        return 0, 0
+    nbytes, times = np.array(nbytes, dtype="float64"), np.array(times)
+    if len(np.unique(nbytes)) >= 2:
+        slope, intercept = np.polyfit(nbytes, times, 1)
+        if slope > 0 and intercept >= 0:
+            return intercept, slope
+    return 0, np.sum(times) / np.sum(nbytes)
+
+
 class BaseGraphTuner(object):
     """Class to search schedules considering both kernel execution time and
     layout transformation time.
@@ -335,7 +371,8 @@ class BaseGraphTuner(object):
     def benchmark_layout_transform(self, min_exec_num=100, timeout=10,
                                    use_rpc=False, device_key=None, host="localhost",
                                    port=9190, n_parallel=1, build_func='default',
-                                   layout_records=None, target_host=None, infer_layout=False):
+                                   layout_records=None, target_host=None, infer_layout=False,
+                                   layout_db=None):
         """Benchmark all possible layout transformation in the graph,
         given a set of schedule candidates for each workload of target operator.
 
@@ -397,10 +434,18 @@ class BaseGraphTuner(object):
             Whether to infer layout transformation time if it doesn't exist in records, instead
             of benchmarking on target device.
 
+            The time is predicted by a linear model of the number of bytes moved,
+            fitted on the available records.
+
             This might bring performance loss comparing to benchmarking layout transformation.
+
+        layout_db : str, optional
+            Filename of a records log file used as a layout transformation database
+            shared across graphs. Records in it with the same target are reused
+            without benchmarking, and new measurements are appended to it.
         """
         self._logger.info("Start to benchmark layout transformation...")
-        if layout_records is None and infer_layout:
+        if layout_records is None and layout_db is None and infer_layout:
             raise RuntimeError("Requires some records to infer layout transformation time.")
 
         if isinstance(layout_records, str):
@@ -408,85 +453,83 @@ class BaseGraphTuner(object):
             if not layout_records and infer_layout:
                 raise RuntimeError("Records must be non-empty to infer layout transformation time.")
 
-        if isinstance(layout_records, str):
-            layout_records = load_from_file(layout_records)
-        num_flops, total_time = 0, 0
         if layout_records is not None:
             for record in layout_records:
-                ltf_wkl = record[0].task.workload
-                self._layout_transform_perf_records[ltf_wkl] = record
-                input_shape = ltf_wkl[1][1]
-                flops = np.prod(input_shape)
-                num_flops += flops
-                total_time += record[1].costs[0]
-        avg_time = total_time / num_flops if num_flops > 0 else 0
-
-        args_list = []
+                self._layout_transform_perf_records[record[0].task.workload] = record
+        if layout_db is not None and os.path.isfile(layout_db):
+            for record in load_from_file(layout_db):
+                if str(record[0].target) == str(self._target):
+                    self._layout_transform_perf_records[record[0].task.workload] = record
+        if infer_layout and not any(_is_layout_sample(record) for record
+                                    in self._layout_transform_perf_records.values()):
+            raise RuntimeError("Requires some records to infer layout transformation time.")
+
+        args_dict = {}
         def _fetch_args_callback(from_node_idx, to_node_idx, from_sch_idx,
                                  to_sch_idx, args):
             """Callback function to fetch layout transform args"""
             _, in_layout, out_layout = args
             if in_layout != out_layout:
-                args_list.append(args)
+                ltf_workload = ('layout_transform',) + \
+                               autotvm.task.args_to_workload(serialize_args(args))
+                if ltf_workload not in self._layout_transform_perf_records:
+                    args_dict[ltf_workload] = args
 
         self._iterate_layout_transform(_fetch_args_callback)
 
-        def _log_to_list(record_list):
-            """Callback to log result to a list."""
-            def _callback(_, inputs, results):
-                """Callback implementation"""
-                record_list.append((inputs[0], results[0]))
-            return _callback
-
-        builder = autotvm.LocalBuilder(n_parallel=n_parallel, build_func=build_func)
-        runner = autotvm.LocalRunner(number=min_exec_num, repeat=1, timeout=timeout)
-        if use_rpc:
-            if device_key is None:
-                raise RuntimeError("device_key need to be set to use rpc tracker mode.")
-            runner = autotvm.measure.RPCRunner(device_key, host, port, n_parallel=n_parallel,
-                                               number=min_exec_num, repeat=1,
-                                               timeout=timeout)
-        measure_option = autotvm.measure_option(builder=builder, runner=runner)
-        for args in args_list:
-            data, in_layout, out_layout = args
-            args = serialize_args(args)
-            ltf_workload = ('layout_transform',) + autotvm.task.args_to_workload(args)
-            if ltf_workload in  self._layout_transform_perf_records:
-                continue
-
-            if infer_layout:
-                input_shape = ltf_workload[1][1]
-                flops = 1
-                for i in input_shape:
-                    flops *= i
-
+        if infer_layout:
+            intercept, slope = _fit_layout_transform_model(
+                self._layout_transform_perf_records.values())
+            for ltf_workload, args in args_dict.items():
+                data, in_layout, out_layout = args
                 # Rule out invalid layout transformations
                 out = topi.layout_transform(data, in_layout, out_layout)
-                out_flops = 1
-                for i in topi.util.get_const_tuple(out.shape):
-                    out_flops *= i
-
-                if flops != out_flops:
+                if np.prod(topi.util.get_const_tuple(out.shape)) != \
+                        np.prod(topi.util.get_const_tuple(data.shape)):
                     inferred_time = INVALID_LAYOUT_TIME
                 else:
-                    inferred_time = flops * avg_time
+                    inferred_time = max(intercept + slope * _layout_transform_bytes(ltf_workload),
+                                        0)
 
                 record_input = MeasureInput(target=self._target, task=None, config=None)
                 record_output = MeasureResult(costs=(inferred_time,), error_no=0,
                                               all_cost=-1, timestamp=-1)
                 self._layout_transform_perf_records[ltf_workload] = (record_input, record_output)
-                continue
-
+        elif args_dict:
+            builder = autotvm.LocalBuilder(n_parallel=n_parallel, build_func=build_func)
+            runner = autotvm.LocalRunner(number=min_exec_num, repeat=1, timeout=timeout)
+            if use_rpc:
+                if device_key is None:
+                    raise RuntimeError("device_key need to be set to use rpc tracker mode.")
+                runner = autotvm.measure.RPCRunner(device_key, host, port, n_parallel=n_parallel,
+                                                   number=min_exec_num, repeat=1,
+                                                   timeout=timeout)
+            measure_option = autotvm.measure_option(builder=builder, runner=runner)
+
+            inputs = []
+            for ltf_workload, args in args_dict.items():
+                task = autotvm.task.create(layout_transform, args=serialize_args(args),
+                                           target=self._target, target_host=target_host)
+                task.workload = ltf_workload
+                inputs.append(MeasureInput(task.target, task, task.config_space.get(0)))
+
+            # All layout transformations share the target, so they are measured
+            # together in batches of n_parallel with a single measure function.
+            measure_batch = autotvm.measure.create_measure_batch(inputs[0].task, measure_option)
             records = []
-            task = autotvm.task.create(layout_transform, args=args, target=self._target,
-                                       target_host=target_host)
-            task.workload = ltf_workload
-            tuner = autotvm.tuner.GridSearchTuner(task)
-            tuner.tune(n_trial=1, measure_option=measure_option,
-                       callbacks=[_log_to_list(records)])
-            if not isinstance(records[0][1].costs[0], float):
-                records[0] = (records[0][0], records[0][1]._replace(costs=(INVALID_LAYOUT_TIME,)))
-            self._layout_transform_perf_records[ltf_workload] = records[0]
+            for i in range(0, len(inputs), measure_batch.n_parallel):
+                batch = inputs[i:i + measure_batch.n_parallel]
+                for inp, res in zip(batch, measure_batch(batch)):
+                    if not isinstance(res.costs[0], float):
+                        res = res._replace(costs=(INVALID_LAYOUT_TIME,))
+                    self._layout_transform_perf_records[inp.task.workload] = (inp, res)
+                    records.append((inp, res))
+            del measure_batch
+
+            if layout_db is not None:
+                with open(layout_db, "a") as out_file:
+                    for inp, res in records:
+                        out_file.write(encode(inp, res) + "\n")
 
         self._iterate_layout_transform(self._create_matrix_callback)
         self._logger.info("Benchmarking layout transformation successful.")
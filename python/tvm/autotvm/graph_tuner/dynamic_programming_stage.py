@@ -112,41 +112,26 @@ class DPStage(object):
             input_stage = self._global_stage_dict[input_idx]
             input_dep = input_stage.dep
             input_states = input_stage.states
-            input_flatten_states = input_states.flatten()
             input_record_list = input_node_entry["record_candidates"]
-            num_schedules = len(self._record_list)
-            num_input_schedules = len(input_record_list)
-            num_input_states = input_flatten_states.shape[0]
 
-            full_states_shape = tuple([num_schedules, num_input_schedules] +
+            full_states_shape = tuple([len(self._record_list), len(input_record_list)] +
                                       [len(self._global_node_list[dep_idx]["record_candidates"])
                                        for dep_idx in input_dep])
-            self._full_states = np.zeros(full_states_shape).flatten().astype("float32")
             self._full_states_idx = [self._idx, input_idx] + input_dep
-            dep_multiplier = 1
-            for i in range(2, len(full_states_shape)):
-                dep_multiplier *= full_states_shape[i]
             input_node_time_counted = input_idx in self._global_counted_nodes_set
 
-            for i in range(num_schedules):
-                current_sch_time = float(self._record_list[i][1].costs[0])
-                for j in range(num_input_states):
-                    input_sch_idx = j // dep_multiplier
-                    layout_transform_time = \
-                        self._global_layout_transform_interlayer_cost \
-                            [(input_idx, self._idx)][input_sch_idx][i]
-
-                    if input_node_time_counted:
-                        total_time = current_sch_time + layout_transform_time
-                    else:
-                        total_time = \
-                            current_sch_time + layout_transform_time + input_flatten_states[j]
-                    current_state_idx = i * num_input_states + j
-                    self._full_states[current_state_idx] = total_time
+            # full_states[i, j, ...] = time(i) + layout_transform(j -> i) + input_states[j, ...]
+            full_states = np.zeros(full_states_shape)
+            full_states += self._layout_transform_states(input_idx, 1, self._idx, 0,
+                                                         full_states_shape)
+            sch_time = np.array([float(record[1].costs[0]) for record in self._record_list])
+            full_states += sch_time.reshape((-1,) + (1,) * (len(full_states_shape) - 1))
+            if not input_node_time_counted:
+                full_states += np.reshape(input_states, full_states_shape[1:])
+            self._full_states = full_states.astype("float32")
 
             if not input_node_time_counted:
                 self._global_counted_nodes_set.add(input_idx)
-            self._full_states = self._full_states.reshape(full_states_shape)
 
             # If out degree of input node is 1, we can remove the dimension of input node,
             # since the states of input node will not be needed any more. Otherwise, input
@@ -205,42 +190,27 @@ class DPStage(object):
         states_list, aligned_node_list = DPStage.align_states(input_index_list,
                                                               self._global_stage_dict,
                                                               self._global_node_list)
-        target_node_idx, target_major_axis, target_multiplier, target_states = states_list[0]
+        target_node_idx, target_major_axis, _, target_states = states_list[0]
         aligned_shape = target_states.shape
-        self._full_states = np.zeros(aligned_shape).astype("float32").flatten()
         self._full_states_idx = list(aligned_node_list)
-        num_states = self._full_states.shape[0]
         node_time_counted = [item[0] in self._global_counted_nodes_set for item in states_list]
-        target_states = target_states.flatten()
-        src_states_list = [states_list[i][3].flatten() for i in range(1, len(states_list))]
-
-        for i in range(num_states):
-            target_sch_idx = (i % (target_multiplier *
-                                   aligned_shape[target_major_axis])) // target_multiplier
-            if node_time_counted[0]:
-                new_state = 0
-            else:
-                new_state = target_states[i]
-
-            for j in range(1, len(states_list)):
-                src_states = src_states_list[j - 1]
-                src_node_idx, src_major_axis, src_multiplier, _ = states_list[j]
-                src_sch_idx = (i % (src_multiplier *
-                                    aligned_shape[src_major_axis])) // src_multiplier
-                layout_transform_time = \
-                    self._global_layout_transform_interlayer_cost\
-                        [(src_node_idx, target_node_idx)][src_sch_idx][target_sch_idx]
-
-                if node_time_counted[j]:
-                    new_state += layout_transform_time
-                else:
-                    new_state += layout_transform_time + src_states[i]
-                self._full_states[i] = new_state
+
+        full_states = np.zeros(aligned_shape)
+        if not node_time_counted[0]:
+            full_states += target_states
+        for j in range(1, len(states_list)):
+            src_node_idx, src_major_axis, _, src_states = states_list[j]
+            src_time = self._layout_transform_states(src_node_idx, src_major_axis,
+                                                     target_node_idx, target_major_axis,
+                                                     aligned_shape)
+            if not node_time_counted[j]:
+                src_time = src_time + src_states
+            full_states += src_time
+        self._full_states = full_states.astype("float32")
 
         for i, node_counted in enumerate(node_time_counted):
             if not node_counted:
                 self._global_counted_nodes_set.add(states_list[i][0])
-        self._full_states = self._full_states.reshape(aligned_shape)
 
         # Remove dependency to reduce states
         reduced_states = np.array(self._full_states)
@@ -272,6 +242,19 @@ class DPStage(object):
             for child in self._global_out_nodes_dict[self._idx]:
                 self._global_dep_dict[self._idx].add(child)
 
+    def _layout_transform_states(self, src_idx, src_axis, dst_idx, dst_axis, shape):
+        """Layout transformation time from src_idx to dst_idx, reshaped so that it
+        broadcasts against states of the given shape, in which the schedules of the
+        two nodes lie on src_axis and dst_axis."""
+        layout_transform_time = np.array(
+            self._global_layout_transform_interlayer_cost[(src_idx, dst_idx)], dtype="float64")
+        if src_axis > dst_axis:
+            layout_transform_time = layout_transform_time.T
+        reshape_list = [1] * len(shape)
+        reshape_list[src_axis] = shape[src_axis]
+        reshape_list[dst_axis] = shape[dst_axis]
+        return layout_transform_time.reshape(reshape_list)
+
     @property
     def dep(self):
         """Get dependency list."""
@@ -350,3 +333,41 @@ class DPStage(object):
                 multiplier *= aligned_shape[i]
             states_list.append((input_idx, major_axis, multiplier, input_node_states))
         return states_list, aligned_node_list
+
+    @staticmethod
+    def argmin_states(states_list, chunk_size=None):
+        """Find the position of the minimum of the sum of aligned states.
+
+        Parameters
+        ----------
+        states_list : list of numpy.ndarray
+            States broadcast to the same shape, e.g. returned by align_states.
+
+        chunk_size : int, optional
+            If the states have more elements than chunk_size, the sum is
+            evaluated chunk_size elements at a time to bound memory usage.
+
+        Returns
+        -------
+        min_pos : int
+            Position of the minimum in the flattened states.
+        """
+        shape = states_list[0].shape
+        num_states = int(np.prod(shape))
+        if chunk_size is None or num_states <= chunk_size:
+            total = np.zeros(shape)
+            for states in states_list:
+                total += states
+            return int(np.argmin(total))
+
+        min_time, min_pos = np.inf, 0
+        for start in range(0, num_states, chunk_size):
+            pos = np.arange(start, min(start + chunk_size, num_states))
+            index = np.unravel_index(pos, shape)
+            total = np.zeros(pos.shape)
+            for states in states_list:
+                total += states[index]
+            chunk_min_pos = int(np.argmin(total))
+            if total[chunk_min_pos] < min_time:
+                min_time, min_pos = total[chunk_min_pos], start + chunk_min_pos
+        return min_pos
@@ -19,7 +19,7 @@
 import sys
 import numpy as np
 
-from ._base import MAX_OUTPUT_NODES
+from ._base import MAX_OUTPUT_NODES, DP_CHUNK_SIZE
 from .base_graph_tuner import BaseGraphTuner
 from .dynamic_programming_stage import DPStage
 from .utils import has_multiple_inputs, is_boundary_node
@@ -42,6 +42,7 @@ class DPTuner(BaseGraphTuner):
         """
         super(DPTuner, self).__init__(*args, **kwargs)
         self._num_states = self._max_num_states = None
+        self._chunk_size = DP_CHUNK_SIZE
         self._stage_dict = {}
         self._dep_dict = {}
         self._counted_nodes_set = set()
@@ -90,46 +91,33 @@ class DPTuner(BaseGraphTuner):
             if not val:
                 output_idx_list.append(key)
 
+        # Output nodes sharing neither schedules nor dependencies are independent,
+        # so the optimal schedules can be picked for each group separately.
+        output_groups = self._group_output_nodes(output_idx_list)
+
         # Restrict number of output nodes to avoid numpy reshape error
-        if len(output_idx_list) > MAX_OUTPUT_NODES:
-            msg = "The number of outputs in graph is larger than upper " \
+        max_group_size = max(len(group) for group in output_groups)
+        if max_group_size > MAX_OUTPUT_NODES:
+            msg = "The number of dependent outputs in graph is larger than upper " \
                   "limit: %s vs %s. Usually this is caused by too many " \
                   "LAYOUT_FIXED_OP in graph. Switch to greedily select schedule." \
                   "No action required at this moment. We will continuously improve graph tuner" \
-                  % (len(output_idx_list), MAX_OUTPUT_NODES)
+                  % (max_group_size, MAX_OUTPUT_NODES)
             self._logger.warning(msg)
             self._optimal_record_dict = {key : 0 for key in self._in_nodes_dict}
             return
 
-        states_list, aligned_node_list = DPStage.align_states(output_idx_list, self._stage_dict,
-                                                              self._node_list)
-        num_states = states_list[0][3].size
-        self._check_num_states(num_states * len(output_idx_list))
-        aligned_node_shape = states_list[0][3].shape
-        min_time = 0
-        min_pos = -1
-        for states in states_list:
-            min_time += np.amax(states[3])
-        flatten_states_list = [current_states[3].flatten() for current_states in states_list]
-        for i in range(num_states):
-            current_time = 0
-            for j, current_states in enumerate(states_list):
-                current_time += flatten_states_list[j][i]
-            if min_time > current_time:
-                min_time = current_time
-                min_pos = i
-        for i, states in enumerate(states_list):
-            current_major_axis = states[1]
-            current_sch_idx = (min_pos % (states[2] *
-                                          aligned_node_shape[current_major_axis])) // states[2]
-            optimal_record_dict[aligned_node_list[i]] = current_sch_idx
-        # Pick optimal schedule for dependencies of output nodes
-        for i in range(len(states_list), len(aligned_node_list)):
-            multiplier = 1
-            for j in range(i + 1, len(aligned_node_list)):
-                multiplier *= aligned_node_shape[j]
-            optimal_record_dict[aligned_node_list[i]] = \
-                min_pos // multiplier % aligned_node_shape[i]
+        # Pick optimal schedule for output nodes and their dependencies
+        for group in output_groups:
+            states_list, aligned_node_list = DPStage.align_states(group, self._stage_dict,
+                                                                  self._node_list)
+            aligned_node_shape = states_list[0][3].shape
+            self._check_num_states(states_list[0][3].size * len(group))
+            min_pos = DPStage.argmin_states([states[3] for states in states_list],
+                                            self._chunk_size)
+            for node_idx, sch_idx in zip(aligned_node_list,
+                                         np.unravel_index(min_pos, aligned_node_shape)):
+                optimal_record_dict[node_idx] = int(sch_idx)
 
         # Backward pass to get optimal schedules for other nodes
         bfs_q = queue.Queue()
@@ -154,9 +142,8 @@ class DPTuner(BaseGraphTuner):
                     if input_idx not in optimal_record_dict:
                         dep_list = self._stage_dict[node_idx].dep
                         dep_idx = tuple([optimal_record_dict[item] for item in dep_list])
-                        tmp = np.argmin(full_states, axis=1)
-                        optimal_input_sch_idx = tmp[(optimal_sch_idx,) + dep_idx]
-                        optimal_record_dict[input_idx] = optimal_input_sch_idx
+                        tmp = full_states[(optimal_sch_idx, slice(None)) + dep_idx]
+                        optimal_record_dict[input_idx] = int(np.argmin(tmp))
             else:
                 input_idx_list = self._in_nodes_dict[node_idx]
                 optimal_record_dict[input_idx_list[0]] = optimal_sch_idx
@@ -174,14 +161,9 @@ class DPTuner(BaseGraphTuner):
                 if visited_states_idx:
                     tmp = np.transpose(tmp, tuple(visited_states_pos + new_states_pos))
                     tmp = tmp[tuple([optimal_record_dict[idx] for idx in visited_states_idx])]
-                min_pos = np.argmin(tmp)
-                multiplier = 1
-                for i in range(len(new_states_idx)):
-                    multiplier *= full_states.shape[new_states_pos[i] + 1]
-                for pos, idx in zip(new_states_pos, new_states_idx):
-                    multiplier //= full_states.shape[pos + 1]
-                    optimal_record_dict[idx] = min_pos // multiplier
-                    min_pos %= multiplier
+                min_pos = np.unravel_index(np.argmin(tmp), tmp.shape)
+                for idx, sch_idx in zip(new_states_idx, min_pos):
+                    optimal_record_dict[idx] = int(sch_idx)
                 for input_idx in input_idx_list:
                     if input_idx not in visited:
                         bfs_q.put(input_idx)
@@ -192,12 +174,36 @@ class DPTuner(BaseGraphTuner):
                 continue
         self._logger.info("Finished backward pass...")
 
+    def _group_output_nodes(self, output_idx_list):
+        """Group output nodes whose states share a node index."""
+        groups = []
+        for out_idx in output_idx_list:
+            nodes = set([out_idx] + self._stage_dict[out_idx].dep)
+            group = [out_idx]
+            for other_group, other_nodes in list(groups):
+                if nodes & other_nodes:
+                    groups.remove((other_group, other_nodes))
+                    group = other_group + group
+                    nodes |= other_nodes
+            groups.append((group, nodes))
+        return [sorted(group, key=output_idx_list.index) for group, _ in groups]
+
     def run(self, **kwargs):
         """Run dynamic programming solver.
+
+        Parameters
+        ----------
+        max_num_states : int, optional
+            Upper limit of the number of states.
+
+        chunk_size : int, optional
+            Maximum number of states of output nodes evaluated at once
+            when picking their optimal schedules.
         """
         max_num_states = None if "max_num_states" not in kwargs else kwargs["max_num_states"]
         self._num_states = 0
         self._max_num_states = max_num_states
+        self._chunk_size = kwargs.get("chunk_size", DP_CHUNK_SIZE)
         self._logger.info("Start to run dynamic programming algorithm...")
         self._forward()
         self._backward()
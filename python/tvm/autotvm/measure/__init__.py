@@ -17,7 +17,7 @@
 """Distributed executor infrastructure to scale up the tuning"""
 
 from .measure import MeasureInput, MeasureResult, MeasureErrorNo, measure_option, \
-    create_measure_batch
+    create_measure_batch, confidence_interval, result_cost
 from .measure_methods import LocalBuilder, LocalRunner, RPCRunner, request_remote
 from .executor import Executor
-from .local_executor import LocalExecutor
+from .local_executor import LocalExecutor, PoolExecutor
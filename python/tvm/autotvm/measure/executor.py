@@ -15,6 +15,8 @@
 # specific language governing permissions and limitations
 # under the License.
 """ Abstraction for asynchronous job execution """
+import threading
+import time
 
 class Executor(object):
     """
@@ -83,6 +85,29 @@ class Future(object):
         """
         raise NotImplementedError()
 
+    def add_done_callback(self, fn):
+        """
+        Call fn with this future once the job is done, in an unspecified thread.
+        The default checks for completion in a helper thread,
+        subclasses that know when the job finishes should override it.
+
+        Parameters
+        ----------
+        fn : callable
+            The function, it must be cheap and must not raise.
+        """
+        if self.done():
+            fn(self)
+            return
+
+        def _watch():
+            while not self.done():
+                time.sleep(0.01)
+            fn(self)
+        thread = threading.Thread(target=_watch)
+        thread.daemon = True
+        thread.start()
+
 class FutureError(RuntimeError):
     """Base error class of all future events"""
 
@@ -16,9 +16,15 @@
 # under the License.
 """Local based implementation of the executor using multiprocessing"""
 
+import collections
+import multiprocessing
+import pickle
 import signal
+import threading
+import time
 
 from multiprocessing import Process, Queue
+from multiprocessing.connection import wait
 try:
     from queue import Empty
 except ImportError:
@@ -150,3 +156,208 @@ class LocalExecutor(executor.Executor):
                           args=(queue, self.timeout, func, args, kwargs))
         process.start()
         return LocalFuture(process, queue)
+
+
+def _pool_worker(conn):
+    """main loop of a pool worker: receive jobs from the pipe and send back results"""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        func, args, kwargs = job
+        try:
+            res = func(*args, **kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            res = exc
+        try:
+            pickle.dumps(res)
+        except Exception:  # pylint: disable=broad-except
+            res = executor.ExecutionError("Cannot pickle the result: " + str(res))
+        conn.send(res)
+
+
+def _respawn_context():
+    """The multiprocessing context used to replace a pool worker.
+
+    Replacements are started from the manager thread while other threads are
+    running, so they are not forked from this process. The forkserver start
+    method is used when available, otherwise the default one.
+    """
+    if hasattr(multiprocessing, 'get_context') and \
+            'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing
+
+
+class _PoolWorker(object):
+    """A warm worker process of PoolExecutor and the job it is running"""
+    def __init__(self, ctx=None):
+        ctx = ctx or multiprocessing
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_pool_worker, args=(child_conn,))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.future = None
+        self.start_time = None
+
+    def kill(self):
+        """kill the worker and all processes spawned by it"""
+        kill_child_processes(self.process.pid)
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class PoolFuture(executor.Future):
+    """Future of a job submitted to PoolExecutor"""
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._event.is_set()
+
+    def get(self, timeout=None):
+        if not self._event.wait(timeout):
+            raise executor.TimeoutError()
+        return self._result
+
+    def add_done_callback(self, fn):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _set_result(self, result):
+        self._result = result
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+class PoolExecutor(executor.Executor):
+    """Local executor that keeps a pool of warm worker processes.
+
+    Unlike LocalExecutor, which forks a new process for every job, the workers
+    are forked once (with tvm already imported) and jobs are streamed to them
+    as soon as a worker becomes idle. A worker that exceeds the timeout or
+    crashes is killed and replaced by a fresh one, which is started with a
+    fork-safe method because the pool is multithreaded by then.
+
+    The workers live until :any:`shutdown` is called.
+
+    The submitted function, its arguments and its return value are sent
+    between processes, so they must be picklable.
+
+    Parameters
+    ----------
+    timeout: float, optional
+        timeout of a job. If time is out. A TimeoutError will be returned (not raised)
+    n_workers: int, optional
+        The number of worker processes. "None" will use all cpu cores
+    """
+    def __init__(self, timeout=None, n_workers=None):
+        if not psutil:
+            raise RuntimeError("Python package psutil is missing. "
+                               "please try `pip install psutil`")
+        self.timeout = timeout or executor.Executor.DEFAULT_TIMEOUT
+        self.n_workers = n_workers or psutil.cpu_count()
+
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._workers = [_PoolWorker() for _ in range(self.n_workers)]
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._manage_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        future = PoolFuture()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit jobs to a shutdown PoolExecutor")
+            self._pending.append((future, (func, args, kwargs)))
+            self._cond.notify()
+        return future
+
+    def shutdown(self):
+        """Stop the manager thread and kill all workers"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify()
+        self._thread.join()
+        for worker in self._workers:
+            worker.kill()
+        while self._pending:
+            self._pending.popleft()[0]._set_result(executor.ExecutionError("Executor shutdown"))
+
+    def _replace(self, worker, result=None):
+        """finish the job of a worker with an error and replace the worker"""
+        if worker.future is not None:
+            worker.future._set_result(result)
+            worker.future = None
+        worker.kill()
+        self._workers[self._workers.index(worker)] = _PoolWorker(_respawn_context())
+
+    def _dispatch(self):
+        """send pending jobs to idle workers"""
+        i = 0
+        while self._pending and i < len(self._workers):
+            worker = self._workers[i]
+            if worker.future is None:
+                future, job = self._pending.popleft()
+                try:
+                    worker.conn.send(job)
+                except (EOFError, OSError):
+                    # the worker died while idle, send the job to its replacement
+                    self._pending.appendleft((future, job))
+                    self._replace(worker)
+                    continue
+                except Exception as exc:  # pylint: disable=broad-except
+                    future._set_result(exc)
+                    continue
+                worker.future = future
+                worker.start_time = time.time()
+            i += 1
+
+    def _manage_loop(self):
+        """dispatch jobs, collect results and watch for timeout or crashed workers"""
+        while True:
+            with self._cond:
+                if self._shutdown:
+                    return
+                self._dispatch()
+                busy = [w for w in self._workers if w.future is not None]
+                if not busy:
+                    self._cond.wait()
+                    continue
+
+            for conn in wait([w.conn for w in busy], timeout=0.05):
+                worker = [w for w in busy if w.conn is conn][0]
+                try:
+                    res = conn.recv()
+                except (EOFError, OSError):
+                    with self._cond:
+                        self._replace(worker, executor.ExecutionError("Worker process crashed"))
+                    continue
+                worker.future._set_result(res)
+                worker.future = None
+
+            now = time.time()
+            with self._cond:
+                for worker in busy:
+                    if worker.future is None:
+                        continue
+                    if now - worker.start_time > self.timeout:
+                        self._replace(worker, executor.TimeoutError())
+                    elif not worker.process.is_alive():
+                        self._replace(worker, executor.ExecutionError("Worker process crashed"))
@@ -16,8 +16,19 @@
 # under the License.
 # pylint: disable=pointless-string-statement,consider-using-enumerate,invalid-name
 """User facing API for specifying how to measure the generated code"""
+import collections
 import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from ..env import GLOBAL_SCOPE
 
 class MeasureInput(namedtuple("MeasureInput", ["target", "task", "config"])):
     """
@@ -34,7 +45,8 @@ class MeasureInput(namedtuple("MeasureInput", ["target", "task", "config"])):
     """
 
 
-class MeasureResult(namedtuple("MeasureResult", ["costs", "error_no", "all_cost", "timestamp"])):
+class MeasureResult(namedtuple("MeasureResult", ["costs", "error_no", "all_cost", "timestamp",
+                                               "variance"])):
     """
     Stores all the results of a measurement
 
@@ -49,7 +61,72 @@ class MeasureResult(namedtuple("MeasureResult", ["costs", "error_no", "all_cost"
         All cost of this measure, including rpc, compilation, test runs
     timestamp: float
         The absolute time stamp when we finish measurement.
+    variance: float, optional
+        The sample variance of `costs`, set by the adaptive measurement of
+        :any:`RPCRunner`. None if the costs were measured with a fixed `repeat`.
+    """
+
+MeasureResult.__new__.__defaults__ = (None,)
+
+
+# two-sided 95% quantiles of the Student's t distribution with 1 to 10 degrees of freedom
+_T95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228)
+
+
+def confidence_interval(costs, variance=None):
+    """The 95% confidence interval of the mean of measured costs
+
+    Parameters
+    ----------
+    costs: Array of float
+        The measured costs
+    variance: float, optional
+        The sample variance of the costs. Computed from `costs` if not given.
+
+    Returns
+    -------
+    mean: float
+        The mean of the costs
+    half_width: float
+        The half width of the interval, inf if there are less than two costs
+    """
+    n = len(costs)
+    mean = float(np.mean(costs))
+    if n < 2:
+        return mean, float('inf')
+    if variance is None:
+        variance = float(np.var(costs, ddof=1))
+    t = _T95[n - 2] if n - 1 <= len(_T95) else 1.96 + 2.5 / (n - 1)
+    return mean, t * np.sqrt(variance / n)
+
+
+def result_cost(result, statistic=None):
+    """Summarize the costs of a successful measurement into one number for ranking
+
+    Parameters
+    ----------
+    result: MeasureResult
+        The measure result
+    statistic: str, optional
+        "mean" ranks by the mean cost, "median" by the median cost, which is robust
+        to outliers, and "upper" by the upper bound of the 95% confidence interval
+        of the mean, which penalizes noisy measurements.
+        If is None, use `autotvm.env.GLOBAL_SCOPE.cost_statistic`.
+
+    Returns
+    -------
+    cost: float
+        The cost in seconds
     """
+    statistic = statistic or GLOBAL_SCOPE.cost_statistic
+    if statistic == 'mean':
+        return float(np.mean(result.costs))
+    if statistic == 'median':
+        return float(np.median(result.costs))
+    if statistic == 'upper':
+        mean, half = confidence_interval(result.costs, result.variance)
+        return mean + half if len(result.costs) > 1 else mean
+    raise ValueError("Invalid cost statistic: " + statistic)
 
 
 class MeasureErrorNo(object):
@@ -111,6 +188,42 @@ class Builder(object):
         """
         raise NotImplementedError()
 
+    def build_async(self, measure_inputs, tmp_dir=None):
+        """Build programs asynchronously
+
+        By default, this builds the whole batch with :any:`build` before returning.
+        Builders that can finish inputs one by one should override it,
+        so that a finished program can be run while the others are still building.
+        Several batches can be in flight, so a builder whose :any:`build` clears
+        a shared work directory must override it and write to `tmp_dir` instead.
+
+        Parameters
+        ----------
+        measure_inputs: List of MeasureInput
+            The measure input
+        tmp_dir: str, optional
+            A fresh directory for the libraries of this batch.
+            It is owned by the caller, which removes it after running the batch.
+
+        Returns
+        -------
+        futures: List of executor.Future
+            The futures of BuildResult (or MeasureResult if the build fails).
+        """
+        # pylint: disable=unused-argument
+        from .local_executor import LocalFutureNoFork
+        return [LocalFutureNoFork(res) for res in self.build(measure_inputs)]
+
+    def close(self):
+        """Release the resources held by the builder, e.g. worker processes.
+        The builder can still be used afterwards and acquires them again."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ptype, value, trace):
+        self.close()
+
 
 class Runner(object):
     """Runner that runs and measures the time cost of a generated program in tuning
@@ -167,8 +280,18 @@ class Runner(object):
         """
         raise NotImplementedError()
 
+    def close(self):
+        """Release the resources held by the runner, e.g. worker processes.
+        The runner can still be used afterwards and acquires them again."""
+
+    def __enter__(self):
+        return self
 
-def measure_option(builder, runner):
+    def __exit__(self, ptype, value, trace):
+        self.close()
+
+
+def measure_option(builder, runner, pipeline=False):
     """
     Set options for measure. To measure a config, we will build it and run it.
     So we have to set options for these two steps.
@@ -180,6 +303,11 @@ def measure_option(builder, runner):
         Specify how to build programs
     runner: Runner
         Specify how to run programs
+    pipeline: bool, optional
+        Whether to overlap building and running. Each built program is sent to
+        the runner as soon as it is ready, and the tuner builds the next batch
+        while the current one is running. Note that the next batch is proposed
+        before the results of the current batch are fed back to the tuner.
 
     Examples
     --------
@@ -222,9 +350,13 @@ def measure_option(builder, runner):
         else:
             raise ValueError("Invalid runner: " + runner)
 
+    if pipeline and getattr(builder, 'batch_size', 1) > 1:
+        raise ValueError("A batched builder cannot be used in a pipelined measurement")
+
     opt = {
         'builder': builder,
         'runner': runner,
+        'pipeline': pipeline,
     }
 
     return opt
@@ -263,4 +395,109 @@ def create_measure_batch(task, option):
 
     measure_batch.n_parallel = builder.n_parallel
     measure_batch.attach_objects = attach_objects
+    measure_batch.pipeline = MeasurePipeline(builder, runner) if option.get('pipeline') else None
     return measure_batch
+
+
+class MeasurePipeline(object):
+    """Asynchronous measurement that overlaps building and running.
+
+    Every input is sent to the runner as soon as its build finishes,
+    while at most `runner.n_parallel` programs are run at the same time.
+
+    Parameters
+    ----------
+    builder: Builder
+        The builder
+    runner: Runner
+        The runner
+    """
+    def __init__(self, builder, runner):
+        self.builder = builder
+        self.runner = runner
+        self._run_pool = ThreadPoolExecutor(max_workers=runner.n_parallel)
+        self._waiting = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, measure_inputs):
+        """Submit a batch for measurement
+
+        Parameters
+        ----------
+        measure_inputs: List of MeasureInput
+            The measure input
+
+        Returns
+        -------
+        futures: List of concurrent.futures.Future
+            The futures of MeasureResult, in the same order as the inputs.
+        """
+        # every batch gets its own directory, because the libraries of the
+        # previous batch may still be waiting for the runner
+        tmp_dir = tempfile.mkdtemp()
+        if not measure_inputs:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return []
+        build_futures = self.builder.build_async(measure_inputs, tmp_dir)
+        batch = {'tmp_dir': tmp_dir, 'remaining': len(measure_inputs)}
+        futures = []
+        with self._cond:
+            for inp, build_future in zip(measure_inputs, build_futures):
+                future = Future()
+                self._waiting.append((inp, build_future, future, batch))
+                futures.append(future)
+        for build_future in build_futures:
+            build_future.add_done_callback(self._on_built)
+        return futures
+
+    def _on_built(self, _):
+        """wake up the dispatch thread, called when a build finishes"""
+        with self._cond:
+            self._cond.notify()
+
+    def close(self):
+        """Wait for the measurements in flight and stop the pipeline"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._run_pool.shutdown(wait=True)
+
+    def _dispatch_loop(self):
+        """send every input whose build is done to the run pool"""
+        while True:
+            with self._cond:
+                while True:
+                    ready = [item for item in self._waiting if item[1].done()]
+                    if ready or (self._closed and not self._waiting):
+                        break
+                    self._cond.wait()
+                if not ready:
+                    return
+                for item in ready:
+                    self._waiting.remove(item)
+            for item in ready:
+                self._run_pool.submit(self._run_one, *item)
+
+    def _run_one(self, measure_input, build_future, future, batch):
+        """run a built program and remove the library after running.
+        The directory of a batch is removed after its last run."""
+        build_result = None
+        try:
+            build_result = build_future.get()
+            result = self.runner.run([measure_input], [build_result])[0]
+        except Exception as exc:  # pylint: disable=broad-except
+            result = MeasureResult((exc,), MeasureErrorNo.UNKNOWN_ERROR, 0, time.time())
+        filename = getattr(build_result, 'filename', None)
+        if isinstance(filename, str) and os.path.isfile(filename):
+            os.remove(filename)
+        with self._cond:
+            batch['remaining'] -= 1
+            last = batch['remaining'] == 0
+        if last:
+            shutil.rmtree(batch['tmp_dir'], ignore_errors=True)
+        future.set_result(result)
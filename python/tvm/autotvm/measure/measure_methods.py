@@ -22,18 +22,21 @@ These functions are responsible for building the tvm module, uploading it to
 remote devices, recording the running time costs, and checking the correctness of the output.
 """
 
+import json
 import logging
+import pickle
 import shutil
+import socket
 import os
 import threading
 import time
 from random import getrandbits
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import tempfile
 
 import numpy as np
 
-from ... import ir_pass, build, build_config, nd, TVMError, register_func, \
+from ... import ir_pass, lower, build, build_config, nd, TVMError, register_func, \
     rpc as _rpc, target as _target
 from ...contrib import nvcc, ndk, tar
 
@@ -41,12 +44,14 @@ from ..util import get_const_tuple
 from ..env import AutotvmGlobalScope
 from ..task.space import InstantiationError
 
-from .measure import MeasureResult, MeasureErrorNo, Builder, Runner
-from .local_executor import LocalExecutor
+from .measure import MeasureResult, MeasureErrorNo, Builder, Runner, confidence_interval
+from . import executor
+from .local_executor import LocalExecutor, LocalFutureNoFork, PoolExecutor
 
 logger = logging.getLogger('autotvm')
 
-class BuildResult(namedtuple("BuildResult", ('filename', 'arg_info', 'error', 'time_cost'))):
+class BuildResult(namedtuple("BuildResult", ('filename', 'arg_info', 'error', 'time_cost',
+                                               'entry_name'))):
     """
     Stores all the necessary inputs for a measurement.
 
@@ -60,7 +65,11 @@ class BuildResult(namedtuple("BuildResult", ('filename', 'arg_info', 'error', 't
         The error happens during compilation.
     time_cost : float
         The time cost of building
+    entry_name : str, optional
+        The name of the function to measure when the library packs several
+        programs, None for the entry function of the library.
     """
+BuildResult.__new__.__defaults__ = (None,)
 
 class LocalBuilder(Builder):
     """Run compilation on local machine
@@ -75,9 +84,25 @@ class LocalBuilder(Builder):
         If is 'default', use default build function
         If is 'ndk', use function for android ndk
         If is callable, use it as custom build function, expect lib_format field.
+    use_pool: bool
+        Whether to build in a pool of persistent worker processes.
+        Inputs are streamed to the workers as soon as one becomes idle,
+        instead of forking a new process per input and waiting for every chunk
+        of `n_parallel` inputs. This requires a picklable build_func, otherwise
+        the builder falls back to forking a process per input.
+        The workers are started on the first build and stopped by :any:`close`,
+        which :any:`Tuner.tune` calls at the end of tuning.
+    batch_size: int
+        The number of programs packed into one library, each with its own entry function.
+        The runner then uploads and loads the library once and measures all its programs
+        in one go, which amortizes the per-trial overhead for fast kernels.
+        The timeout applies to the build of one program and is scaled by the batch size.
+        Batched builds cannot be used with a pipelined measure_option.
     """
-    def __init__(self, timeout=10, n_parallel=None, build_func='default'):
+    def __init__(self, timeout=10, n_parallel=None, build_func='default', use_pool=False,
+                 batch_size=1):
         super(LocalBuilder, self).__init__(timeout, n_parallel)
+        self.batch_size = batch_size
 
         if isinstance(build_func, str):
             if build_func == 'default':
@@ -87,57 +112,123 @@ class LocalBuilder(Builder):
             else:
                 raise ValueError("Invalid build_func" + build_func)
         self.build_func = _wrap_build_func(build_func)
-        self.executor = LocalExecutor(timeout=timeout)
+        if use_pool:
+            try:
+                pickle.dumps(self.build_func)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("build_func cannot be pickled, fall back to forking a "
+                               "process for every build")
+                use_pool = False
+        self.use_pool = use_pool
+        # the pool is started on demand, so that a closed builder can be used again
+        self.executor = None if use_pool else LocalExecutor(timeout=timeout * batch_size)
         self.tmp_dir = tempfile.mkdtemp()
 
-    def build(self, measure_inputs):
-        results = []
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = PoolExecutor(timeout=self.timeout * self.batch_size,
+                                         n_workers=self.n_parallel)
+        return self.executor
 
+    def close(self):
+        if self.use_pool and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def build(self, measure_inputs):
         shutil.rmtree(self.tmp_dir)
         self.tmp_dir = tempfile.mkdtemp()
+        return self._build_into(measure_inputs, self.tmp_dir)
 
-        for i in range(0, len(measure_inputs), self.n_parallel):
-            futures = []
-            for inp in measure_inputs[i:i + self.n_parallel]:
-                ret = self.executor.submit(self.build_func,
-                                           inp,
-                                           self.tmp_dir,
-                                           **self.build_kwargs)
-                futures.append(ret)
+    def _build_into(self, measure_inputs, tmp_dir):
+        """Build a batch of inputs synchronously, writing the libraries to tmp_dir"""
+        build_executor = self._get_executor()
 
-            for future in futures:
-                res = future.get()
+        # every job builds one input, or one batch of inputs into a shared library
+        if self.batch_size > 1:
+            jobs = [(self.build_func.build_batch, measure_inputs[i:i + self.batch_size])
+                    for i in range(0, len(measure_inputs), self.batch_size)]
+        else:
+            jobs = [(self.build_func, inp) for inp in measure_inputs]
 
-                if isinstance(res, Exception):
-                    # timeout or fleet error, return MeasureResult directly
-                    results.append(MeasureResult((res,), MeasureErrorNo.BUILD_TIMEOUT,
-                                                 self.timeout, time.time()))
-                elif res.error is not None:
-                    # instantiation error
-                    if isinstance(res.error, InstantiationError):
-                        results.append(MeasureResult((res.error,),
-                                                     MeasureErrorNo.INSTANTIATION_ERROR,
-                                                     res.time_cost, time.time()))
-                    else:
-                        if "InstantiationError" in str(res.error):
-                            msg = str(res.error)
-                            try:
-                                msg = msg.split('\n')[-2].split(": ")[1]
-                            except Exception:  # pylint: disable=broad-except
-                                pass
-                            results.append(MeasureResult((InstantiationError(msg),),
-                                                         MeasureErrorNo.INSTANTIATION_ERROR,
-                                                         res.time_cost, time.time()))
-                        else:  # tvm error
-                            results.append(MeasureResult((res.error,),
-                                                         MeasureErrorNo.COMPILE_HOST,
-                                                         res.time_cost, time.time()))
+        # a pool executor bounds the number of running builds by itself,
+        # so all jobs are submitted at once and start as soon as a worker is idle
+        if self.use_pool:
+            chunk_size = max(len(jobs), 1)
+        else:
+            chunk_size = self.n_parallel
+
+        results = []
+        for i in range(0, len(jobs), chunk_size):
+            futures = [build_executor.submit(func, inp, tmp_dir, **self.build_kwargs)
+                       for func, inp in jobs[i:i + chunk_size]]
+            for (_, inp), future in zip(jobs[i:i + chunk_size], futures):
+                res = future.get()
+                if self.batch_size == 1:
+                    results.append(self._to_build_result(res))
+                elif isinstance(res, Exception):
+                    results.extend([self._to_build_result(res)] * len(inp))
                 else:
-                    # return BuildResult
-                    results.append(res)
+                    results.extend([self._to_build_result(x) for x in res])
 
         return results
 
+    def build_async(self, measure_inputs, tmp_dir=None):
+        # the libraries of a batch in flight may still be waiting for a runner,
+        # so the tmp dir is never cleared here. The caller removes them after running.
+        tmp_dir = tmp_dir or self.tmp_dir
+        if not self.use_pool or self.batch_size > 1:
+            return [LocalFutureNoFork(res) for res in self._build_into(measure_inputs, tmp_dir)]
+
+        build_executor = self._get_executor()
+        return [_BuildFuture(self, build_executor.submit(self.build_func, inp, tmp_dir,
+                                                         **self.build_kwargs))
+                for inp in measure_inputs]
+
+    def _to_build_result(self, res):
+        """Convert the return value of a build job to BuildResult or MeasureResult"""
+        if isinstance(res, Exception):
+            # timeout or fleet error, return MeasureResult directly
+            return MeasureResult((res,), MeasureErrorNo.BUILD_TIMEOUT,
+                                 self.timeout, time.time())
+        if res.error is not None:
+            # instantiation error
+            if isinstance(res.error, InstantiationError):
+                return MeasureResult((res.error,),
+                                     MeasureErrorNo.INSTANTIATION_ERROR,
+                                     res.time_cost, time.time())
+            if "InstantiationError" in str(res.error):
+                msg = str(res.error)
+                try:
+                    msg = msg.split('\n')[-2].split(": ")[1]
+                except Exception:  # pylint: disable=broad-except
+                    pass
+                return MeasureResult((InstantiationError(msg),),
+                                     MeasureErrorNo.INSTANTIATION_ERROR,
+                                     res.time_cost, time.time())
+            # tvm error
+            return MeasureResult((res.error,),
+                                 MeasureErrorNo.COMPILE_HOST,
+                                 res.time_cost, time.time())
+        # return BuildResult
+        return res
+
+
+class _BuildFuture(executor.Future):
+    """Future of an asynchronous build in LocalBuilder"""
+    def __init__(self, builder, future):
+        self._builder = builder
+        self._future = future
+
+    def done(self):
+        return self._future.done()
+
+    def get(self, timeout=None):
+        return self._builder._to_build_result(self._future.get(timeout))
+
+    def add_done_callback(self, fn):
+        self._future.add_done_callback(lambda _: fn(self))
+
 
 class RPCRunner(Runner):
     """Run generated code on remove devices.
@@ -177,12 +268,34 @@ class RPCRunner(Runner):
         Whether check correctness after measurement. This will use llvm cpu target to
         call your template and get the reference output.
         This can work for TOPI templates, but may not work for your custom template.
+    session_lease: float, optional
+        If positive, every runner worker keeps its remote session for up to this
+        many seconds and reuses it across measurements, instead of requesting a new
+        session from the tracker for every measurement. Uploaded libraries stay in
+        the remote work directory of the session and are removed in bulk.
+        A dropped session is replaced by a new one.
+        It must be larger than `timeout`, because no measurement is started in a
+        session with less time left than its timeout. The timeout of a measurement
+        is scaled by the number of programs in a batched library and by the number of
+        rounds of an adaptive measurement; one that does not fit in the lease uses a
+        session of its own.
+    adaptive: bool, optional
+        If True, keep measuring `repeat` more costs until the 95% confidence interval
+        of the mean is within `ci_target` of the mean, or until `max_repeat` costs
+        are collected. A config whose interval lies entirely above the best mean cost
+        measured so far for the task is stopped early.
+        All the costs are kept and their variance is stored in the MeasureResult.
+    ci_target: float, optional
+        The target half width of the confidence interval relative to the mean
+    max_repeat: int, optional
+        The maximum number of costs of one adaptive measurement
     """
     def __init__(self,
                  key, host, port, priority=1,
                  timeout=10, n_parallel=None,
                  number=4, repeat=3, min_repeat_ms=0, cooldown_interval=0.1,
-                 check_correctness=False):
+                 check_correctness=False, session_lease=0,
+                 adaptive=False, ci_target=0.02, max_repeat=30):
         super(RPCRunner, self).__init__(timeout, n_parallel)
 
         self.key = key
@@ -199,11 +312,38 @@ class RPCRunner(Runner):
         self.ref_output = None
         self.check_correctness = check_correctness
         self.cooldown_interval = cooldown_interval
-
-        self.executor = LocalExecutor()
+        if 0 < session_lease <= timeout:
+            raise ValueError("session_lease (%g s) must be larger than timeout (%g s)"
+                             % (session_lease, timeout))
+        self.session_lease = session_lease
+
+        self.adaptive = adaptive
+        self.ci_target = ci_target
+        self.max_repeat = max_repeat
+        self.best_cost = None
+        rounds = -(-max_repeat // repeat) if adaptive else 1
+        if session_lease and timeout * rounds >= session_lease:
+            logger.warning("A measurement may take up to %g s, which does not fit in a "
+                           "session_lease of %g s. Such measurements use a new session "
+                           "each.", timeout * rounds, session_lease)
+
+        # sessions are cached in the worker processes, so the workers must persist.
+        # The pool is started on demand and stopped by close().
+        self.executor = None if session_lease else LocalExecutor()
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = PoolExecutor(n_workers=self.n_parallel)
+        return self.executor
+
+    def close(self):
+        if self.session_lease and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
 
     def set_task(self, task):
         self.task = task
+        self.best_cost = None
 
         if check_remote(task.target, self.key, self.host, self.port):
             logger.info("Get devices for measurement successfully!")
@@ -245,32 +385,65 @@ class RPCRunner(Runner):
         return kwargs
 
     def run(self, measure_inputs, build_results):
-        results = []
-        remote_args = (self.key, self.host, self.port, self.priority, self.timeout)
-
-        for i in range(0, len(measure_inputs), self.n_parallel):
+        results = [None] * len(measure_inputs)
+
+        # the programs packed into one library by a batching builder are measured in one job
+        groups = OrderedDict()
+        for i, build_res in enumerate(build_results):
+            batched = isinstance(build_res, BuildResult) and build_res.entry_name is not None
+            groups.setdefault(build_res.filename if batched else i, []).append(i)
+        groups = list(groups.values())
+
+        # the session must last for all the rounds of an adaptive measurement
+        rounds = -(-self.max_repeat // self.repeat) if self.adaptive else 1
+        for i in range(0, len(groups), self.n_parallel):
             futures = []
-            for measure_inp, build_res in zip(measure_inputs[i:i+self.n_parallel],
-                                              build_results[i:i+self.n_parallel]):
-                ret = self.executor.submit(run_through_rpc,
-                                           measure_inp,
-                                           build_res,
-                                           self.number,
-                                           self.repeat,
-                                           self.min_repeat_ms,
-                                           self.cooldown_interval,
-                                           remote_args,
-                                           self.ref_input,
-                                           self.ref_output)
+            # the executor waits for the device too, its timeout scales like the session's
+            run_executor = self._get_executor()
+            run_executor.timeout = executor.Executor.DEFAULT_TIMEOUT * rounds * \
+                max(len(group) for group in groups[i:i+self.n_parallel])
+            for group in groups[i:i+self.n_parallel]:
+                # the session must last for all the programs of a batch
+                remote_args = (self.key, self.host, self.port, self.priority,
+                               self.timeout * len(group) * rounds)
+                if len(group) == 1:
+                    func, inputs = run_through_rpc, (measure_inputs[group[0]],
+                                                     build_results[group[0]])
+                else:
+                    func, inputs = run_batch_through_rpc, (
+                        [measure_inputs[k] for k in group], [build_results[k] for k in group])
+                ret = run_executor.submit(func,
+                                          *inputs,
+                                          number=self.number,
+                                          repeat=self.repeat,
+                                          min_repeat_ms=self.min_repeat_ms,
+                                          cooldown_interval=self.cooldown_interval,
+                                          remote_args=remote_args,
+                                          ref_input=self.ref_input,
+                                          ref_output=self.ref_output,
+                                          session_lease=self.session_lease,
+                                          ci_target=self.ci_target if self.adaptive else 0,
+                                          max_repeat=self.max_repeat,
+                                          best_cost=self.best_cost)
                 futures.append(ret)
 
-            for future in futures:
+            for group, future in zip(groups[i:i+self.n_parallel], futures):
                 res = future.get()
                 if isinstance(res, Exception):   # executor error or timeout
-                    results.append(MeasureResult((str(res),), MeasureErrorNo.RUN_TIMEOUT,
-                                                 self.timeout, time.time()))
-                else:
-                    results.append(res)
+                    res = [MeasureResult((str(res),), MeasureErrorNo.RUN_TIMEOUT,
+                                         self.timeout, time.time())] * len(group)
+                elif len(group) == 1:
+                    res = [res]
+                for k, item in zip(group, res):
+                    results[k] = item
+
+            if self.adaptive:
+                # later configs of the task are stopped early against the best one so far
+                for res in results:
+                    if res is not None and res.error_no == MeasureErrorNo.NO_ERROR:
+                        cost = np.mean(res.costs)
+                        if self.best_cost is None or cost < self.best_cost:
+                            self.best_cost = cost
 
         return results
 
@@ -303,6 +476,16 @@ class LocalRunner(RPCRunner):
         Whether check correctness after measurement. This will use llvm cpu target to
         call your template and get the reference output.
         This can work for TOPI templates, but may not work for your custom template.
+    session_lease: float, optional
+        If positive, reuse the local rpc session for up to this many seconds.
+        See :any:`RPCRunner`.
+    adaptive: bool, optional
+        Whether to repeat the measurement until the confidence interval is tight enough.
+        See :any:`RPCRunner`.
+    ci_target: float, optional
+        The target half width of the confidence interval relative to the mean
+    max_repeat: int, optional
+        The maximum number of costs of one adaptive measurement
 
     Note
     ----
@@ -312,13 +495,17 @@ class LocalRunner(RPCRunner):
     def __init__(self,
                  timeout=10,
                  number=4, repeat=3, min_repeat_ms=0, cooldown_interval=0.1,
-                 check_correctness=False):
+                 check_correctness=False, session_lease=0,
+                 adaptive=False, ci_target=0.02, max_repeat=30):
         super(LocalRunner, self).__init__('', None, None, 0,
                                           timeout=timeout, n_parallel=1,
                                           number=number, repeat=repeat,
                                           min_repeat_ms=min_repeat_ms,
                                           cooldown_interval=cooldown_interval,
-                                          check_correctness=check_correctness)
+                                          check_correctness=check_correctness,
+                                          session_lease=session_lease,
+                                          adaptive=adaptive, ci_target=ci_target,
+                                          max_repeat=max_repeat)
         self.tracker = None
         self.server = None
 
@@ -328,18 +515,21 @@ class LocalRunner(RPCRunner):
         from ...rpc.tracker import Tracker
         from ...rpc.server import Server
 
-        tracker = Tracker('0.0.0.0', port=9000, port_end=10000, silent=True)
-        device_key = '$local$device$%d' % tracker.port
-        server = Server('0.0.0.0', port=9000, port_end=10000,
-                        key=device_key,
-                        use_popen=True, silent=True,
-                        tracker_addr=(tracker.host, tracker.port))
-        self.key = device_key
-        self.host = tracker.host
-        self.port = tracker.port
+        # reuse the tracker and server when switching between tasks
+        if self.tracker is None:
+            tracker = Tracker('0.0.0.0', port=9000, port_end=10000, silent=True)
+            device_key = '$local$device$%d' % tracker.port
+            server = Server('0.0.0.0', port=9000, port_end=10000,
+                            key=device_key,
+                            use_popen=True, silent=True,
+                            tracker_addr=(tracker.host, tracker.port))
+            self.tracker, self.server = tracker, server
+            self.key = device_key
+            self.host = tracker.host
+            self.port = tracker.port
 
         super(LocalRunner, self).set_task(task)
-        return server, tracker
+        return self.server, self.tracker
 
 
 def _build_func_common(measure_input, check_gpu=None, cuda_arch=None, build_option=None):
@@ -370,28 +560,44 @@ def _build_func_common(measure_input, check_gpu=None, cuda_arch=None, build_opti
     return func, tuple((get_const_tuple(x.shape), x.dtype) for x in args)
 
 
-def _wrap_build_func(build_func):
+def _lower_func_common(measure_input, name, check_gpu=None, cuda_arch=None, build_option=None):
+    """Lower a configuration to a function with the given name, to be built with others"""
+    target, task, config = measure_input
+
+    with target:
+        s, args = task.instantiate(config)
+
+        if not config.valid():
+            raise InstantiationError(config.errors)
+
+        opts = dict(build_option or {})
+        if check_gpu:
+            opts["add_lower_pass"] = [(2, gpu_verify_pass(**check_gpu))]
+        if cuda_arch:
+            set_cuda_target_arch(cuda_arch)
+
+        with build_config(**opts):
+            func = lower(s, args, name=name)
+    return func, tuple((get_const_tuple(x.shape), x.dtype) for x in args), opts
+
+
+class _WrappedBuildFunc(object):
     """
-    Wrap build_func to a function that can be used in measure.
+    Wrapped build func. This is a class rather than a closure
+    so that it can be pickled and sent to the workers of PoolExecutor.
 
     Parameters
     ----------
     build_func : The compilation function
         We expect fcompile to contain an attr "output_format"
-
-    Returns
-    -------
-    wrapped_build_func : function
-        The wrapped build function
     """
-    if not hasattr(build_func, "output_format"):
-        raise AttributeError("Expect build_func to have the attribute output_format.")
-    output_format = build_func.output_format
+    def __init__(self, build_func):
+        if not hasattr(build_func, "output_format"):
+            raise AttributeError("Expect build_func to have the attribute output_format.")
+        self.build_func = build_func
 
-    def _wrapped(measure_input, tmp_dir, **kwargs):
+    def __call__(self, measure_input, tmp_dir, **kwargs):
         """
-        Wrapped build func.
-
         Parameters
         ----------
         measure_input: MeasureInput
@@ -403,19 +609,247 @@ def _wrap_build_func(build_func):
         tic = time.time()
         try:
             filename = os.path.join(tmp_dir, "tmp_func_%0x.%s" % (
-                getrandbits(64), output_format))
+                getrandbits(64), self.build_func.output_format))
             # TODO(tvm-team) consider linline _build_func_common
             func, arg_info = _build_func_common(measure_input, **kwargs)
-            func.export_library(filename, build_func)
+            func.export_library(filename, self.build_func)
         except Exception as e:  # pylint: disable=broad-except
             return BuildResult(None, None, e, time.time() - tic)
         return BuildResult(filename, arg_info, None, time.time() - tic)
-    return _wrapped
+
+    def build_batch(self, measure_inputs, tmp_dir, **kwargs):
+        """Build the inputs of one task into one library, one entry function per input.
+
+        An input that fails to instantiate or lower gets its own error. If the
+        library fails to build as a whole, every input is built on its own.
+
+        Parameters
+        ----------
+        measure_inputs: List of MeasureInput
+            The inputs of measurement
+        tmp_dir: str
+            The path of temporary directory to export generated library
+
+        Returns
+        -------
+        build_results: List of BuildResult
+            The build result of every input
+        """
+        target, task = measure_inputs[0].target, measure_inputs[0].task
+        if getattr(target, 'device_name', None) == 'vta':
+            return [self(inp, tmp_dir, **kwargs) for inp in measure_inputs]
+
+        tic = time.time()
+        results = [None] * len(measure_inputs)
+        lowered = []
+        opts = {}
+        for i, inp in enumerate(measure_inputs):
+            itic = time.time()
+            try:
+                func, arg_info, opts = _lower_func_common(inp, "tvm_batch_func_%d" % i, **kwargs)
+                lowered.append((i, func, arg_info))
+            except Exception as e:  # pylint: disable=broad-except
+                results[i] = BuildResult(None, None, e, time.time() - itic)
+        if not lowered:
+            return results
+
+        try:
+            filename = os.path.join(tmp_dir, "tmp_batch_%0x.%s" % (
+                getrandbits(64), self.build_func.output_format))
+            with target:
+                with build_config(**opts):
+                    mod = build([func for _, func, _ in lowered], target_host=task.target_host)
+            mod.export_library(filename, self.build_func)
+        except Exception:  # pylint: disable=broad-except
+            return [res if res is not None else self(inp, tmp_dir, **kwargs)
+                    for inp, res in zip(measure_inputs, results)]
+
+        time_cost = (time.time() - tic) / len(lowered)
+        for i, func, arg_info in lowered:
+            results[i] = BuildResult(filename, arg_info, None, time_cost, func.name)
+        return results
+
+
+def _wrap_build_func(build_func):
+    """
+    Wrap build_func to a function that can be used in measure.
+
+    Parameters
+    ----------
+    build_func : The compilation function
+        We expect fcompile to contain an attr "output_format"
+
+    Returns
+    -------
+    wrapped_build_func : callable
+        The wrapped build function
+    """
+    return _WrappedBuildFunc(build_func)
+
+
+class _SessionLease(object):
+    """A remote session kept by a runner worker process and reused across measurements
+
+    Parameters
+    ----------
+    remote_args: Tuple
+        The argument for request_remote
+    lease_time: float
+        The lifetime of the session in seconds
+    """
+    # remove the uploaded files in bulk when this many files are accumulated
+    MAX_FILES = 128
+
+    def __init__(self, remote_args, lease_time):
+        key, host, port, priority = remote_args[:4]
+        self.remote = request_remote(key, host, port, priority, timeout=lease_time)
+        self.end_time = time.time() + lease_time
+        self.files = []
+
+    def expired(self, timeout):
+        """Whether a call of up to timeout seconds may outlive the lease,
+        so that the server would kill it"""
+        return time.time() + timeout > self.end_time
+
+    def add_files(self, *files):
+        """Record uploaded files. Remove them when there are too many of them."""
+        self.files.extend(files)
+        if len(self.files) > self.MAX_FILES:
+            self.cleanup()
+
+    def cleanup(self):
+        """Remove all uploaded files from the remote work directory"""
+        for filename in self.files:
+            try:
+                self.remote.remove(filename)
+            except TVMError:
+                pass
+        self.files = []
+
+
+# leased sessions of the current worker process, keyed by (key, host, port, priority).
+# The timeout of a call is not part of the key, so calls of any length share one session.
+_SESSION_LEASES = {}
+
+
+def _lease_session(remote_args, lease_time, renew=False):
+    """Get the leased session of this process, request a new one if necessary"""
+    lease = _SESSION_LEASES.pop(remote_args[:4], None)
+    if lease is not None and (renew or lease.expired(remote_args[4])):
+        if not renew:
+            lease.cleanup()
+        lease = None
+    if lease is None:
+        lease = _SessionLease(remote_args, lease_time)
+    _SESSION_LEASES[remote_args[:4]] = lease
+    return lease
+
+
+def _drop_session(remote_args):
+    """Drop the leased session, e.g. after it is broken by an error"""
+    _SESSION_LEASES.pop(remote_args[:4], None)
+
+
+def _upload_library(filename, remote_args, session_lease):
+    """Get a session and upload a library to it, return the session and its lease.
+
+    The library is streamed, so content that the server already has, e.g. in its
+    content cache, is not sent again. Servers without streaming support get a
+    plain upload.
+    """
+    lease = None
+    # a call that does not fit in a lease gets a session of its own
+    if session_lease and remote_args[4] < session_lease:
+        lease = _lease_session(remote_args, session_lease)
+        try:
+            remote = lease.remote
+            remote.upload_stream(filename)
+        except (TVMError, socket.error):
+            # the leased session is dropped, reconnect once
+            lease = _lease_session(remote_args, session_lease, renew=True)
+            remote = lease.remote
+            remote.upload_stream(filename)
+    else:
+        remote = request_remote(*remote_args)
+        remote.upload_stream(filename)
+    return remote, lease
+
+
+def _remove_library(remote, lease, filename):
+    """Remove an uploaded library from the remote work directory"""
+    uploaded = (filename, os.path.splitext(filename)[0] + '.so')
+    if lease is not None:
+        lease.add_files(*[os.path.basename(x) for x in uploaded])
+    else:
+        for name in uploaded:
+            remote.remove(name)
+        remote.remove('')
+
+
+def _create_args(arg_info, ctx, ref_input=None):
+    """Create the arguments of a program on the remote device"""
+    if ref_input:
+        return [nd.array(x, ctx=ctx) for x in ref_input]
+    # create empty arrays on the remote device and copy them once.
+    # This can avoid some memory issues that make the measurement results unreliable.
+    args = [nd.empty(x[0], dtype=x[1], ctx=ctx) for x in arg_info]
+    args = [nd.array(x, ctx=ctx) for x in args]
+    ctx.sync()
+    return args
+
+
+def _trim_costs(costs):
+    """Remove the largest and smallest value to reduce variance"""
+    if len(costs) > 2:
+        costs = sorted(costs)
+        return tuple(costs[1:-1])
+    return tuple(costs)
+
+
+def _measure_adaptive(time_f, args, ci_target, max_repeat, best_cost):
+    """Repeat a measurement until the confidence interval of the mean is tight enough
+
+    Returns the costs and their sample variance. Like a fixed measurement,
+    the largest and smallest costs are dropped, so that results of both
+    kinds are ranked on the same basis.
+    """
+    costs = list(time_f(*args).results)
+    while len(costs) < max_repeat:
+        mean, half = confidence_interval(costs)
+        if half <= ci_target * mean:
+            break
+        # clearly worse than the best config, more costs would not change the ranking
+        if best_cost is not None and mean - half > best_cost:
+            break
+        costs.extend(time_f(*args).results)
+    costs = _trim_costs(costs)
+    variance = float(np.var(costs, ddof=1)) if len(costs) > 1 else 0.0
+    return costs, variance
+
+
+def _runtime_error(exc):
+    """Shorten the message of a runtime error"""
+    msg = str(exc)
+    if "Stack trace returned" in msg:
+        msg = msg[:msg.index("Stack trace returned")]
+    if "CUDA Source" in msg:
+        msg = msg[:msg.index("CUDA Source")]
+    return RuntimeError(msg[:1024])
+
+
+def _check_answer(ref_output, args):
+    """Compare the outputs of a program with the reference"""
+    for expected, real in zip(ref_output, args):
+        if not np.allclose(expected, real.asnumpy(), rtol=1e-4):
+            logger.warning("Wrong Answer!")
+            return MeasureErrorNo.WRONG_ANSWER
+    return MeasureErrorNo.NO_ERROR
 
 
 def run_through_rpc(measure_input, build_result,
                     number, repeat, min_repeat_ms, cooldown_interval,
-                    remote_args, ref_input=None, ref_output=None):
+                    remote_args, ref_input=None, ref_output=None, session_lease=0,
+                    ci_target=0, max_repeat=0, best_cost=None):
     """Run a generated library through rpc
 
     Parameters
@@ -448,66 +882,186 @@ def run_through_rpc(measure_input, build_result,
         The reference input used for checking correctness
     ref_output: List of np.ndarray
         The reference output used for checking correctness
+    session_lease: float, optional
+        If positive, reuse the session leased by this process for up to this many seconds
+    ci_target: float, optional
+        If positive, measure adaptively: repeat until the half width of the 95%
+        confidence interval is within this fraction of the mean
+    max_repeat: int, optional
+        The maximum number of costs of an adaptive measurement
+    best_cost: float, optional
+        The best mean cost so far, an adaptive measurement stops early
+        when the confidence interval lies entirely above it
     """
     if isinstance(build_result, MeasureResult):
         return build_result
 
     tic = time.time()
     errno = MeasureErrorNo.NO_ERROR
+    variance = None
     try:
         # upload built module
-        remote = request_remote(*remote_args)
+        remote, lease = _upload_library(build_result.filename, remote_args, session_lease)
         # Program the FPGA every single time when targeting VTA
         if hasattr(measure_input.target, 'device_name') and \
             measure_input.target.device_name == 'vta':
             from vta import program_fpga, reconfig_runtime
             program_fpga(remote, None)
             reconfig_runtime(remote)
-        remote.upload(build_result.filename)
         func = remote.load_module(os.path.split(build_result.filename)[1])
         ctx = remote.context(str(measure_input.target), 0)
         time_f = func.time_evaluator(
-            func.entry_name, ctx, number=number, repeat=repeat, min_repeat_ms=min_repeat_ms)
+            build_result.entry_name or func.entry_name, ctx,
+            number=number, repeat=repeat, min_repeat_ms=min_repeat_ms)
 
         # set input
-        if ref_input:
-            args = [nd.array(x, ctx=ctx) for x in ref_input]
-        else:
-            # create empty arrays on the remote device and copy them once.
-            # This can avoid some memory issues that make the measurement results unreliable.
-            args = [nd.empty(x[0], dtype=x[1], ctx=ctx) for x in build_result.arg_info]
-            args = [nd.array(x, ctx=ctx) for x in args]
-            ctx.sync()
+        args = _create_args(build_result.arg_info, ctx, ref_input)
 
-        costs = time_f(*args).results
+        if ci_target:
+            costs, variance = _measure_adaptive(time_f, args, ci_target, max_repeat, best_cost)
+        else:
+            costs = _trim_costs(time_f(*args).results)
 
         # clean up remote files
-        remote.remove(build_result.filename)
-        remote.remove(os.path.splitext(build_result.filename)[0] + '.so')
-        remote.remove('')
-
-        if len(costs) > 2:  # remove largest and smallest value to reduce variance
-            costs = list(costs)
-            costs.sort()
-            costs = tuple(costs[1:-1])
+        _remove_library(remote, lease, build_result.filename)
 
         # check correctness of output
         if ref_output:
-            for expected, real in zip(ref_output, args):
-                if not np.allclose(expected, real.asnumpy(), rtol=1e-4):
-                    logger.warning("Wrong Answer!")
-                    errno = MeasureErrorNo.WRONG_ANSWER
+            errno = _check_answer(ref_output, args)
     except TVMError as exc:
-        msg = str(exc)
-        if "Stack trace returned" in msg:
-            msg = msg[:msg.index("Stack trace returned")]
-        if "CUDA Source" in msg:
-            msg = msg[:msg.index("CUDA Source")]
-        costs = (RuntimeError(msg[:1024]),)
+        costs = (_runtime_error(exc),)
         errno = MeasureErrorNo.RUNTIME_DEVICE
+        if session_lease:
+            # the device may be left in a bad state, start the next measurement freshly
+            _drop_session(remote_args)
+    tstamp = time.time()
+    time.sleep(cooldown_interval)
+    return MeasureResult(costs, errno, tstamp - tic + build_result.time_cost, tstamp, variance)
+
+
+def run_batch_through_rpc(measure_inputs, build_results,
+                          number, repeat, min_repeat_ms, cooldown_interval,
+                          remote_args, ref_input=None, ref_output=None, session_lease=0,
+                          ci_target=0, max_repeat=0, best_cost=None):
+    """Run the programs packed into one library through rpc
+
+    The library is uploaded and loaded once, and the arguments are allocated
+    once for every distinct signature. Without a correctness check, all the
+    programs are timed in one remote call when the server supports it.
+
+    Parameters
+    ----------
+    measure_inputs: List of MeasureInput
+        The raw measure inputs
+    build_results: List of BuildResult
+        The results returned from Builder, sharing the same library
+        with a distinct entry_name each.
+    number: int
+        The number of times to run the generated code for taking average.
+    repeat : int, optional
+        The number of times to repeat the measurement.
+    min_repeat_ms: int, optional
+        The minimum duration of one `repeat` in milliseconds.
+    cooldown_interval: float
+        The cool down interval between two measurements
+    remote_args: Tuple
+        The argument for request_remote
+    ref_input: List of np.ndarray
+        The reference input used for checking correctness
+    ref_output: List of np.ndarray
+        The reference output used for checking correctness
+    session_lease: float, optional
+        If positive, reuse the session leased by this process for up to this many seconds
+    ci_target: float, optional
+        If positive, measure every program adaptively, see :any:`run_through_rpc`
+    max_repeat: int, optional
+        The maximum number of costs of an adaptive measurement
+    best_cost: float, optional
+        The best mean cost so far, used to stop adaptive measurements early
+
+    Returns
+    -------
+    results: List of MeasureResult
+        The result of every program
+    """
+    tic = time.time()
+    filename = build_results[0].filename
+    try:
+        remote, lease = _upload_library(filename, remote_args, session_lease)
+        func = remote.load_module(os.path.split(filename)[1])
+        ctx = remote.context(str(measure_inputs[0].target), 0)
+
+        arg_sets = OrderedDict()
+        for res in build_results:
+            if res.arg_info not in arg_sets:
+                arg_sets[res.arg_info] = _create_args(res.arg_info, ctx, ref_input)
+
+        ftime = None
+        if not ref_output and not ci_target:
+            try:
+                ftime = remote.get_function("tvm.rpc.server.time_batch")
+            except (AttributeError, TVMError):
+                ftime = None
+
+        outcomes = []
+        if ftime is not None:
+            # pass every argument once, the functions refer to them by index
+            arrays, offsets = [], {}
+            for arg_info, args in arg_sets.items():
+                offsets[arg_info] = len(arrays)
+                arrays.extend(args)
+            spec = {
+                "funcs": [[res.entry_name,
+                           list(range(offsets[res.arg_info],
+                                      offsets[res.arg_info] + len(res.arg_info)))]
+                          for res in build_results],
+                "device_type": ctx.device_type % _rpc.base.RPC_SESS_MASK,
+                "device_id": ctx.device_id,
+                "number": number,
+                "repeat": repeat,
+                "min_repeat_ms": min_repeat_ms,
+                "cooldown_interval": cooldown_interval,
+            }
+            for item in json.loads(ftime(func, json.dumps(spec), *arrays)):
+                if isinstance(item, list):
+                    outcomes.append((_trim_costs(item), MeasureErrorNo.NO_ERROR, None))
+                else:
+                    outcomes.append(((_runtime_error(item),), MeasureErrorNo.RUNTIME_DEVICE,
+                                     None))
+        else:
+            for res in build_results:
+                args = arg_sets[res.arg_info]
+                try:
+                    time_f = func.time_evaluator(
+                        res.entry_name, ctx, number=number, repeat=repeat,
+                        min_repeat_ms=min_repeat_ms)
+                    variance = None
+                    if ci_target:
+                        costs, variance = _measure_adaptive(time_f, args, ci_target,
+                                                            max_repeat, best_cost)
+                    else:
+                        costs = _trim_costs(time_f(*args).results)
+                    errno = _check_answer(ref_output, args) if ref_output \
+                        else MeasureErrorNo.NO_ERROR
+                    outcomes.append((costs, errno, variance))
+                except TVMError as exc:
+                    outcomes.append(((_runtime_error(exc),), MeasureErrorNo.RUNTIME_DEVICE,
+                                     None))
+                time.sleep(cooldown_interval)
+
+        _remove_library(remote, lease, filename)
+    except TVMError as exc:
+        outcomes = [((_runtime_error(exc),), MeasureErrorNo.RUNTIME_DEVICE, None)] \
+            * len(build_results)
+    # the device may be left in a bad state, start the next measurement freshly
+    if session_lease and any(errno == MeasureErrorNo.RUNTIME_DEVICE for _, errno, _ in outcomes):
+        _drop_session(remote_args)
+
     tstamp = time.time()
     time.sleep(cooldown_interval)
-    return MeasureResult(costs, errno, tstamp - tic + build_result.time_cost, tstamp)
+    run_cost = (tstamp - tic) / len(build_results)
+    return [MeasureResult(costs, errno, run_cost + res.time_cost, tstamp, variance)
+            for (costs, errno, variance), res in zip(outcomes, build_results)]
 
 
 def request_remote(device_key, host=None, port=None, priority=1, timeout=60):
@@ -49,6 +49,19 @@ except NameError:
     _long = int
 
 
+def clean_json_to_python(x):
+    """1. Convert all list in x to tuple (hashable)
+       2. Convert unicode to str for python2
+    """
+    if isinstance(x, list):
+        return tuple([clean_json_to_python(a) for a in x])
+    if isinstance(x, _unicode):
+        return str(x)
+    if isinstance(x, (_long, int)):
+        return int(x)
+    return x
+
+
 def measure_str_key(inp, include_config=True):
     """ get unique str key for MeasureInput
 
@@ -100,6 +113,9 @@ def encode(inp, result, protocol='json'):
 
             "v": AUTOTVM_LOG_VERSION
         }
+        if result.variance is not None:
+            # a key of its own, so that older versions can still read "r"
+            json_dict["var"] = result.variance
         return json.dumps(json_dict)
     if protocol == 'pickle':
         row = (str(inp.target),
@@ -108,7 +124,9 @@ def encode(inp, result, protocol='json'):
                                                   inp.task.kwargs,
                                                   inp.task.workload])).decode()),
                str(base64.b64encode(pickle.dumps(inp.config)).decode()),
-               str(base64.b64encode(pickle.dumps(tuple(result))).decode()))
+               str(base64.b64encode(pickle.dumps(tuple(result[:4]))).decode()))
+        if result.variance is not None:
+            row += (repr(result.variance),)
         return '\t'.join(row)
 
     raise RuntimeError("Invalid log protocol: " + protocol)
@@ -135,23 +153,13 @@ def decode(row, protocol='json'):
         tgt, task_name, task_args, task_kwargs, workload, config = row['i']
         tgt = _target.create(str(tgt))
 
-        def clean_json_to_python(x):
-            """1. Convert all list in x to tuple (hashable)
-               2. Convert unicode to str for python2
-            """
-            if isinstance(x, list):
-                return tuple([clean_json_to_python(a) for a in x])
-            if isinstance(x, _unicode):
-                return str(x)
-            if isinstance(x, (_long, int)):
-                return int(x)
-            return x
-
         tsk = task.Task(clean_json_to_python(task_name), clean_json_to_python(task_args))
         tsk.workload = clean_json_to_python(workload)
         config = ConfigEntity.from_json_dict(config)
         inp = MeasureInput(tgt, tsk, config)
         result = MeasureResult(*[tuple(x) if isinstance(x, list) else x for x in row["r"]])
+        if "var" in row:
+            result = result._replace(variance=row["var"])
 
         return inp, result
     if protocol == 'pickle':
@@ -159,11 +167,13 @@ def decode(row, protocol='json'):
         tgt = _target.create(items[0])
         task_tuple = pickle.loads(base64.b64decode(items[1].encode()))
         config = pickle.loads(base64.b64decode(items[2].encode()))
-        result = pickle.loads(base64.b64decode(items[3].encode()))
+        result = MeasureResult(*pickle.loads(base64.b64decode(items[3].encode())))
+        if len(items) > 4:
+            result = result._replace(variance=float(items[4]))
 
         tsk = task.Task(task_tuple[0], task_tuple[1])
         tsk.workload = task_tuple[3]
-        return MeasureInput(tgt, tsk, config), MeasureResult(*result)
+        return MeasureInput(tgt, tsk, config), result
 
     raise RuntimeError("Invalid log protocol: " + protocol)
 
@@ -284,10 +294,13 @@ e.g. python -m tvm.autotvm.record --mode pick --i collect.log
 
 * Split a log file into separate files, each of which contains only a single wkl
 e.g. python -m tvm.autotvm.record --mode split --i collect.log
+
+* Convert a log file into an indexed record store
+e.g. python -m tvm.autotvm.record --mode index --i collect.log --o collect.store
 """
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", choices=['read', 'pick', 'split'], default='read')
+    parser.add_argument("--mode", choices=['read', 'pick', 'split', 'index'], default='read')
     parser.add_argument("--i", type=str, help="input file")
     parser.add_argument("--o", type=str, default=None, help='output file')
     parser.add_argument("--begin", type=int, default=0)
@@ -321,3 +334,7 @@ if __name__ == '__main__':
                         print(func.imported_modules[0].get_source())
     elif args.mode == 'split':
         split_workload(args.i)
+    elif args.mode == 'index':
+        from .database import convert_to_store
+        args.o = args.o or args.i + ".store"
+        convert_to_store(args.i, args.o).close()
@@ -30,14 +30,15 @@ of the DispatchContext base class.
 
 from __future__ import absolute_import as _abs
 
+import json
 import logging
+from collections import OrderedDict
 
-import numpy as np
 from decorator import decorate
 
 from tvm import target as _target
 
-from .space import FallbackConfigEntity
+from .space import FallbackConfigEntity, ConfigEntity
 
 logger = logging.getLogger('autotvm')
 
@@ -255,18 +256,43 @@ class ApplyHistoryBest(DispatchContext):
 
     Parameters
     ----------
-    records : str or iterator of (MeasureInput, MeasureResult)
+    records : str or iterator of (MeasureInput, MeasureResult) or RecordStore
         Collection of tuning records.
-        If is str, then it should be the filename of a records log file.
+        If is str, then it should be the filename of a records log file
+                   or the directory of a :any:`RecordStore`.
                    Each row of this file is an encoded record pair.
+        If is a RecordStore, records are fetched from its index on demand.
         Otherwise, it is an iterator.
+    lazy : bool, optional
+        Whether to load log files lazily. In lazy mode a log file is streamed once
+        to build an index from (target key, workload) to the byte offset of the best row,
+        and the config of a row is only decoded when it is first queried.
+        This mode does not fill `best_by_targetkey` and `best_by_model`.
+    cache_size : int, optional
+        The maximum number of decoded configs kept in lazy mode.
+    statistic : str, optional
+        The statistic of the measured costs used to pick the best config,
+        "mean", "median" or "upper". See :any:`autotvm.measure.result_cost`.
+        If is None, use `autotvm.env.GLOBAL_SCOPE.cost_statistic`.
+        A RecordStore always ranks its records by the mean cost.
     """
-    def __init__(self, records):
+    def __init__(self, records, lazy=False, cache_size=1024, statistic=None):
         super(ApplyHistoryBest, self).__init__()
 
         self.best_by_targetkey = {}
         self.best_by_model = {}
         self._best_user_defined = {}
+        self._stores = []
+        self._owned_stores = []
+        self._closed_store_paths = []
+        self._store_hits = {}
+
+        self.lazy = lazy
+        self.cache_size = cache_size
+        self.statistic = statistic
+        self._lazy_by_targetkey = {}
+        self._lazy_by_model = {}
+        self._lazy_cache = OrderedDict()
 
         if records:
             self.load(records)
@@ -276,20 +302,36 @@ class ApplyHistoryBest(DispatchContext):
 
         Parameters
         ----------
-        records : str or iterator of (MeasureInput, MeasureResult)
+        records : str or iterator of (MeasureInput, MeasureResult) or RecordStore
             Collection of tuning records.
-            If is str, then it should be the filename of a records log file.
+            If is str, then it should be the filename of a records log file
+                       or the directory of a :any:`RecordStore`.
                        Each row of this file is an encoded record pair.
+            If is a RecordStore, records are fetched from its index on demand.
             Otherwise, it is an iterator.
         """
+        import os
         from pathlib import Path
         from ..record import load_from_file
+        from ..database import RecordStore
+        from ..measure.measure import result_cost
 
         if isinstance(records, Path):
             records = str(records)
 
         if isinstance(records, str):
-            records = load_from_file(records)
+            if os.path.isdir(records):
+                records = RecordStore(records, readonly=True)
+                self._owned_stores.append(records)
+            elif self.lazy:
+                self._load_lazy(records)
+                return
+            else:
+                records = load_from_file(records)
+        if isinstance(records, RecordStore):
+            self._stores.append(records)
+            self._store_hits.clear()
+            return
         if not records:
             return
 
@@ -309,7 +351,7 @@ class ApplyHistoryBest(DispatchContext):
                     best_by_targetkey[key] = (inp, res)
                 else:
                     _, other_res = best_by_targetkey[key]
-                    if np.mean(other_res.costs) > np.mean(res.costs):
+                    if result_cost(other_res, self.statistic) > result_cost(res, self.statistic):
                         best_by_targetkey[key] = (inp, res)
 
             # use model as key to build best map
@@ -319,11 +361,71 @@ class ApplyHistoryBest(DispatchContext):
                     best_by_model[key] = (inp, res)
             else:
                 _, other_res = best_by_model[key]
-                if np.mean(other_res.costs) > np.mean(res.costs):
+                if result_cost(other_res, self.statistic) > result_cost(res, self.statistic):
                     best_by_model[key] = (inp, res)
 
         logger.debug("Finish loading %d records", counter)
 
+    def _load_lazy(self, filename):
+        """Stream a log file once and index the offset of the best row per key"""
+        from ..record import clean_json_to_python
+        from ..measure.measure import MeasureResult, result_cost
+
+        targets = {}
+        by_targetkey = self._lazy_by_targetkey
+        by_model = self._lazy_by_model
+
+        def _update(index, key, cost, offset):
+            if key not in index or index[key][0] > cost:
+                index[key] = (cost, filename, offset)
+
+        counter = 0
+        offset = 0
+        with open(filename, 'rb') as fin:
+            for line in fin:
+                row_offset = offset
+                offset += len(line)
+                if not line.strip() or line.startswith(b'#'):
+                    continue
+                counter += 1
+                row = json.loads(line.decode())
+                error_no = row['r'][1]
+                if error_no != 0:
+                    continue
+                tgt_str, workload = row['i'][0], row['i'][4]
+                if tgt_str not in targets:
+                    targets[tgt_str] = _target.create(str(tgt_str))
+                tgt = targets[tgt_str]
+                workload = clean_json_to_python(workload)
+                cost = result_cost(MeasureResult(*row['r']), self.statistic)
+
+                for k in tgt.keys:
+                    _update(by_targetkey, (k, workload), cost, row_offset)
+                if tgt.model != 'unknown':
+                    _update(by_model, (tgt.model, workload), cost, row_offset)
+
+        self._lazy_cache.clear()
+        logger.debug("Finish indexing %d records", counter)
+
+    def _query_lazy(self, index, key):
+        """Decode the config of an indexed row, with a bounded LRU cache"""
+        if key not in index:
+            return None
+        _, filename, offset = index[key]
+        cache_key = (filename, offset)
+        if cache_key in self._lazy_cache:
+            self._lazy_cache.move_to_end(cache_key)
+            return self._lazy_cache[cache_key]
+
+        with open(filename, 'rb') as fin:
+            fin.seek(offset)
+            row = json.loads(fin.readline().decode())
+        cfg = ConfigEntity.from_json_dict(row['i'][5])
+        self._lazy_cache[cache_key] = cfg
+        if len(self._lazy_cache) > self.cache_size:
+            self._lazy_cache.popitem(last=False)
+        return cfg
+
     def _query_inside(self, target, workload):
         if target is None:
             raise RuntimeError("Need a target context to find the history best. "
@@ -336,6 +438,9 @@ class ApplyHistoryBest(DispatchContext):
             return self._best_user_defined[key]
         if key in self.best_by_model:
             return self.best_by_model[key][0].config
+        cfg = self._query_lazy(self._lazy_by_model, key)
+        if cfg is not None:
+            return cfg
 
         # then try matching by target key
         for k in target.keys:
@@ -344,6 +449,21 @@ class ApplyHistoryBest(DispatchContext):
                 return self._best_user_defined[key]
             if key in self.best_by_targetkey:
                 return self.best_by_targetkey[key][0].config
+            cfg = self._query_lazy(self._lazy_by_targetkey, key)
+            if cfg is not None:
+                return cfg
+
+        # finally fetch from the indexed record stores
+        if self._stores:
+            key = (str(target), workload)
+            if key not in self._store_hits:
+                self._store_hits[key] = None
+                for store in self._stores:
+                    record = store.query_best(target, workload)
+                    if record is not None:
+                        self._store_hits[key] = record[0].config
+                        break
+            return self._store_hits[key]
 
         return None
 
@@ -356,6 +476,30 @@ class ApplyHistoryBest(DispatchContext):
             key = (k, workload)
             self._best_user_defined[key] = cfg
 
+    def close(self):
+        """Close the record stores opened by this context from a directory.
+        Stores passed in by the caller are left open.
+        Closed stores are reopened when the context is entered again."""
+        for store in self._owned_stores:
+            store.close()
+            self._stores.remove(store)
+            self._closed_store_paths.append(store.path)
+        self._owned_stores = []
+        self._store_hits.clear()
+
+    def __enter__(self):
+        from ..database import RecordStore
+        for path in self._closed_store_paths:
+            store = RecordStore(path, readonly=True)
+            self._owned_stores.append(store)
+            self._stores.append(store)
+        self._closed_store_paths = []
+        return super(ApplyHistoryBest, self).__enter__()
+
+    def __exit__(self, ptype, value, trace):
+        super(ApplyHistoryBest, self).__exit__(ptype, value, trace)
+        self.close()
+
 
 class FallbackContext(DispatchContext):
     """
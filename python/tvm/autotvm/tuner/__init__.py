@@ -28,3 +28,4 @@ from .tuner import Tuner
 from .gridsearch_tuner import GridSearchTuner, RandomTuner
 from .ga_tuner import GATuner
 from .xgboost_tuner import XGBTuner
+from .task_scheduler import TaskScheduler
@@ -23,6 +23,7 @@ import logging
 import numpy as np
 
 from .. import record
+from ..measure import result_cost
 
 logger = logging.getLogger('autotvm')
 
@@ -65,8 +66,9 @@ def log_to_database(db):
 
     Parameters
     ----------
-    db: Database
-        The database
+    db: Database or RecordStore
+        The database. A :any:`RecordStore` appends every record to its data file
+        and keeps its best-config index up to date.
     """
     def _callback(_, inputs, results):
         """Callback implementation"""
@@ -84,7 +86,7 @@ class Monitor(object):
     def __call__(self, tuner, inputs, results):
         for inp, res in zip(inputs, results):
             if res.error_no == 0:
-                flops = inp.task.flop / np.mean(res.costs)
+                flops = inp.task.flop / result_cost(res)
                 self.scores.append(flops)
             else:
                 self.scores.append(0)
@@ -140,7 +142,7 @@ def progress_bar(total, prefix=''):
         flops = 0
         for inp, res in zip(inputs, results):
             if res.error_no == 0:
-                flops = inp.task.flop / np.mean(res.costs)
+                flops = inp.task.flop / result_cost(res)
 
         if logger.level < logging.DEBUG:  # only print progress bar in non-debug mode
             ctx.cur_flops = flops
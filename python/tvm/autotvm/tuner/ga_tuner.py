@@ -20,6 +20,7 @@
 
 import numpy as np
 
+from ..measure import result_cost
 from .tuner import Tuner
 from .model_based_tuner import knob2point, point2knob
 
@@ -84,7 +85,7 @@ class GATuner(Tuner):
     def update(self, inputs, results):
         for inp, res in zip(inputs, results):
             if res.error_no == 0:
-                y = inp.task.flop / np.mean(res.costs)
+                y = inp.task.flop / result_cost(res)
                 self.scores.append(y)
             else:
                 self.scores.append(0.0)
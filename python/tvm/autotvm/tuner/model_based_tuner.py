@@ -20,9 +20,19 @@ This type of tuner will fit a cost model and use some optimization methods to
 find optimums points of cost model in space.
 """
 import gc
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 import numpy as np
 
+from ..measure import result_cost
 from .tuner import Tuner
 from ..env import GLOBAL_SCOPE
 
@@ -76,6 +86,213 @@ class FeatureCache(object):
         gc.collect()
 
 
+class _FeatureTable(object):
+    """A dict-like, memory-mapped feature table from config index to feature vector.
+
+    The rows are stored in ``.npy`` files opened with :any:`numpy.lib.format.open_memmap`,
+    so the table survives across processes and can be opened by other processes.
+    When the table is full, the least recently used 10% of rows are evicted.
+
+    The first process to open a table holds an exclusive lock on it and is its only
+    writer. Other processes map it read-only and keep their new features in memory.
+    As the writer reuses the rows of evicted configs, the key of a row is checked on
+    every read, and a mismatch is a miss.
+
+    Parameters
+    ----------
+    path: str
+        The directory of the table
+    capacity: int
+        The maximum number of rows
+    """
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        self.features = self.keys = self.valid = self.stamps = None
+        self.writable = False
+        self._lock_file = None
+        self._lock_tried = False
+        self._rows = {}
+        self._free = []
+        self._tick = 0
+        # features with an unexpected length, failures before the length is known
+        # and the features added by a process that is not the writer
+        self._overflow = {}
+        if os.path.isfile(os.path.join(path, "meta.json")):
+            self._open()
+
+    def _lock(self):
+        """take the writer lock of the table if it is free"""
+        if fcntl is None:
+            self.writable = True
+            return
+        self._lock_file = open(os.path.join(self.path, "lock"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.writable = True
+        except (IOError, OSError):
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _open(self, feature_len=None):
+        """open the memory-mapped files, create them if feature_len is given"""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        if not self._lock_tried:
+            self._lock_tried = True
+            self._lock()
+        meta_file = os.path.join(self.path, "meta.json")
+        if os.path.isfile(meta_file):
+            with open(meta_file) as fin:
+                meta = json.load(fin)
+            mode = 'r+' if self.writable else 'r'
+            feature_len, self.capacity = meta['feature_len'], meta['capacity']
+        elif feature_len is not None and self.writable:
+            mode = 'w+'
+        else:
+            return
+
+        def _memmap(name, dtype, shape):
+            return np.lib.format.open_memmap(os.path.join(self.path, name), mode=mode,
+                                             dtype=dtype, shape=shape)
+        self.features = _memmap("features.npy", 'float32', (self.capacity, feature_len))
+        self.keys = _memmap("keys.npy", 'int64', (self.capacity,))
+        self.valid = _memmap("valid.npy", 'bool', (self.capacity,))
+        self.stamps = _memmap("stamps.npy", 'int64', (self.capacity,))
+
+        if mode == 'w+':
+            self.keys[:] = -1
+            self.flush()
+            with open(meta_file, 'w') as fout:
+                json.dump({'feature_len': feature_len, 'capacity': self.capacity}, fout)
+
+        occupied = np.nonzero(self.keys >= 0)[0]
+        self._rows = dict(zip(self.keys[occupied].tolist(), occupied.tolist()))
+        self._free = np.nonzero(self.keys < 0)[0].tolist()[::-1]
+        self._tick = int(np.max(self.stamps)) + 1 if self.capacity else 0
+
+    def _evict(self):
+        """evict the least recently used rows"""
+        n_evict = max(1, self.capacity // 10)
+        stamps = np.where(self.keys >= 0, self.stamps, np.iinfo(np.int64).max)
+        for row in np.argpartition(stamps, n_evict - 1)[:n_evict].tolist():
+            del self._rows[int(self.keys[row])]
+            self.keys[row] = -1
+            self._free.append(row)
+
+    def __contains__(self, index):
+        if index in self._overflow:
+            return True
+        row = self._rows.get(index)
+        return row is not None and self.keys[row] == index
+
+    def __len__(self):
+        return len(self._rows) + len(self._overflow)
+
+    def __getitem__(self, index):
+        if index in self._overflow:
+            return self._overflow[index]
+        row = self._rows[index]
+        if self.keys[row] == index:
+            fea = np.array(self.features[row]) if self.valid[row] else None
+            # the writer may have reused the row while it was copied
+            if self.keys[row] == index:
+                if self.writable:
+                    self.stamps[row] = self._tick
+                    self._tick += 1
+                return fea
+        del self._rows[index]
+        raise KeyError(index)
+
+    def __setitem__(self, index, fea):
+        if self.features is None and fea is not None:
+            self._open(len(fea))
+        if not self.writable or self.features is None or \
+                (fea is not None and len(fea) != self.features.shape[1]):
+            # the caller may reuse the memory of fea
+            self._overflow[index] = np.array(fea) if fea is not None else None
+            return
+
+        if index in self._rows:
+            row = self._rows[index]
+        else:
+            if not self._free:
+                self._evict()
+            row = self._free.pop()
+            self._rows[index] = row
+        # readers see the row as free until it is complete
+        self.keys[row] = -1
+        self.valid[row] = fea is not None
+        self.features[row] = fea if fea is not None else 0
+        self.stamps[row] = self._tick
+        self._tick += 1
+        self.keys[row] = index
+
+    def flush(self):
+        """flush the memory-mapped files to disk"""
+        if self.features is not None and self.writable:
+            for arr in (self.features, self.keys, self.valid, self.stamps):
+                arr.flush()
+
+    def close(self):
+        """flush the table and release the writer lock"""
+        self.flush()
+        self.features = self.keys = self.valid = self.stamps = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.writable = self._lock_tried = False
+
+
+class PersistentFeatureCache(FeatureCache):
+    """On-disk feature cache that can be reused across tuning sessions.
+
+    Features of a task are stored per (target, workload, feature type) in
+    memory-mapped NumPy files under `cache_dir`, so a new session for the same
+    workload does not extract them again. Each table keeps at most `max_entries`
+    rows and evicts the least recently used ones when it is full.
+
+    Parameters
+    ----------
+    cache_dir: str
+        The directory of the cache
+    task: Task
+        The tuning task
+    max_entries: int, optional
+        The maximum number of cached configs per feature type
+    """
+    def __init__(self, cache_dir, task, max_entries=100000):
+        super(PersistentFeatureCache, self).__init__()
+        self.cache_dir = cache_dir
+        self.task = task
+        self.max_entries = max_entries
+
+    def _table_path(self, key):
+        name = json.dumps([str(self.task.target), self.task.workload, key])
+        return os.path.join(self.cache_dir, hashlib.sha1(name.encode()).hexdigest())
+
+    def get(self, key):
+        if key not in self.feature_cache:
+            self.feature_cache[key] = _FeatureTable(self._table_path(key), self.max_entries)
+        return self.feature_cache[key]
+
+    def size(self, key):
+        # the table of a key may be on disk before it is used in this session
+        return len(self.get(key))
+
+    def clear(self, key):
+        table = self.feature_cache.pop(key, None)
+        if table is not None:
+            table.close()
+        shutil.rmtree(self._table_path(key), ignore_errors=True)
+        gc.collect()
+
+    def flush(self):
+        """flush all tables to disk"""
+        for table in self.feature_cache.values():
+            table.flush()
+
+
 class CostModel(object):
     """Cost model to predict the speed of a config"""
     def __init__(self):
@@ -253,7 +470,7 @@ class ModelBasedTuner(Tuner):
             index = inp.config.index
             if res.error_no == 0:
                 self.xs.append(index)
-                flops = inp.task.flop / np.mean(res.costs)
+                flops = inp.task.flop / result_cost(res)
                 self.flops_max = max(self.flops_max, flops)
                 self.ys.append(flops)
             else:
@@ -322,6 +539,45 @@ def knob2point(knob, dims):
     return p
 
 
+def point2knob_batch(points, dims):
+    """convert a batch of points to knob form, vectorized version of point2knob
+
+    Parameters
+    ----------
+    points: Array of int
+        The points, shape (n,)
+    dims: Array of int
+        sizes of each dimension
+
+    Returns
+    -------
+    knobs: np.ndarray
+        The knobs, shape (n, len(dims))
+    """
+    points = np.asarray(points, dtype=np.int64)
+    strides = np.cumprod([1] + list(dims[:-1])).astype(np.int64)
+    return (points[:, None] // strides) % np.asarray(dims, dtype=np.int64)
+
+
+def knob2point_batch(knobs, dims):
+    """convert a batch of knobs to point form, vectorized version of knob2point
+
+    Parameters
+    ----------
+    knobs: np.ndarray
+        The knobs, shape (n, len(dims))
+    dims: Array of int
+        sizes of each dimension
+
+    Returns
+    -------
+    points: np.ndarray
+        The points, shape (n,)
+    """
+    strides = np.cumprod([1] + list(dims[:-1])).astype(np.int64)
+    return np.asarray(knobs, dtype=np.int64).dot(strides)
+
+
 def submodular_pick(scores, knobs, n_pick, knob_weight=1.0):
     """Run greedy optimization to pick points with regard to both score and diversity.
     DiversityScore = knob_weight * number of unique knobs in the selected set
@@ -19,14 +19,14 @@
 Cost model optimizer based on simulated annealing
 """
 
-import heapq
 import logging
 import time
 
 import numpy as np
 
 from ..util import sample_ints
-from .model_based_tuner import ModelOptimizer, knob2point, point2knob
+from .model_based_tuner import ModelOptimizer, knob2point, point2knob, \
+    knob2point_batch, point2knob_batch
 
 logger = logging.getLogger('autotvm')
 
@@ -74,17 +74,13 @@ class SimulatedAnnealingOptimizer(ModelOptimizer):
 
         scores = model.predict(points)
 
-        # build heap and insert initial points
-        heap_items = [(float('-inf'), - 1 - i) for i in range(num)]
-        heapq.heapify(heap_items)
-        in_heap = set(exclusive)
-        in_heap.update([x[1] for x in heap_items])
+        # keep the top-k points in two arrays, initialized with placeholder points
+        top_scores = np.full(num, float('-inf'))
+        top_points = -1 - np.arange(num, dtype=np.int64)
+        exclusive = np.array(list(exclusive), dtype=np.int64)
 
-        for s, p in zip(scores, points):
-            if s > heap_items[0][0] and p not in in_heap:
-                pop = heapq.heapreplace(heap_items, (s, p))
-                in_heap.remove(pop[1])
-                in_heap.add(p)
+        top_scores, top_points, _ = _update_top_k(top_scores, top_points,
+                                                  scores, points, exclusive)
 
         k = 0
         k_last_modify = 0
@@ -97,9 +93,7 @@ class SimulatedAnnealingOptimizer(ModelOptimizer):
             cool = 0
 
         while k < n_iter and k < k_last_modify + early_stop:
-            new_points = np.empty_like(points)
-            for i, p in enumerate(points):
-                new_points[i] = random_walk(p, self.dims)
+            new_points = random_walk_batch(points, self.dims)
 
             new_scores = model.predict(new_points)
 
@@ -109,12 +103,10 @@ class SimulatedAnnealingOptimizer(ModelOptimizer):
             points[ac_index] = new_points[ac_index]
             scores[ac_index] = new_scores[ac_index]
 
-            for s, p in zip(new_scores, new_points):
-                if s > heap_items[0][0] and p not in in_heap:
-                    pop = heapq.heapreplace(heap_items, (s, p))
-                    in_heap.remove(pop[1])
-                    in_heap.add(p)
-                    k_last_modify = k
+            top_scores, top_points, modified = _update_top_k(top_scores, top_points,
+                                                             new_scores, new_points, exclusive)
+            if modified:
+                k_last_modify = k
 
             k += 1
             t -= cool
@@ -123,12 +115,12 @@ class SimulatedAnnealingOptimizer(ModelOptimizer):
                 t_str = "%.2f" % t
                 logger.debug("SA iter: %d\tlast_update: %d\tmax-0: %.2f\tmax-1: %.2f\ttemp: %s\t"
                              "elapsed: %.2f",
-                             k, k_last_modify, heap_items[0][0],
-                             np.max([v for v, _ in heap_items]), t_str,
+                             k, k_last_modify, np.min(top_scores),
+                             np.max(top_scores), t_str,
                              time.time() - tic)
 
-        heap_items.sort(key=lambda item: -item[0])
-        heap_items = [x for x in heap_items if x[0] >= 0]
+        order = np.argsort(-top_scores, kind='stable')
+        heap_items = [(top_scores[i], int(top_points[i])) for i in order if top_scores[i] >= 0]
         logger.debug("SA iter: %d\tlast_update: %d\telapsed: %.2f",
                      k, k_last_modify, time.time() - tic)
         logger.debug("SA Maximums: %s", heap_items)
@@ -138,6 +130,88 @@ class SimulatedAnnealingOptimizer(ModelOptimizer):
 
         return [x[1] for x in heap_items]
 
+
+def _update_top_k(top_scores, top_points, scores, points, exclusive):
+    """Merge scored points into the current top-k set
+
+    Parameters
+    ----------
+    top_scores: np.ndarray
+        Scores of the current top-k points
+    top_points: np.ndarray
+        The current top-k points
+    scores: np.ndarray
+        Scores of the new points
+    points: np.ndarray
+        The new points
+    exclusive: np.ndarray
+        Points that are not allowed in the top-k set
+
+    Returns
+    -------
+    top_scores: np.ndarray
+        Scores of the new top-k points
+    top_points: np.ndarray
+        The new top-k points
+    modified: bool
+        Whether any new point entered the top-k set
+    """
+    num = len(top_scores)
+    if num == 0:
+        return top_scores, top_points, False
+
+    # a new point must beat the current minimum and must not be kept or excluded already
+    mask = (scores > np.min(top_scores)) & ~np.isin(points, top_points)
+    if len(exclusive):
+        mask &= ~np.isin(points, exclusive)
+    if not np.any(mask):
+        return top_scores, top_points, False
+    points, index = np.unique(points[mask], return_index=True)
+    scores = scores[mask][index]
+
+    all_scores = np.concatenate([top_scores, scores])
+    all_points = np.concatenate([top_points, points])
+    keep = np.argpartition(-all_scores, num - 1)[:num]
+    return all_scores[keep], all_points[keep], bool(np.any(keep >= num))
+
+
+def random_walk_batch(points, dims):
+    """random walk as local transition for a batch of points.
+    Every point moves to a random neighbor that differs in exactly one knob,
+    with the same distribution as :any:`random_walk`.
+
+    Parameters
+    ----------
+    points: np.ndarray
+        indexes of the ConfigEntity, shape (n,)
+    dims: Array of int
+        sizes of each dimension
+
+    Returns
+    -------
+    new_points: np.ndarray
+        new neighborhood indexes, shape (n,)
+    """
+    dims = np.asarray(dims, dtype=np.int64)
+    knobs = point2knob_batch(points, dims)
+    n = len(knobs)
+
+    # random_walk retries until the point changes, so a knob is picked
+    # with a probability proportional to (dim - 1) / dim
+    weight = (dims - 1.0) / dims
+    if not np.any(weight > 0):
+        return np.array(points, dtype=np.int64)
+    from_i = np.random.choice(len(dims), size=n, p=weight / np.sum(weight))
+
+    # draw a new value from the other (dim - 1) values of the knob
+    old_v = knobs[np.arange(n), from_i]
+    to_v = (np.random.random(n) * (dims[from_i] - 1)).astype(np.int64)
+    to_v += to_v >= old_v
+    knobs[np.arange(n), from_i] = to_v
+
+    return knob2point_batch(knobs, dims)
+
+
 def random_walk(p, dims):
     """random walk as local transition
 
@@ -0,0 +1,224 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# pylint: disable=invalid-name, protected-access
+"""
+Scheduler that tunes several tasks jointly under one trial budget.
+
+Instead of tuning the tasks of a network one by one with a fixed number of
+trials each, the scheduler measures one batch at a time and gives the next
+batch to the task whose improvement is expected to reduce the estimated
+end-to-end latency the most.
+"""
+import logging
+
+import numpy as np
+
+from ..measure import MeasureInput, create_measure_batch, result_cost
+from ..env import GLOBAL_SCOPE
+
+from .gridsearch_tuner import GridSearchTuner, RandomTuner
+from .ga_tuner import GATuner
+from .xgboost_tuner import XGBTuner
+
+logger = logging.getLogger('autotvm')
+
+_TUNERS = {
+    'xgb': XGBTuner,
+    'ga': GATuner,
+    'random': RandomTuner,
+    'gridsearch': GridSearchTuner,
+}
+
+
+class TaskScheduler(object):
+    """Tune multiple tasks jointly
+
+    The trials are allocated batch by batch. After a round-robin warm up,
+    the next batch goes to the task with the largest expected gain
+
+    .. math::
+
+        gain_t = w_t (\\alpha \\Delta_t + (1 - \\alpha) c_t / n_t)
+
+    where :math:`w_t` is the weight of the task, :math:`c_t` its best cost so far
+    (in seconds), :math:`n_t` the number of trials spent on it and :math:`\\Delta_t`
+    the decrease of its best cost per trial over the last ``window_size`` batches.
+    A task is retired when its tuner runs out of configs or when it does not
+    improve within ``early_stopping`` trials.
+
+    Parameters
+    ----------
+    tasks: List of autotvm.task.Task
+        The tuning tasks
+    tuner: str or callable
+        The name of the tuner ('xgb', 'ga', 'random' or 'gridsearch'),
+        or a function that takes a task and returns a :any:`Tuner`.
+    task_weights: List of float, optional
+        The weight of every task, usually the number of times the task occurs
+        in the network. Defaults to 1 for every task.
+    alpha: float, optional
+        The weight of the observed improvement against the optimistic estimate
+        when computing the gain of a task.
+    window_size: int, optional
+        The number of recent batches used to measure the improvement of a task.
+    """
+    def __init__(self, tasks, tuner='xgb', task_weights=None, alpha=0.2, window_size=3):
+        if not tasks:
+            raise ValueError("TaskScheduler needs at least one task")
+        if task_weights is None:
+            task_weights = [1] * len(tasks)
+        if len(task_weights) != len(tasks):
+            raise ValueError("The length of task_weights must match the number of tasks")
+
+        if isinstance(tuner, str):
+            if tuner not in _TUNERS:
+                raise ValueError("Invalid tuner: " + tuner)
+            tuner = _TUNERS[tuner]
+
+        self.tasks = list(tasks)
+        self.tuners = [tuner(task) for task in self.tasks]
+        self.task_weights = np.array(task_weights, dtype=np.float64)
+        self.alpha = alpha
+        self.window_size = window_size
+
+        n = len(self.tasks)
+        # the number of trials spent on every task
+        self.task_cts = [0] * n
+        # best cost in seconds of every task, inf before the first valid result
+        self.best_costs = np.full(n, np.inf)
+        # (number of trials, best cost) of every task after each of its batches
+        self.task_history = [[] for _ in range(n)]
+        self._best_ct = [0] * n
+        self._error_cts = [0] * n
+        self._dead = [False] * n
+
+    def tune(self, n_trial, measure_option, early_stopping=None, callbacks=()):
+        """Begin tuning
+
+        Parameters
+        ----------
+        n_trial: int
+            Maximum number of configs to try in total over all tasks
+        measure_option: dict
+            The options for how to measure generated code.
+            You should use the return value ot autotvm.measure_option for this argument.
+        early_stopping: int, optional
+            Retire a task when not finding better configs for it in this number of trials
+        callbacks: List of callable
+            A list of callback functions with the signature
+            (Tuner, List of MeasureInput, List of MeasureResult).
+            They are called with the tuner of the task that was measured.
+        """
+        early_stopping = early_stopping or 1e9
+        for tuner in self.tuners:
+            tuner.n_trial = n_trial
+            tuner.early_stopping = early_stopping
+
+        GLOBAL_SCOPE.in_tuning = True
+        measure_batch = None
+        cur = None
+        i = 0
+        try:
+            while i < n_trial:
+                idx = self._next_task()
+                if idx is None:
+                    break
+
+                # the builder and runner are bound to one task at a time
+                if idx != cur:
+                    del measure_batch
+                    measure_batch = create_measure_batch(self.tasks[idx], measure_option)
+                    cur = idx
+
+                i += self._tune_batch(idx, measure_batch,
+                                      min(measure_batch.n_parallel, n_trial - i),
+                                      early_stopping, callbacks)
+
+                logger.debug("Task %d: trials %d, best %.4g ms; estimated latency %.4g ms",
+                             idx, self.task_cts[idx], self.best_costs[idx] * 1e3,
+                             self.estimated_latency() * 1e3)
+        finally:
+            measure_option['builder'].close()
+            measure_option['runner'].close()
+            GLOBAL_SCOPE.in_tuning = False
+            del measure_batch
+
+    def estimated_latency(self):
+        """Estimated end-to-end latency in seconds, i.e. the weighted sum
+        of the best cost of every task. It is inf until every task has a valid result."""
+        return float(np.dot(self.task_weights, self.best_costs))
+
+    def _tune_batch(self, idx, measure_batch, batch_size, early_stopping, callbacks):
+        """Measure one batch of the task and update its statistics"""
+        task, tuner = self.tasks[idx], self.tuners[idx]
+        configs = tuner.next_batch(batch_size)
+        inputs = [MeasureInput(task.target, task, config) for config in configs]
+        results = measure_batch(inputs)
+
+        i = self.task_cts[idx]
+        self._error_cts[idx] = tuner._keep_best(inputs, results, i, self._error_cts[idx])
+        for res in results:
+            i += 1
+            if res.error_no == 0:
+                cost = result_cost(res)
+                if cost < self.best_costs[idx]:
+                    self.best_costs[idx] = cost
+                    self._best_ct[idx] = i
+        self.task_cts[idx] = i
+        self.task_history[idx].append((i, self.best_costs[idx]))
+
+        tuner.ttl = min(early_stopping + tuner.best_iter, tuner.n_trial) - i
+        tuner.update(inputs, results)
+        for callback in callbacks:
+            callback(tuner, inputs, results)
+
+        # a task that never produces a valid result must not starve the others
+        no_result = not np.isfinite(self.best_costs[idx]) and self._error_cts[idx] > 150
+        if not tuner.has_next() or i >= self._best_ct[idx] + early_stopping or no_result:
+            logger.debug("Task %d retired after %d trials.", idx, i)
+            self._dead[idx] = True
+        return len(results)
+
+    def _next_task(self):
+        """Pick the task to measure next, None if all tasks are retired"""
+        alive = [k for k in range(len(self.tasks)) if not self._dead[k]]
+        if not alive:
+            return None
+
+        # round-robin warm up
+        for k in alive:
+            if self.task_cts[k] == 0:
+                return k
+
+        # tasks without any valid result yet come first
+        for k in alive:
+            if not np.isfinite(self.best_costs[k]):
+                return k
+
+        gains = [self._gain(k) for k in alive]
+        return alive[int(np.argmax(gains))]
+
+    def _gain(self, k):
+        """Expected decrease of the end-to-end latency per trial of task k"""
+        history = self.task_history[k]
+        n, best = history[-1]
+        backward = 0
+        prev = history[max(len(history) - 1 - self.window_size, 0)]
+        if n > prev[0] and np.isfinite(prev[1]):
+            backward = (prev[1] - best) / (n - prev[0])
+        forward = best / n
+        return self.task_weights[k] * (self.alpha * backward + (1 - self.alpha) * forward)
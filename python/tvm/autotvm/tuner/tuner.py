@@ -16,11 +16,13 @@
 # under the License.
 # pylint: disable=unused-argument, no-self-use, invalid-name
 """Base class of tuner"""
+import collections
 import logging
+from concurrent.futures import Future
 
 import numpy as np
 
-from ..measure import MeasureInput, create_measure_batch
+from ..measure import MeasureInput, create_measure_batch, result_cost
 
 from ..env import GLOBAL_SCOPE
 
@@ -107,6 +109,7 @@ class Tuner(object):
         """
         measure_batch = create_measure_batch(self.task, measure_option)
         n_parallel = getattr(measure_batch, 'n_parallel', 1)
+        pipeline = getattr(measure_batch, 'pipeline', None)
         early_stopping = early_stopping or 1e9
         self.n_trial = n_trial
         self.early_stopping = early_stopping
@@ -114,56 +117,122 @@ class Tuner(object):
         old_level = logger.level
 
         GLOBAL_SCOPE.in_tuning = True
-        i = error_ct = 0
-        while i < n_trial:
-            if not self.has_next():
-                break
-
-            configs = self.next_batch(min(n_parallel, n_trial - i))
-
-            inputs = [MeasureInput(self.task.target, self.task, config) for config in configs]
-            results = measure_batch(inputs)
-
-            # keep best config
-            for k, (inp, res) in enumerate(zip(inputs, results)):
-                config = inp.config
-                if res.error_no == 0:
-                    flops = inp.task.flop / np.mean(res.costs)
-                    error_ct = 0
+        try:
+            i = n_submitted = error_ct = 0
+            # batches in flight, at most two when the measurement is pipelined
+            in_flight = collections.deque()
+            while i < n_trial:
+                max_in_flight = 2 if pipeline else 1
+                while len(in_flight) < max_in_flight and n_submitted < n_trial and self.has_next():
+                    configs = self.next_batch(min(n_parallel, n_trial - n_submitted))
+                    inputs = [MeasureInput(self.task.target, self.task, config)
+                              for config in configs]
+                    if pipeline:
+                        in_flight.append((inputs, pipeline.submit(inputs)))
+                    else:
+                        in_flight.append((inputs, measure_batch(inputs)))
+                    n_submitted += len(inputs)
+                if not in_flight:
+                    break
+
+                i, error_ct = self._collect(in_flight.popleft(), i, error_ct, callbacks)
+
+                if i >= self.best_iter + early_stopping:
+                    logger.debug("Early stopped. Best iter: %d.", self.best_iter)
+                    break
+
+                if error_ct > 150:
+                    logging.basicConfig()
+                    logger.warning("Too many errors happen in the tuning. Now is in debug mode")
+                    logger.setLevel(logging.DEBUG)
                 else:
-                    flops = 0
-                    error_ct += 1
-
-                if flops > self.best_flops:
-                    self.best_flops = flops
-                    self.best_config = config
-                    self.best_measure_pair = (inp, res)
-                    self.best_iter = i + k
-
-                logger.debug("No: %d\tGFLOPS: %.2f/%.2f\tresult: %s\t%s",
-                             i + k + 1, flops / 1e9, self.best_flops / 1e9,
-                             res, config)
-
-            i += len(results)
-            self.ttl = min(early_stopping + self.best_iter, n_trial) - i
-
-            self.update(inputs, results)
-            for callback in callbacks:
-                callback(self, inputs, results)
-
-            if i >= self.best_iter + early_stopping:
-                logger.debug("Early stopped. Best iter: %d.", self.best_iter)
-                break
-
-            if error_ct > 150:
-                logging.basicConfig()
-                logger.warning("Too many errors happen in the tuning. Now is in debug mode")
-                logger.setLevel(logging.DEBUG)
-            else:
-                logger.setLevel(old_level)
+                    logger.setLevel(old_level)
+
+            # a batch still in flight after early stopping is measured anyway,
+            # so its results are recorded like the others
+            while in_flight:
+                i, error_ct = self._collect(in_flight.popleft(), i, error_ct, callbacks)
+        finally:
+            if pipeline:
+                pipeline.close()
+            measure_option['builder'].close()
+            measure_option['runner'].close()
+            GLOBAL_SCOPE.in_tuning = False
+            del measure_batch
+
+    def _collect(self, batch, i, error_ct, callbacks):
+        """Wait for the results of a batch in flight and record them
+
+        Parameters
+        ----------
+        batch: Tuple of (List of MeasureInput, List of MeasureResult or Future)
+            The inputs of the batch and their results, or the futures
+            of their results if the measurement is pipelined
+        i: int
+            The number of trials before this batch
+        error_ct: int
+            The number of consecutive errors before this batch
+        callbacks: List of callable
+            The callbacks of :any:`tune`
+
+        Returns
+        -------
+        i: int
+            The number of trials after this batch
+        error_ct: int
+            The number of consecutive errors after this batch
+        """
+        inputs, results = batch
+        results = [res.result() if isinstance(res, Future) else res for res in results]
+
+        error_ct = self._keep_best(inputs, results, i, error_ct)
+
+        i += len(results)
+        self.ttl = min(self.early_stopping + self.best_iter, self.n_trial) - i
+
+        self.update(inputs, results)
+        for callback in callbacks:
+            callback(self, inputs, results)
+        return i, error_ct
 
-        GLOBAL_SCOPE.in_tuning = False
-        del measure_batch
+    def _keep_best(self, inputs, results, i, error_ct):
+        """Keep the best config of measured results
+
+        Parameters
+        ----------
+        inputs: Array of autotvm.measure.MeasureInput
+            The input for measurement
+        results: Array of autotvm.measure.MeasureResult
+            result for measurement
+        i: int
+            The number of trials before this batch
+        error_ct: int
+            The number of consecutive errors before this batch
+
+        Returns
+        -------
+        error_ct: int
+            The number of consecutive errors after this batch
+        """
+        for k, (inp, res) in enumerate(zip(inputs, results)):
+            config = inp.config
+            if res.error_no == 0:
+                flops = inp.task.flop / result_cost(res)
+                error_ct = 0
+            else:
+                flops = 0
+                error_ct += 1
+
+            if flops > self.best_flops:
+                self.best_flops = flops
+                self.best_config = config
+                self.best_measure_pair = (inp, res)
+                self.best_iter = i + k
+
+            logger.debug("No: %d\tGFLOPS: %.2f/%.2f\tresult: %s\t%s",
+                         i + k + 1, flops / 1e9, self.best_flops / 1e9,
+                         res, config)
+        return error_ct
 
     def reset(self):
         """reset the status of tuner"""
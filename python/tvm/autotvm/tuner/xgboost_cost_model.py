@@ -17,8 +17,11 @@
 # pylint: disable=invalid-name
 """XGBoost as cost model"""
 
+import collections
 import multiprocessing
 import logging
+import os
+import tempfile
 import time
 
 import numpy as np
@@ -28,9 +31,10 @@ except ImportError:
     xgb = None
 
 from .. import feature
+from ..measure import result_cost
 from ..util import get_rank
 from .metric import max_curve, recall_curve, cover_curve
-from .model_based_tuner import CostModel, FeatureCache
+from .model_based_tuner import CostModel, FeatureCache, PersistentFeatureCache
 
 logger = logging.getLogger('autotvm')
 
@@ -68,9 +72,19 @@ class XGBoostCostModel(CostModel):
         If is not none, the cost model will print training log every `log_interval` iterations.
     upper_model: XGBoostCostModel, optional
         The upper model used in transfer learning
+    feature_cache_dir: str, optional
+        If is not None, keep extracted features in a :any:`PersistentFeatureCache`
+        under this directory, so they are reused by later sessions of the same workload.
+    incremental: bool, optional
+        If is True, `fit` warm-starts from the previous booster and adds trees
+        trained on the samples observed since the last fit only.
+        The labels keep the normalization of the last full fit until the next one.
+    refit_interval: int, optional
+        In incremental mode, refit a new booster on all samples after this
+        number of incremental fits.
     """
     def __init__(self, task, feature_type, loss_type, num_threads=None, log_interval=25,
-                 upper_model=None):
+                 upper_model=None, feature_cache_dir=None, incremental=False, refit_interval=8):
         super(XGBoostCostModel, self).__init__()
 
         if xgb is None:
@@ -134,6 +148,8 @@ class XGBoostCostModel(CostModel):
 
         if upper_model:  # share a same feature cache with upper model
             self.feature_cache = upper_model.feature_cache
+        elif feature_cache_dir:
+            self.feature_cache = PersistentFeatureCache(feature_cache_dir, task)
         else:
             self.feature_cache = FeatureCache()
         self.upper_model = upper_model
@@ -142,6 +158,17 @@ class XGBoostCostModel(CostModel):
         self.base_model = None
 
         self._sample_size = 0
+        self._feature_len = None
+        # (filename, np.memmap) of the shared feature buffer
+        self._shared_buffer = None
+
+        self.incremental = incremental
+        self.refit_interval = refit_interval
+        self._n_fitted = 0
+        self._n_incremental = 0
+        self._y_norm = None
+        # (number of observations, 'full' or 'incremental', fit time in seconds) of every fit
+        self.fit_history = []
         self._reset_pool(self.space, self.target, self.task)
 
     def _reset_pool(self, space, target, task):
@@ -180,11 +207,25 @@ class XGBoostCostModel(CostModel):
 
         x_train = self._get_feature(xs)
         y_train = np.array(ys)
-        y_max = np.max(y_train)
-        y_train = y_train / max(y_max, 1e-8)
+
+        # warm start from the previous booster with the new samples only,
+        # and refit from scratch every `refit_interval` fits
+        incremental = self.incremental and self.bst is not None and \
+            0 < self._n_fitted < len(x_train) and self._n_incremental < self.refit_interval
+
+        # the warm-started trees were fit to labels normalized by the maximum at
+        # the last full fit, so the normalizer only changes on a full fit
+        if not incremental:
+            self._y_norm = max(np.max(y_train), 1e-8)
+        y_train = y_train / self._y_norm
 
         valid_index = y_train > 1e-6
-        index = np.random.permutation(len(x_train))
+        if incremental:
+            index = self._n_fitted + np.random.permutation(len(x_train) - self._n_fitted)
+            # clear the early stopping state of the last training
+            self.bst.set_attr(best_score=None, best_iteration=None, best_msg=None)
+        else:
+            index = np.random.permutation(len(x_train))
         dtrain = xgb.DMatrix(x_train[index], y_train[index])
         self._sample_size = len(x_train)
 
@@ -194,10 +235,12 @@ class XGBoostCostModel(CostModel):
                 self.base_model.upper_model = None
                 self.base_model = None
             else:
-                dtrain.set_base_margin(discount * self.base_model.predict(xs, output_margin=True))
+                dtrain.set_base_margin(discount * self.base_model.predict(
+                    np.array(xs)[index], output_margin=True))
 
         self.bst = xgb.train(self.xgb_params, dtrain,
                              num_boost_round=8000,
+                             xgb_model=self.bst if incremental else None,
                              callbacks=[custom_callback(
                                  stopping_rounds=20,
                                  metric='tr-a-recall@%d' % plan_size,
@@ -208,10 +251,15 @@ class XGBoostCostModel(CostModel):
                                  ],
                                  verbose_eval=self.log_interval)])
 
-        logger.debug("XGB train: %.2f\tobs: %d\terror: %d\tn_cache: %d",
+        self._n_fitted = len(x_train)
+        self._n_incremental = self._n_incremental + 1 if incremental else 0
+        mode = 'incremental' if incremental else 'full'
+        self.fit_history.append((len(xs), mode, time.time() - tic))
+
+        logger.debug("XGB train: %.2f\tobs: %d\terror: %d\tn_cache: %d\tmode: %s",
                      time.time() - tic, len(xs),
                      len(xs) - np.sum(valid_index),
-                     self.feature_cache.size(self.fea_type))
+                     self.feature_cache.size(self.fea_type), mode)
 
     def fit_log(self, records, plan_size):
         tic = time.time()
@@ -296,36 +344,133 @@ class XGBoostCostModel(CostModel):
                                 self.num_threads, self.log_interval, self)
 
     def _get_feature(self, indexes):
-        """get features for indexes, run extraction if we do not have cache for them"""
-        # free feature cache
-        if self.feature_cache.size(self.fea_type) >= 100000:
+        """get features for indexes, run extraction if we do not have cache for them
+
+        Once the feature length is known, the features are assembled in a
+        long-lived float32 buffer in shared memory, which the pool workers keep
+        mapped and write the extracted features into. The returned matrix is a
+        view of that buffer and is only valid until the next call.
+        """
+        # free feature cache, a persistent cache bounds itself by eviction
+        if not isinstance(self.feature_cache, PersistentFeatureCache) and \
+                self.feature_cache.size(self.fea_type) >= 100000:
             self.feature_cache.clear(self.fea_type)
 
         fea_cache = self.feature_cache.get(self.fea_type)
 
         indexes = np.array(indexes)
-        need_extract = [x for x in indexes if x not in fea_cache]
-
-        if need_extract:
-            pool = self._get_pool()
-            feas = pool.map(self.feature_extract_func, need_extract)
-            for i, fea in zip(need_extract, feas):
+        # read every cached feature once, a row of a shared table can be reused meanwhile
+        cached = {}
+        for x in indexes:
+            try:
+                cached[x] = fea_cache[x]
+            except KeyError:
+                pass
+        missing = [row for row, x in enumerate(indexes) if x not in cached]
+
+        if missing and self._feature_len is None:
+            # extract in the usual way to learn the feature length
+            need_extract = [indexes[row] for row in missing]
+            for i, fea in zip(need_extract, self._extract_feature(need_extract)):
                 fea_cache[i] = fea
-
-        feature_len = None
-        for idx in indexes:
-            if fea_cache[idx] is not None:
-                feature_len = fea_cache[idx].shape[-1]
+                cached[i] = fea
+            missing = []
+        if self._feature_len is None:
+            for fea in cached.values():
+                if fea is not None:
+                    self._feature_len = len(fea)
+                    break
+
+        matrix = self._shared_matrix(len(indexes))
+        for row, x in enumerate(indexes):
+            if x in cached:
+                matrix[row] = cached[x] if cached[x] is not None else 0
+
+        if missing:
+            filename, buf = self._shared_buffer
+            valid = self._get_pool().map(
+                _extract_into_shared_buffer,
+                [(self.feature_extract_func, indexes[row], row, filename, buf.shape)
+                 for row in missing])
+            persistent = isinstance(self.feature_cache, PersistentFeatureCache)
+            for row, ok in zip(missing, valid):
+                if not ok:
+                    matrix[row] = 0
+                # a persistent table copies the row itself, a dict keeps the object
+                fea_cache[indexes[row]] = (matrix[row] if persistent else
+                                           matrix[row].copy()) if ok else None
+            if persistent:
+                self.feature_cache.flush()
+        return matrix
+
+    def _shared_matrix(self, n_rows):
+        """The first n_rows of the shared feature buffer, which grows if it is too small"""
+        if self._shared_buffer is None or self._shared_buffer[1].shape[0] < n_rows or \
+                self._shared_buffer[1].shape[1] != self._feature_len:
+            capacity = n_rows
+            if self._shared_buffer is not None:
+                capacity = max(n_rows, 2 * self._shared_buffer[1].shape[0])
+            self._free_shared_buffer()
+            fd, filename = tempfile.mkstemp(prefix="tvm_feature_", dir=_SHARED_MEM_DIR)
+            os.close(fd)
+            self._shared_buffer = (filename, np.memmap(filename, dtype=np.float32, mode='w+',
+                                                       shape=(capacity, self._feature_len)))
+        return self._shared_buffer[1][:n_rows]
+
+    def _free_shared_buffer(self):
+        if getattr(self, '_shared_buffer', None) is not None:
+            filename = self._shared_buffer[0]
+            self._shared_buffer = None
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def _extract_feature(self, indexes):
+        """Extract features for indexes in the pool and learn the feature length.
+
+        Returns
+        -------
+        feas: List of np.ndarray
+            The feature of every index, None if the extraction fails
+        """
+        feas = self._get_pool().map(self.feature_extract_func, indexes)
+        for fea in feas:
+            if fea is not None:
+                self._feature_len = len(fea)
                 break
-
-        ret = np.empty((len(indexes), feature_len), dtype=np.float32)
-        for i, ii in enumerate(indexes):
-            t = fea_cache[ii]
-            ret[i, :] = t if t is not None else 0
-        return ret
+        for index, fea in zip(indexes, feas):
+            if fea is not None and len(fea) != self._feature_len:
+                raise RuntimeError("The feature of config %d has length %d, expected %d"
+                                   % (index, len(fea), self._feature_len))
+        return feas
 
     def __del__(self):
         self._close_pool()
+        self._free_shared_buffer()
+
+
+# put shared feature buffers in memory if possible
+_SHARED_MEM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# the shared feature buffers mapped by this pool worker, filename -> np.memmap.
+# A worker serves the base model too, so it keeps a few of them.
+_shared_buffers = collections.OrderedDict()
+
+def _extract_into_shared_buffer(args):
+    """extract feature for an index and write it into a row of the shared buffer"""
+    extract_func, index, row, filename, shape = args
+    fea = extract_func(index)
+    if fea is None:
+        return False
+    if len(fea) != shape[1]:
+        raise RuntimeError("The feature of config %d has length %d, expected %d"
+                           % (index, len(fea), shape[1]))
+    if filename not in _shared_buffers:
+        if len(_shared_buffers) >= 4:
+            _shared_buffers.popitem(last=False)
+        _shared_buffers[filename] = np.memmap(filename, dtype=np.float32, mode='r+',
+                                              shape=shape)
+    _shared_buffers[filename][row] = fea
+    return True
 
 
 _extract_space = None
@@ -355,7 +500,7 @@ def _extract_itervar_feature_log(arg):
         x = np.concatenate((fea, list(config.get_other_option().values())))
 
         if res.error_no == 0:
-            y = inp.task.flop / np.mean(res.costs)
+            y = inp.task.flop / result_cost(res)
         else:
             y = 0.0
         return x, y
@@ -380,7 +525,7 @@ def _extract_knob_feature_log(arg):
         if res.error_no == 0:
             with inp.target:  # necessary, for calculating flops of this task
                 inp.task.instantiate(config)
-            y = inp.task.flop / np.mean(res.costs)
+            y = inp.task.flop / result_cost(res)
         else:
             y = 0.0
         return x, y
@@ -410,7 +555,7 @@ def _extract_curve_feature_log(arg):
         x = np.concatenate((fea, list(config.get_other_option().values())))
 
         if res.error_no == 0:
-            y = inp.task.flop / np.mean(res.costs)
+            y = inp.task.flop / result_cost(res)
         else:
             y = 0.0
         return x, y
@@ -432,7 +577,8 @@ def custom_callback(stopping_rounds, metric, fevals, evals=(), log_file=None,
         bst = env.model
 
         state['maximize_score'] = maximize
-        state['best_iteration'] = 0
+        # a warm-started booster does not begin at iteration 0
+        state['best_iteration'] = env.iteration
         if maximize:
             state['best_score'] = float('-inf')
         else:
@@ -63,15 +63,24 @@ class XGBTuner(ModelBasedTuner):
         The verbose level.
         If is 0, output nothing.
         Otherwise, output debug information every `verbose` iterations.
+    feature_cache_dir: str, optional
+        If is not None, the directory of a persistent feature cache
+        shared by tuning sessions of the same workload.
+    incremental_fit: bool, optional
+        If is True, the cost model adds trees for new samples to the previous booster
+        instead of refitting from scratch every plan. See :any:`XGBoostCostModel`.
     """
     def __init__(self, task, plan_size=64,
                  feature_type='itervar', loss_type='rank', num_threads=None,
-                 optimizer='sa', diversity_filter_ratio=None, log_interval=50):
+                 optimizer='sa', diversity_filter_ratio=None, log_interval=50,
+                 feature_cache_dir=None, incremental_fit=False):
         cost_model = XGBoostCostModel(task,
                                       feature_type=feature_type,
                                       loss_type=loss_type,
                                       num_threads=num_threads,
-                                      log_interval=log_interval // 2)
+                                      log_interval=log_interval // 2,
+                                      feature_cache_dir=feature_cache_dir,
+                                      incremental=incremental_fit)
         if optimizer == 'sa':
             optimizer = SimulatedAnnealingOptimizer(task, log_interval=log_interval)
         else:
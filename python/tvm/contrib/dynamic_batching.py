@@ -0,0 +1,334 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Dynamic batching of requests on graph runtime modules.
+
+A model compiled with a fixed batch dimension uses the vector units poorly at
+batch 1. The :any:`DynamicBatcher` compiles the model for a ladder of batch
+sizes, gathers the incoming requests for at most a given latency, runs them
+together on the smallest compiled batch size that fits and scatters the
+outputs back to the requests.
+
+.. code-block:: python
+
+    def build(batch_size):
+        net, params = relay.testing.resnet.get_workload(batch_size=batch_size)
+        return relay.build(net, "llvm", params=params)
+
+    with DynamicBatcher(build, [1, 2, 4, 8], tvm.cpu(), max_latency=0.005) as batcher:
+        future = batcher.submit({"data": image})
+        out = future.result()[0]
+"""
+from __future__ import absolute_import
+
+import bisect
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import numpy as np
+
+from .. import ndarray as nd
+from . import graph_runtime
+
+# queued by shutdown to stop the worker
+_STOP = object()
+
+
+def _names(params):
+    """The names of params given as a dict or as a saved param dict"""
+    if isinstance(params, (bytes, bytearray)):
+        return graph_runtime._param_names(params)
+    return list(params.keys()) if params else []
+
+
+def _load_params(mod, params, names):
+    """Load the params with the given names into a module"""
+    if not names:
+        return
+    if isinstance(params, (bytes, bytearray)):
+        # a saved param dict is loaded as a whole
+        mod.load_params(params)
+    else:
+        mod.set_input(**dict((name, params[name]) for name in names))
+
+
+def _share_params(mod, owner, owner_names, params):
+    """Share the params that the owner holds with the same shape and type,
+    and load the others into the module itself.
+    Params of the same name, shape and type are the same in every build."""
+    shared, own = [], []
+    for name in _names(params):
+        if name in owner_names:
+            mine, theirs = mod.get_input(name), owner.get_input(name)
+            if mine.shape == theirs.shape and mine.dtype == theirs.dtype:
+                shared.append(name)
+                continue
+        own.append(name)
+    _load_params(mod, params, own)
+    if shared:
+        mod.share_params(owner, graph_runtime._param_names_blob(shared))
+
+
+class _Request(object):
+    """A submitted request"""
+    __slots__ = ["inputs", "size", "future", "arrival"]
+
+    def __init__(self, inputs, size, future):
+        self.inputs = inputs
+        self.size = size
+        self.future = future
+        self.arrival = time.time()
+
+
+class DynamicBatcher(object):
+    """Run requests in batches on modules compiled for several batch sizes.
+
+    The batch dimension is the first axis of every input and output. A request
+    holds one or more samples and all its inputs must have the same number of
+    samples. A worker thread waits for the first request, then gathers more
+    requests until the batch reaches the largest compiled batch size or until
+    ``max_latency`` seconds passed since the first request arrived. The batch
+    is padded with zeros to the smallest compiled batch size that fits.
+
+    Parameters
+    ----------
+    build : callable
+        A function that takes a batch size and returns the graph json, the
+        module and the params of the model compiled for this batch size,
+        e.g. the return value of relay.build.
+
+    batch_sizes : list of int
+        The batch sizes to compile the model for.
+
+    ctx : TVMContext
+        The local context to run the modules on.
+
+    max_latency : float, optional
+        The maximum time in seconds a request waits for the batch to fill.
+
+    max_queue : int, optional
+        The maximum number of waiting requests, no limit if is None.
+    """
+    def __init__(self, build, batch_sizes, ctx, max_latency=0.005, max_queue=None):
+        if not batch_sizes or min(batch_sizes) < 1:
+            raise ValueError("batch_sizes must be a list of positive integers")
+        self.batch_sizes = sorted(set(batch_sizes))
+        self.max_batch = self.batch_sizes[-1]
+        self.max_latency = max_latency
+        self.modules = {}
+        # the module of the largest batch size holds the params, the others share them
+        owner, owner_names = None, set()
+        for batch_size in reversed(self.batch_sizes):
+            graph, lib, params = build(batch_size)
+            mod = graph_runtime.create(graph, lib, ctx)
+            if owner is None:
+                _load_params(mod, params, _names(params))
+                owner, owner_names = mod, set(_names(params))
+            else:
+                _share_params(mod, owner, owner_names, params)
+            self.modules[batch_size] = mod
+        self.num_outputs = self.modules[self.max_batch].get_num_outputs()
+
+        self._queue = queue.Queue(max_queue or 0)
+        self._pending = None
+        self._lock = threading.Lock()
+        # orders the requests before the stop marker of the worker
+        self._submit_lock = threading.Lock()
+        self._shutdown = False
+        self._stats = {"requests": 0, "batches": 0, "samples": 0, "padded_samples": 0,
+                       "queue_delay": 0.0, "max_queue_delay": 0.0,
+                       "batch_sizes": dict((b, 0) for b in self.batch_sizes)}
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, inputs, timeout=None):
+        """Submit a request.
+
+        Parameters
+        ----------
+        inputs : dict of str to numpy.ndarray or NDArray
+            The inputs of the request. The first axis is the sample axis.
+
+        timeout : float, optional
+            The time to wait for a place in the queue when it is full.
+            If is None, wait until there is a place.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            The future of the list of outputs of the request as numpy arrays.
+            queue.Full is raised if the request could not be queued in time.
+        """
+        if not inputs:
+            raise ValueError("A request needs at least one input")
+        inputs = dict((k, v.asnumpy() if isinstance(v, nd.NDArray) else np.asarray(v))
+                      for k, v in inputs.items())
+        sizes = set(v.shape[0] if v.ndim else 0 for v in inputs.values())
+        if len(sizes) != 1:
+            raise ValueError("All the inputs of a request must have the same number of samples")
+        size = sizes.pop()
+        if not 1 <= size <= self.max_batch:
+            raise ValueError("A request must have between 1 and %d samples, got %d"
+                             % (self.max_batch, size))
+        future = Future()
+        with self._submit_lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit to a DynamicBatcher after shutdown")
+            self._queue.put(_Request(inputs, size, future), timeout=timeout)
+        return future
+
+    def run(self, inputs):
+        """Run a request and wait for the outputs.
+
+        Parameters
+        ----------
+        inputs : dict of str to numpy.ndarray or NDArray
+            The inputs of the request. The first axis is the sample axis.
+
+        Returns
+        -------
+        outputs : list of numpy.ndarray
+            The outputs of the request.
+        """
+        return self.submit(inputs).result()
+
+    def _next_request(self, timeout=None):
+        if self._pending is not None:
+            req, self._pending = self._pending, None
+            return req
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _gather(self):
+        """Gather the requests of the next batch, None when the batcher is shut down"""
+        first = self._next_request()
+        if first is _STOP:
+            return None
+        batch, size = [first], first.size
+        deadline = first.arrival + self.max_latency
+        while size < self.max_batch:
+            req = self._next_request(max(deadline - time.time(), 0))
+            if req is None:
+                break
+            if req is _STOP or size + req.size > self.max_batch:
+                # starts the next batch
+                self._pending = req
+                break
+            batch.append(req)
+            size += req.size
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._gather()
+            if batch is None:
+                break
+            batch = [req for req in batch if req.future.set_running_or_notify_cancel()]
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        start = time.time()
+        size = sum(req.size for req in batch)
+        batch_size = self.batch_sizes[bisect.bisect_left(self.batch_sizes, size)]
+        mod = self.modules[batch_size]
+        # pylint: disable=broad-except
+        try:
+            for name in batch[0].inputs:
+                data = np.concatenate([req.inputs[name] for req in batch])
+                if batch_size > size:
+                    pad = np.zeros((batch_size - size,) + data.shape[1:], dtype=data.dtype)
+                    data = np.concatenate([data, pad])
+                mod.set_input(name, data)
+            mod.run()
+            outputs = [mod.get_output(i).asnumpy() for i in range(self.num_outputs)]
+        except Exception as exc:
+            for req in batch:
+                req.future.set_exception(exc)
+            return
+
+        with self._lock:
+            stats = self._stats
+            stats["requests"] += len(batch)
+            stats["batches"] += 1
+            stats["samples"] += size
+            stats["padded_samples"] += batch_size
+            stats["batch_sizes"][batch_size] += 1
+            for req in batch:
+                delay = start - req.arrival
+                stats["queue_delay"] += delay
+                stats["max_queue_delay"] = max(stats["max_queue_delay"], delay)
+
+        offset = 0
+        for req in batch:
+            req.future.set_result([out[offset:offset + req.size] for out in outputs])
+            offset += req.size
+
+    def stats(self):
+        """Metrics of the batches run so far.
+
+        Returns
+        -------
+        stats : dict
+            "requests", "batches" and "samples" are the numbers of requests,
+            batches and samples run. "mean_queue_delay" and "max_queue_delay"
+            are the times in seconds requests waited before their batch ran.
+            "fill_ratio" is the fraction of the run batches that was not padding,
+            and "batch_sizes" the number of batches run with every batch size.
+        """
+        with self._lock:
+            stats = self._stats
+            return {
+                "requests": stats["requests"],
+                "batches": stats["batches"],
+                "samples": stats["samples"],
+                "mean_queue_delay": stats["queue_delay"] / max(stats["requests"], 1),
+                "max_queue_delay": stats["max_queue_delay"],
+                "fill_ratio": float(stats["samples"]) / max(stats["padded_samples"], 1),
+                "batch_sizes": dict(stats["batch_sizes"]),
+                "queue_size": self._queue.qsize(),
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the worker after the queued requests are done.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for the worker to stop.
+        """
+        with self._submit_lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            self._queue.put(_STOP)
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ptype, value, trace):
+        self.shutdown()
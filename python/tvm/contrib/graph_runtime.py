@@ -15,13 +15,29 @@
 # specific language governing permissions and limitations
 # under the License.
 """Minimum graph runtime that executes graph containing TVM PackedFunc."""
+import ctypes
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 import numpy as np
 
 from .._ffi.base import string_types
 from .._ffi.function import get_global_func
-from .._ffi.runtime_ctypes import TVMContext
+from .._ffi.ndarray import numpyasarray, from_dlpack
+from .._ffi.runtime_ctypes import TVMContext, TVMArrayHandle
+from .. import ndarray as _nd
 from ..rpc import base as rpc_base
 
+# the alignment the graph runtime requires for the buffers bound without copying
+ALLOC_ALIGNMENT = 64
+
 def create(graph_json_str, libmod, ctx):
     """Create a runtime executor module given a graph and module.
     Parameters
@@ -103,6 +119,47 @@ def get_device_ctx(libmod, ctx):
     return ctx, num_rpc_ctx, device_type_id
 
 
+def empty_aligned(shape, dtype="float32"):
+    """Allocate a NumPy array that can be bound to a GraphModule without copying.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the array.
+
+    dtype : str or numpy.dtype
+        The data type of the array.
+
+    Returns
+    -------
+    arr : numpy.ndarray
+        An uninitialized C contiguous array aligned to ALLOC_ALIGNMENT bytes.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = np.empty(nbytes + ALLOC_ALIGNMENT, dtype=np.uint8)
+    offset = -buf.ctypes.data % ALLOC_ALIGNMENT
+    return buf[offset:offset + nbytes].view(dtype).reshape(shape)
+
+
+def _array_view(value):
+    """View an NDArray, a NumPy array or a DLPack capsule as an NDArray without copying.
+
+    Returns the array and the objects that must stay alive as long as it is used.
+    """
+    if isinstance(value, _nd.NDArray):
+        return value, None
+    if isinstance(value, np.ndarray):
+        if not value.flags['C_CONTIGUOUS'] or value.ctypes.data % ALLOC_ALIGNMENT != 0:
+            raise ValueError("Only C contiguous arrays aligned to %d bytes can be bound "
+                             "without copying, allocate them with empty_aligned"
+                             % ALLOC_ALIGNMENT)
+        arr, shape = numpyasarray(value)
+        handle = ctypes.cast(ctypes.pointer(arr), TVMArrayHandle)
+        return _nd.NDArray(handle, True), (value, arr, shape)
+    return from_dlpack(value), None
+
+
 class GraphModule(object):
     """Wrapper runtime module.
 
@@ -130,6 +187,9 @@ class GraphModule(object):
         self._get_num_outputs = module["get_num_outputs"]
         self._load_params = module["load_params"]
         self._share_params = module["share_params"]
+        # buffers bound without copying, kept alive as long as the graph refers to them
+        self._bound_inputs = {}
+        self._bound_outputs = {}
 
     def set_input(self, key=None, value=None, **params):
         """Set inputs to the module via kwargs
@@ -155,6 +215,58 @@ class GraphModule(object):
             for k in keys:
                 self._get_input(k).copyfrom(params[k])
 
+    def bind_inputs(self, inputs):
+        """Bind inputs to buffers owned by the caller, without copying.
+
+        All the inputs are bound in one call. Every later run reads the inputs
+        from the buffers, so new inputs are passed by writing into the buffers,
+        without allocation or copying in the run loop.
+
+        Parameters
+        ----------
+        inputs : list of array or dict of str/int to array
+            The inputs in order, or a map from input name or index to input.
+            An input is an NDArray, a NumPy array or a DLPack capsule. NumPy
+            arrays must be C contiguous and aligned, see :any:`empty_aligned`.
+            The shape and data type must match the input of the graph.
+        """
+        if self.module.type_key == "rpc":
+            raise ValueError("Cannot bind local buffers to a remote graph runtime")
+        items = enumerate(inputs) if isinstance(inputs, (list, tuple)) else inputs.items()
+        args, bound = [], {}
+        for key, value in items:
+            arr, keep = _array_view(value)
+            args += [key, arr]
+            bound[key] = (arr, keep)
+        if args:
+            self.module["set_input_zero_copy"](*args)
+        self._bound_inputs.update(bound)
+
+    def bind_outputs(self, outputs):
+        """Bind outputs to buffers owned by the caller, without copying.
+
+        Every later run writes the outputs into the buffers directly,
+        and :any:`get_output` of a bound output returns its buffer.
+
+        Parameters
+        ----------
+        outputs : list of array or dict of int to array
+            The outputs in order, or a map from output index to output.
+            An output is an NDArray, a NumPy array or a DLPack capsule,
+            with the same requirements as in :any:`bind_inputs`.
+        """
+        if self.module.type_key == "rpc":
+            raise ValueError("Cannot bind local buffers to a remote graph runtime")
+        items = enumerate(outputs) if isinstance(outputs, (list, tuple)) else outputs.items()
+        args, bound = [], {}
+        for index, value in items:
+            arr, keep = _array_view(value)
+            args += [index, arr]
+            bound[index] = (arr, keep)
+        if args:
+            self.module["set_output_zero_copy"](*args)
+        self._bound_outputs.update(bound)
+
     def run(self, **input_dict):
         """Run forward execution of the graph
 
@@ -205,6 +317,14 @@ class GraphModule(object):
         out : NDArray
             The output array container
         """
+        if index in self._bound_outputs:
+            # the runtime writes a bound output into the buffer of the caller
+            bound = self._bound_outputs[index][0]
+            if out:
+                bound.copyto(out)
+                return out
+            return bound
+
         if out:
             self._get_output(index, out)
             return out
@@ -247,6 +367,18 @@ class GraphModule(object):
             The serialized parameter dict (used only for the parameter names).
         """
         self._share_params(other.module, bytearray(params_bytes))
+        # sharing sets up the operators again, which drops the bound buffers
+        self._rebind()
+
+    def _rebind(self):
+        """Bind the recorded input and output buffers again"""
+        for name, bound in (("set_input_zero_copy", self._bound_inputs),
+                            ("set_output_zero_copy", self._bound_outputs)):
+            args = []
+            for key, (arr, _) in bound.items():
+                args += [key, arr]
+            if args:
+                self.module[name](*args)
 
     def __getitem__(self, key):
         """Get internal module function
@@ -257,3 +389,202 @@ class GraphModule(object):
             The key to the module.
         """
         return self.module[key]
+
+
+def _param_names(params_bytes):
+    """The names of the parameters in a saved param dict"""
+    params_bytes = bytes(params_bytes)
+    count, = struct.unpack_from("<Q", params_bytes, 16)
+    offset, names = 24, []
+    for _ in range(count):
+        size, = struct.unpack_from("<Q", params_bytes, offset)
+        names.append(params_bytes[offset + 8:offset + 8 + size].decode())
+        offset += 8 + size
+    return names
+
+
+def _param_names_blob(names):
+    """The header of a saved param dict with only the names, which is all share_params reads"""
+    blob = [struct.pack("<QQQ", 0xF7E58D4F05049CB7, 0, len(names))]
+    for name in names:
+        name = name.encode()
+        blob.append(struct.pack("<Q", len(name)) + name)
+    blob.append(struct.pack("<Q", len(names)))
+    return bytearray(b"".join(blob))
+
+
+class GraphModulePool(object):
+    """A pool of graph runtime instances sharing one copy of the parameters.
+
+    The first instance holds the parameters and the others share them, so every
+    additional instance only allocates its activations. Every instance is driven
+    by its own worker thread, and requests wait in a bounded queue until an
+    instance is free. A GraphModule is not thread-safe, the pool makes sure that
+    only one request uses an instance at a time.
+
+    The instances run in parallel only when the GIL is released during a run,
+    which is the case with the ctypes FFI. Every instance also uses the TVM
+    thread pool for the parallel loops of the operators, set TVM_NUM_THREADS to
+    share the cores among the instances.
+
+    Parameters
+    ----------
+    graph_json_str : str
+        The graph to be deployed in json format.
+
+    libmod : tvm.Module
+        The module of the corresponding function.
+
+    ctx : TVMContext
+        The local context to run the instances on.
+
+    params : dict of str to NDArray or bytearray, optional
+        The parameters, or the parameter dict saved by relay.save_param_dict.
+
+    num_instances : int, optional
+        The number of runtime instances.
+
+    max_queue : int, optional
+        The maximum number of waiting requests. Defaults to twice the number of instances.
+    """
+    def __init__(self, graph_json_str, libmod, ctx, params=None, num_instances=2,
+                 max_queue=None):
+        if num_instances < 1:
+            raise ValueError("A GraphModulePool needs at least one instance")
+        first = create(graph_json_str, libmod, ctx)
+        if first.module.type_key == "rpc":
+            raise ValueError("GraphModulePool only supports local contexts")
+        self.instances = [first]
+        if isinstance(params, (bytes, bytearray)):
+            first.load_params(params)
+            names_blob = params
+        elif params:
+            first.set_input(**params)
+            names_blob = _param_names_blob(list(params.keys()))
+        for _ in range(num_instances - 1):
+            mod = create(graph_json_str, libmod, ctx)
+            if params:
+                mod.share_params(first, names_blob)
+            self.instances.append(mod)
+
+        self.num_outputs = first.get_num_outputs()
+        self._queue = queue.Queue(max_queue or 2 * num_instances)
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._busy_time = [0.0] * num_instances
+        self._requests = [0] * num_instances
+        # orders the requests before the stop sentinels of the workers
+        self._submit_lock = threading.Lock()
+        self._shutdown = False
+        self._threads = []
+        for i in range(num_instances):
+            thread = threading.Thread(target=self._worker, args=(i,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self, index):
+        mod = self.instances[index]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, inputs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            tic = time.time()
+            outputs, error = None, None
+            # pylint: disable=broad-except
+            try:
+                mod.set_input(**inputs)
+                mod.run()
+                outputs = [mod.get_output(i).asnumpy() for i in range(self.num_outputs)]
+            except Exception as exc:
+                error = exc
+            with self._lock:
+                self._busy_time[index] += time.time() - tic
+                self._requests[index] += 1
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outputs)
+
+    def submit(self, inputs, timeout=None):
+        """Submit a request.
+
+        Parameters
+        ----------
+        inputs : dict of str to NDArray or numpy.ndarray
+            The inputs of the graph.
+
+        timeout : float, optional
+            The time to wait for a place in the queue when it is full.
+            If is None, wait until there is a place.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            The future of the list of outputs as numpy arrays.
+            queue.Full is raised if the request could not be queued in time.
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit to a GraphModulePool after shutdown")
+            self._queue.put((future, inputs), timeout=timeout)
+        return future
+
+    def run(self, inputs):
+        """Run a request and wait for the outputs.
+
+        Parameters
+        ----------
+        inputs : dict of str to NDArray or numpy.ndarray
+            The inputs of the graph.
+
+        Returns
+        -------
+        outputs : list of numpy.ndarray
+            The outputs of the graph.
+        """
+        return self.submit(inputs).result()
+
+    def stats(self):
+        """Utilization of the instances.
+
+        Returns
+        -------
+        stats : dict
+            "queue_size" is the number of waiting requests, and "instances"
+            has for every instance the number of requests it ran, its busy
+            time in seconds and its utilization since the pool was created.
+        """
+        elapsed = max(time.time() - self._start, 1e-9)
+        with self._lock:
+            instances = [{"requests": n, "busy_time": busy, "utilization": busy / elapsed}
+                         for n, busy in zip(self._requests, self._busy_time)]
+        return {"queue_size": self._queue.qsize(), "instances": instances}
+
+    def shutdown(self, wait=True):
+        """Stop the workers after the queued requests are done.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for the workers to stop.
+        """
+        with self._submit_lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            for _ in self._threads:
+                self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ptype, value, trace):
+        self.shutdown()
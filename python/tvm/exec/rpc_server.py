@@ -24,6 +24,18 @@ import sys
 import logging
 from .. import rpc
 
+def _parse_cpu_list(spec):
+    """Parse a cpu list such as 0-3,8 into a list of int"""
+    cpus = []
+    for item in spec.split(","):
+        if "-" in item:
+            begin, end = item.split("-")
+            cpus += list(range(int(begin), int(end) + 1))
+        else:
+            cpus.append(int(item))
+    return cpus
+
+
 def main(args):
     """Main function"""
 
@@ -37,6 +49,12 @@ def main(args):
     else:
         tracker_addr = None
 
+    slot_cpus = slot_devices = None
+    if args.slot_cpus:
+        slot_cpus = [_parse_cpu_list(spec) for spec in args.slot_cpus.split(";")]
+    if args.slot_devices:
+        slot_devices = [int(dev) for dev in args.slot_devices.split(",")]
+
     server = rpc.Server(args.host,
                         args.port,
                         args.port_end,
@@ -44,7 +62,13 @@ def main(args):
                         tracker_addr=tracker_addr,
                         load_library=args.load_library,
                         custom_addr=args.custom_addr,
-                        silent=args.silent)
+                        silent=args.silent,
+                        num_slots=args.slots,
+                        slot_cpus=slot_cpus,
+                        slot_devices=slot_devices,
+                        cache_dir=args.cache_dir,
+                        cache_size=args.cache_size,
+                        resident_modules=args.resident_modules)
     server.proc.join()
 
 
@@ -71,6 +95,21 @@ if __name__ == "__main__":
                          and ROCM compilers.")
     parser.add_argument('--custom-addr', type=str,
                         help="Custom IP Address to Report to RPC Tracker")
+    parser.add_argument('--slots', type=int, default=1,
+                        help="The number of sessions served concurrently.")
+    parser.add_argument('--slot-cpus', type=str,
+                        help="The cpu cores of every slot, separated by semicolons. "
+                             "e.g. (0-3;4-7)")
+    parser.add_argument('--slot-devices', type=str,
+                        help="The device id of every slot, separated by commas. "
+                             "e.g. (0,1)")
+    parser.add_argument('--cache-dir', type=str,
+                        help="Directory of the content-addressed cache of uploaded files.")
+    parser.add_argument('--cache-size', type=int, default=1 << 30,
+                        help="The disk budget of the cache in bytes.")
+    parser.add_argument('--resident-modules', type=int, default=8,
+                        help="The number of loaded modules a session keeps resident "
+                             "when the cache is enabled.")
 
     parser.set_defaults(fork=True)
     args = parser.parse_args()
@@ -24,10 +24,28 @@ import multiprocessing
 import sys
 from ..rpc.tracker import Tracker
 
+def _parse_user_weights(text):
+    """Parse a user weight list such as "alice=2,bob=1" """
+    weights = {}
+    for item in text.split(","):
+        if not item:
+            continue
+        user, weight = item.split("=")
+        weights[user.strip()] = float(weight)
+    return weights
+
+
 def main(args):
     """Main funciton"""
+    scheduler_kwargs = {}
+    if args.scheduler == "fairshare":
+        scheduler_kwargs = {"user_weights": _parse_user_weights(args.user_weights),
+                            "max_leases": args.max_leases,
+                            "deadline": args.deadline,
+                            "aging": args.aging}
     tracker = Tracker(args.host, port=args.port, port_end=args.port_end,
-                      silent=args.silent)
+                      silent=args.silent, scheduler=args.scheduler,
+                      scheduler_kwargs=scheduler_kwargs, quarantine=args.quarantine)
     tracker.proc.join()
 
 
@@ -45,6 +63,20 @@ if __name__ == "__main__":
                          and ROCM compilers.")
     parser.add_argument('--silent', action='store_true',
                         help="Whether run in silent mode.")
+    parser.add_argument('--scheduler', type=str, default="priority",
+                        choices=["priority", "fairshare"],
+                        help="The policy used to assign devices to requests.")
+    parser.add_argument('--user-weights', type=str, default="",
+                        help="Fair-share weights of the users, e.g. alice=2,bob=1.")
+    parser.add_argument('--max-leases', type=int, default=None,
+                        help="Maximum number of devices of a key leased to one user.")
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="Seconds after which a pending request is served first.")
+    parser.add_argument('--aging', type=float, default=60,
+                        help="Seconds of waiting that raise the priority of a request by one.")
+    parser.add_argument('--quarantine', action='store_true',
+                        help="Take servers with repeated failed sessions or a high \
+                        temperature out of service for a while.")
 
     parser.set_defaults(fork=True)
     args = parser.parse_args()
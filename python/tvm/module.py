@@ -118,6 +118,15 @@ class Module(ModuleBase):
             self.save(file_name)
             return
 
+        if self.type_key == "dso" and getattr(self, "object_files", None):
+            # a library linked from the objects generated in parallel by relay.build
+            if fcompile is not None and getattr(fcompile, "object_format", "o") != "o":
+                raise ValueError("Module[dso]: the objects can only be linked as 'o' format")
+            if not fcompile:
+                fcompile = _tar.tar if file_name.endswith(".tar") else _cc.create_shared
+            fcompile(file_name, list(self.object_files), **kwargs)
+            return
+
         if not (self.type_key == "llvm" or self.type_key == "c"):
             raise ValueError("Module[%s]: Only llvm and c support export shared" % self.type_key)
         temp = _util.tempdir()
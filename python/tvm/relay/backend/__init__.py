@@ -16,3 +16,4 @@
 # under the License.
 """Backend codege modules for relay."""
 from . import compile_engine
+from . import compile_cache
@@ -46,6 +46,15 @@ def lower(sch, inputs, func_name, source_func):
         The result of lowering.
     """
     import traceback
+    from . import compile_cache
+
+    cache = compile_cache.current()
+    key = cache.make_key(sch, source_func) if cache is not None else None
+    if key is not None:
+        funcs = cache.get(key, func_name)
+        if funcs is not None:
+            return funcs
+
     # pylint: disable=broad-except
     try:
         f = _build.lower(sch, inputs, name=func_name)
@@ -57,8 +66,10 @@ def lower(sch, inputs, func_name, source_func):
         msg += "-----------------------------\n"
         msg += source_func.astext()
         raise RuntimeError(msg)
-    return f if isinstance(
-        f, (_container.Array, tuple, list)) else [f]
+    f = f if isinstance(f, (_container.Array, tuple, list)) else [f]
+    if key is not None:
+        cache.put(key, func_name, f)
+    return f
 
 
 @register_func("relay.backend.build")
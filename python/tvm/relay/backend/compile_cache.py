@@ -0,0 +1,269 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Persistent on-disk cache of lowered primitive functions.
+
+The CompileEngine lowers every fused primitive function of a relay program
+through the ``relay.backend.lower`` hook. When a cache is enabled, the hook
+looks the function up on disk first, so that rebuilding an unchanged model in
+a new process skips lowering. The cache can be shared by several processes.
+
+It is enabled by :any:`enable` or by setting the environment variable
+``TVM_RELAY_COMPILE_CACHE`` to the directory of the cache.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+from ..._ffi.base import _LIB, __version__
+from ... import api as _api
+from ... import build_module as _build
+from ... import target as _target
+
+_FORMAT_VERSION = 1
+
+
+class CompileCache(object):
+    """Cache of lowered functions in a directory.
+
+    An entry is keyed by the serialized fused relay function,
+    the target, the build config and the schedule created for the function,
+    which captures the config picked by the active autotvm dispatch context.
+    Entries are written atomically and the least recently used ones are evicted
+    when the total size of the cache exceeds `max_size`.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the cache. It is created if it does not exist.
+
+    max_size : int, optional
+        The maximum total size of the entries in bytes.
+    """
+    def __init__(self, path, max_size=1 << 30):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        # entries are only valid for the TVM library that created them
+        lib_stat = os.stat(_LIB._name) if os.path.isfile(_LIB._name) else None
+        self._lib_id = [__version__, _LIB._name,
+                        (lib_stat.st_size, int(lib_stat.st_mtime)) if lib_stat else None]
+
+    def make_key(self, sch, source_func, target=None):
+        """Compute the key of a primitive function.
+
+        Parameters
+        ----------
+        sch : tvm.Schedule
+            The schedule created for the function.
+
+        source_func : tvm.relay.Function
+            The fused primitive function.
+
+        target : tvm.Target, optional
+            The target, the current target if is None.
+
+        Returns
+        -------
+        key : str or None
+            The key, None if the function cannot be cached.
+        """
+        cfg = _build.current_build_config()
+        if cfg.add_lower_pass:
+            # custom passes are python callables, their effect cannot be keyed
+            return None
+        target = target or _target.current_target()
+        # pylint: disable=broad-except
+        try:
+            schedule = _api.save_json(sch)
+        except Exception:
+            return None
+        # structural_hash hashes the op nodes by address, which changes in every process
+        items = [self._lib_id,
+                 hashlib.sha1(_api.save_json(source_func).encode()).hexdigest(),
+                 str(target),
+                 [[k, str(getattr(cfg, k))] for k in sorted(_build.BuildConfig._node_defaults)],
+                 hashlib.sha1(schedule.encode()).hexdigest()]
+        return hashlib.sha1(json.dumps(items).encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + ".json")
+
+    def get(self, key, func_name):
+        """Load the lowered functions of an entry.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry.
+
+        func_name : str
+            The name the functions are given in this process.
+
+        Returns
+        -------
+        funcs : List[tvm.LoweredFunc] or None
+            The lowered functions, None if the entry does not exist.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path) as fin:
+                entry = json.load(fin)
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry.get("version") != _FORMAT_VERSION:
+            self.misses += 1
+            return None
+        funcs = entry["funcs"]
+        if entry["name"] != func_name:
+            # the unique names of the functions depend on the order they are lowered in
+            funcs = re.sub('"%s(?=["_])' % re.escape(entry["name"]),
+                           lambda _: '"' + func_name, funcs)
+        self.hits += 1
+        return list(_api.load_json(funcs))
+
+    def put(self, key, func_name, funcs):
+        """Store the lowered functions of an entry.
+
+        Parameters
+        ----------
+        key : str
+            The key of the entry.
+
+        func_name : str
+            The name of the functions.
+
+        funcs : List[tvm.LoweredFunc]
+            The lowered functions.
+        """
+        data = json.dumps({"version": _FORMAT_VERSION,
+                           "name": func_name,
+                           "funcs": _api.save_json(_api.convert(list(funcs)))})
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fout:
+                fout.write(data)
+            # readers in other processes never see a partially written entry
+            os.replace(tmp_path, self._entry_path(key))
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:   # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits in 3/4 of max_size"""
+        entries = sorted(self._entries())
+        size = sum(x[1] for x in entries)
+        for _, nbytes, name in entries:
+            if size <= self.max_size * 3 // 4:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+            size -= nbytes
+        self._size = size
+
+    def size(self):
+        """The total size of the entries in bytes."""
+        return sum(x[1] for x in self._entries())
+
+    def clear(self):
+        """Remove all the entries."""
+        with self._lock:
+            for _, _, name in self._entries():
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+            self._size = 0
+
+
+_CURRENT = [None]
+
+
+def enable(path=None, max_size=1 << 30):
+    """Enable the compile cache for the CompileEngine.
+
+    Parameters
+    ----------
+    path : str, optional
+        The directory of the cache.
+        Defaults to ``~/.tvm/relay_compile_cache``.
+
+    max_size : int, optional
+        The maximum total size of the entries in bytes.
+
+    Returns
+    -------
+    cache : CompileCache
+        The enabled cache.
+    """
+    path = path or os.path.join("~", ".tvm", "relay_compile_cache")
+    _CURRENT[0] = CompileCache(path, max_size)
+    return _CURRENT[0]
+
+
+def disable():
+    """Disable the compile cache."""
+    _CURRENT[0] = None
+
+
+def current():
+    """Get the enabled compile cache.
+
+    Returns
+    -------
+    cache : CompileCache or None
+        The enabled cache, None if the cache is disabled.
+    """
+    return _CURRENT[0]
+
+
+if os.environ.get("TVM_RELAY_COMPILE_CACHE"):
+    enable(os.environ["TVM_RELAY_COMPILE_CACHE"])
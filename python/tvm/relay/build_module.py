@@ -18,12 +18,16 @@
 Construct the necessary state for the TVM graph runtime
 from a Relay expression.
 """
+import multiprocessing
+import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
 from tvm import expr as tvm_expr
 from .. import nd as _nd, target as _target, autotvm
-from ..contrib import graph_runtime as _graph_rt
+from .. import api as _api, build_module as _tvm_build, module as _module
+from ..contrib import graph_runtime as _graph_rt, cc as _cc, util as _util
 from . import _build_module
 from . import ty as _ty
 from . import expr as _expr
@@ -62,8 +66,9 @@ class BuildModule(object):
         self._build = self.mod["build"]
         self._set_params_func = self.mod["set_params"]
         self._get_params_func = self.mod["get_params"]
+        self._get_lowered_funcs = self.mod["get_lowered_funcs"]
 
-    def build(self, func, target=None, target_host=None, params=None):
+    def build(self, func, target=None, target_host=None, params=None, n_parallel=1):
         """
         Parameters
         ----------
@@ -88,6 +93,9 @@ class BuildModule(object):
             Input parameters to the graph that do not change
             during inference time. Used for constant folding.
 
+        n_parallel : int, optional
+            The number of processes generating code, see :any:`relay.build`.
+
         Returns
         -------
         graph_json : str
@@ -105,10 +113,17 @@ class BuildModule(object):
         if params:
             self._set_params(params)
         # Build the function
-        self._build(func, target, target_host)
+        if n_parallel == 1:
+            self._build(func, target, target_host)
+            mod = self.get_module()
+        else:
+            self._build(func, target, target_host, False)
+            lowered_funcs = self._get_lowered_funcs()
+            # without lowered functions, the module is the same as in a serial build
+            mod = _codegen(lowered_funcs, target_host, n_parallel) if lowered_funcs \
+                else self.get_module()
         # Get artifacts
         graph_json = self.get_json()
-        mod = self.get_module()
         params = self.get_params()
 
         return graph_json, mod, params
@@ -138,7 +153,89 @@ class BuildModule(object):
         return ret
 
 
-def build(mod, target=None, target_host=None, params=None):
+def _codegen_shard(funcs_json, target, target_host, config, path):
+    """Generate the object file of a shard of lowered functions in a worker process"""
+    funcs = list(_api.load_json(funcs_json))
+    with _tvm_build.build_config(**config):
+        mod = _tvm_build.build(funcs, target=target, target_host=target_host)
+    mod.save(path)
+
+
+def _is_native_llvm(target):
+    """Whether code of a target can be linked by the host compiler and loaded here:
+    an llvm target for the host triple, which is not built as a system library."""
+    target = _target.create(target)
+    if target.target_name != "llvm":
+        return False
+    return not any(opt == "-system-lib" or opt.startswith(("-target=", "-mtriple="))
+                   for opt in target.options)
+
+
+def _codegen_context():
+    """The multiprocessing context of the codegen workers, None if there is none.
+
+    By the time of codegen, this process has run LLVM and the TVM thread pool
+    (e.g. in FoldConstant), so the workers are not forked from it.
+    """
+    if sys.version_info < (3, 7):
+        # ProcessPoolExecutor only forks before python 3.7
+        return None
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _codegen(lowered_funcs, target_host, n_parallel):
+    """Generate the module of lowered functions, in parallel when possible.
+
+    The functions of every target are sorted by name and split into contiguous
+    shards. Every shard is compiled to an object file by a worker process, and
+    the objects are linked into one library in a fixed order, so the result does
+    not depend on the scheduling of the workers. Only llvm targets for the host
+    are sharded, because the objects are linked by the host compiler and loaded
+    in this process. Cross-compiled or system-lib targets, other targets, or a
+    single function are built serially like in C++, and so is everything when the
+    workers cannot be started without fork.
+    """
+    lowered_funcs = {str(tgt): list(funcs) for tgt, funcs in lowered_funcs.items()}
+    n_parallel = n_parallel or multiprocessing.cpu_count()
+    n_funcs = sum(len(funcs) for funcs in lowered_funcs.values())
+    host_ok = target_host is None or _is_native_llvm(target_host)
+    mp_context = _codegen_context()
+    if n_parallel <= 1 or n_funcs <= 1 or not host_ok or mp_context is None or \
+            not all(_is_native_llvm(tgt) for tgt in lowered_funcs):
+        return _tvm_build.build(lowered_funcs, target_host=target_host)
+
+    cfg = _tvm_build.current_build_config()
+    config = {k: getattr(cfg, k) for k in _tvm_build.BuildConfig._node_defaults}
+    target_host = str(target_host) if target_host is not None else None
+    temp = _util.tempdir()
+    jobs = []
+    for tgt in sorted(lowered_funcs):
+        funcs = sorted(lowered_funcs[tgt], key=lambda f: f.name)
+        n_shards = max(1, min(len(funcs), n_parallel * len(funcs) // n_funcs))
+        size = (len(funcs) + n_shards - 1) // n_shards
+        for i in range(0, len(funcs), size):
+            path = temp.relpath("lib%d.o" % len(jobs))
+            jobs.append((_api.save_json(_api.convert(funcs[i:i+size])), tgt,
+                         target_host or tgt, config, path))
+
+    with ProcessPoolExecutor(max_workers=min(n_parallel, len(jobs)),
+                             mp_context=mp_context) as pool:
+        for future in [pool.submit(_codegen_shard, *job) for job in jobs]:
+            future.result()
+
+    objects = [job[-1] for job in jobs]
+    path_lib = temp.relpath("lib.so")
+    _cc.create_shared(path_lib, objects)
+    mod = _module.load(path_lib)
+    # keep the objects so that the module can be exported again
+    mod.object_files = objects
+    mod.object_dir = temp
+    return mod
+
+
+def build(mod, target=None, target_host=None, params=None, n_parallel=1):
     """Helper function that builds a Relay function to run on TVM graph
     runtime.
 
@@ -165,6 +262,14 @@ def build(mod, target=None, target_host=None, params=None):
         Input parameters to the graph that do not change
         during inference time. Used for constant folding.
 
+    n_parallel : int, optional
+        The number of processes that generate code in parallel.
+        None uses all cpu cores. If it is not 1, the fused functions of llvm
+        targets are compiled to object files in shards by a process pool, and
+        linked into one library, which is loaded as the returned module.
+        The generated code of every function is the same as in a serial build.
+        Targets with an explicit triple or -system-lib are always built serially.
+
     Returns
     -------
     graph_json : str
@@ -204,7 +309,7 @@ def build(mod, target=None, target_host=None, params=None):
 
     with tophub_context:
         bld_mod = BuildModule()
-        graph_json, mod, params = bld_mod.build(func, target, target_host, params)
+        graph_json, mod, params = bld_mod.build(func, target, target_host, params, n_parallel)
     return graph_json, mod, params
 
 
@@ -0,0 +1,700 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""RPC tracker, proxy and tracker client on an asyncio event loop.
+
+They speak the same wire protocol as :any:`Tracker`, :any:`Proxy` and
+:any:`TrackerSession`, so they can be mixed freely with the tornado based
+implementations, the C++ servers and the blocking clients. One process can
+serve or wait for thousands of requests concurrently without a thread per
+request.
+
+This module requires Python 3.5 or later and is not imported by ``tvm.rpc``.
+
+Example
+-------
+.. code-block:: python
+
+    from tvm.rpc import aio
+
+    async def main():
+        tracker = await aio.start_tracker("0.0.0.0", 9190)
+        client = aio.connect_tracker("localhost", tracker.port)
+        remotes = await asyncio.gather(*[client.request("rasp3b") for _ in range(8)])
+"""
+# pylint: disable=invalid-name
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import time
+
+from .._ffi.base import TVMError, py_str
+from . import base
+from .base import TrackerCode
+from .client import connect, _format_summary
+from .tracker import TrackerConnection, TrackerServerHandler
+
+logger = logging.getLogger("RPCAsync")
+
+
+def _bind(host, port, port_end):
+    """Bind a listening socket to the first free port in [port, port_end)"""
+    sock = socket.socket(base.get_addr_family((host, port)), socket.SOCK_STREAM)
+    for my_port in range(port, port_end):
+        try:
+            sock.bind((host, my_port))
+            break
+        except socket.error as sock_err:
+            if sock_err.errno in [98, 48]:
+                continue
+            raise sock_err
+    else:
+        raise ValueError("cannot bind to any port in [%d, %d)" % (port, port_end))
+    logger.info("bind to %s:%d", host, my_port)
+    sock.listen(socket.SOMAXCONN)
+    sock.setblocking(False)
+    return sock
+
+
+async def _sendjson(writer, data):
+    """Send a python value as json to a stream"""
+    data = json.dumps(data).encode("utf-8")
+    writer.write(struct.pack("<i", len(data)) + data)
+    await writer.drain()
+
+
+async def _recvjson(reader):
+    """Receive a python value as json from a stream"""
+    size = struct.unpack("<i", await reader.readexactly(4))[0]
+    return json.loads(py_str(await reader.readexactly(size)))
+
+
+async def connect_with_retry(addr, timeout=60, retry_period=5):
+    """Open a stream connection to a TCP address with retry
+
+    Parameters
+    ----------
+    addr : tuple
+        address tuple
+
+    timeout : float
+         Timeout during retry
+
+    retry_period : float
+         Number of seconds before we retry again.
+
+    Returns
+    -------
+    reader, writer : asyncio.StreamReader, asyncio.StreamWriter
+        The streams of the connection.
+    """
+    tstart = time.time()
+    while True:
+        try:
+            return await asyncio.open_connection(addr[0], addr[1])
+        except ConnectionRefusedError:
+            if time.time() - tstart > timeout:
+                raise RuntimeError("Failed to connect to server %s" % str(addr))
+            logger.warning("Cannot connect to tracker %s, retry in %g secs...",
+                           str(addr), retry_period)
+            await asyncio.sleep(retry_period)
+
+
+async def _open_tracker(addr):
+    """Connect to a tracker and do the handshake"""
+    reader, writer = await connect_with_retry(addr)
+    writer.write(struct.pack("<i", base.RPC_TRACKER_MAGIC))
+    magic = struct.unpack("<i", await reader.readexactly(4))[0]
+    if magic != base.RPC_TRACKER_MAGIC:
+        writer.close()
+        raise RuntimeError("%s is not RPC Tracker" % str(addr))
+    return reader, writer
+
+
+class AsyncTrackerSession(object):
+    """Tracker client session on an asyncio event loop.
+
+    The tracker answers a request only once a matching server is free, so
+    every call runs on its own tracker connection, taken from a pool of idle
+    connections. Any number of requests can wait concurrently.
+
+    Parameters
+    ----------
+    addr : tuple
+        The address tuple
+
+    user : str, optional
+        The user name reported with requests, used by the tracker for fair-share
+        scheduling. Defaults to the TVM_TRACKER_USER environment variable.
+    """
+    def __init__(self, addr, user=None):
+        self._addr = addr
+        self._user = user if user is not None else os.environ.get("TVM_TRACKER_USER", "")
+        self._idle = []
+
+    def close(self):
+        """Close the idle tracker connections."""
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+    async def _call(self, data):
+        """Send a message on an idle connection and wait for the reply"""
+        conn = self._idle.pop() if self._idle else await _open_tracker(self._addr)
+        try:
+            await _sendjson(conn[1], data)
+            value = await _recvjson(conn[0])
+        except BaseException:  # pylint: disable=broad-except
+            # also on cancellation: a late reply must not reach the next call
+            conn[1].close()
+            raise
+        self._idle.append(conn)
+        return value
+
+    async def summary(self):
+        """Get the summary dict of the tracker."""
+        value = await self._call([TrackerCode.SUMMARY])
+        if value[0] != TrackerCode.SUCCESS:
+            raise RuntimeError("Invalid return value %s" % str(value))
+        return value[1]
+
+    async def text_summary(self):
+        """Get a text summary of the tracker."""
+        return _format_summary(await self.summary())
+
+    async def request_address(self, key, priority=1, prefer=None):
+        """Wait for a free server from the tracker.
+
+        Parameters
+        ----------
+        key : str
+            The type key of the device.
+
+        priority : int, optional
+            The priority of the request.
+
+        prefer : str, optional
+            Which of the free matching servers to get, "least_loaded" or "fastest".
+
+        Returns
+        -------
+        url, port, matchkey : tuple
+            The address of the server and the key to connect with.
+        """
+        if prefer not in (None, "least_loaded", "fastest"):
+            raise ValueError("Invalid prefer: %s" % prefer)
+        value = await self._call([TrackerCode.REQUEST, key, self._user, priority, prefer])
+        if value[0] != TrackerCode.SUCCESS:
+            raise RuntimeError("Invalid return value %s" % str(value))
+        return tuple(value[1])
+
+    async def request(self, key, priority=1, session_timeout=0, max_retry=5, prefer=None):
+        """Request a new connection from the tracker.
+
+        The wait for a free server does not block the event loop. The RPC
+        handshake with the server runs in the default executor of the loop,
+        as the returned :any:`RPCSession` is a blocking session.
+
+        Parameters
+        ----------
+        key : str
+            The type key of the device.
+
+        priority : int, optional
+            The priority of the request.
+
+        session_timeout : float, optional
+            The duration of the session, allows server to kill
+            the connection when duration is longer than this value.
+            When duration is zero, it means the request must always be kept alive.
+
+        max_retry : int, optional
+            Maximum number of times to retry before give up.
+
+        prefer : str, optional
+            Which of the free matching servers to get, "least_loaded" or "fastest".
+        """
+        loop = asyncio.get_event_loop()
+        last_err = None
+        for _ in range(max_retry):
+            try:
+                url, port, matchkey = await self.request_address(key, priority, prefer)
+                return await loop.run_in_executor(
+                    None, connect, url, port, matchkey, session_timeout)
+            except (OSError, EOFError, TVMError) as err:
+                last_err = err
+        raise RuntimeError(
+            "Cannot request %s after %d retry, last_error:%s" % (
+                key, max_retry, str(last_err)))
+
+
+def connect_tracker(url, port, user=None):
+    """Create an asyncio session of a RPC tracker
+
+    Parameters
+    ----------
+    url : str
+        The url of the host
+
+    port : int
+        The port to connect to
+
+    user : str, optional
+        The user name reported to the tracker with every request.
+
+    Returns
+    -------
+    sess : AsyncTrackerSession
+        The tracker session, connections are opened on demand.
+    """
+    return AsyncTrackerSession((url, port), user=user)
+
+
+class _AsyncTrackerConnection(TrackerConnection):
+    """Tracker connection on an asyncio event loop."""
+    def __init__(self, tracker, sock, addr):
+        self._sock = sock
+        self._writer = None
+        TrackerConnection.__init__(self, tracker, addr)
+
+    async def serve(self):
+        """Receive messages until the connection is closed"""
+        try:
+            reader, self._writer = await asyncio.open_connection(sock=self._sock)
+            while self._sock is not None:
+                message = await reader.read(4096)
+                if not message:
+                    break
+                self.on_message(message)
+        except OSError as err:
+            self.on_error(err)
+        self.close()
+
+    def write_message(self, message, binary=True):
+        assert binary
+        if self._sock is None:
+            raise IOError("socket is already closed")
+        self._writer.write(message)
+
+    def close(self):
+        """Close the connection"""
+        if self._sock is not None:
+            if self._writer is not None:
+                self._writer.close()
+            else:
+                self._sock.close()
+            self._sock = None
+            self.on_close()
+
+
+class AsyncTracker(TrackerServerHandler):
+    """RPC tracker serving on an asyncio event loop.
+
+    Use :any:`start_tracker` to create one on the current event loop.
+    """
+    def __init__(self, sock, stop_key, scheduler="priority", scheduler_kwargs=None,
+                 quarantine=False):
+        self.host, self.port = sock.getsockname()[:2]
+        self._own_loop = False
+        super(AsyncTracker, self).__init__(sock, stop_key, scheduler, scheduler_kwargs,
+                                           quarantine)
+
+    def _listen(self):
+        self._ioloop = asyncio.get_event_loop()
+        self._ioloop.add_reader(self._sock.fileno(), self._on_event, None)
+
+    def _new_connection(self, conn, addr):
+        conn.setblocking(False)
+        self._ioloop.create_task(_AsyncTrackerConnection(self, conn, addr).serve())
+
+    def stop(self):
+        """Close all connections and stop serving."""
+        if self._sock is None:
+            return
+        for conn in list(self._connections):
+            conn.close()
+        self._ioloop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        if self._own_loop:
+            self._ioloop.stop()
+
+    def run(self):
+        """Run the event loop until the tracker is stopped"""
+        self._own_loop = True
+        self._ioloop.run_forever()
+
+
+async def start_tracker(host="0.0.0.0",
+                        port=9190,
+                        port_end=9199,
+                        scheduler="priority",
+                        scheduler_kwargs=None,
+                        quarantine=False):
+    """Start a RPC tracker on the current event loop.
+
+    Parameters
+    ----------
+    host : str
+        The host url of the tracker.
+
+    port : int
+        The TCP port to be bind to
+
+    port_end : int, optional
+        The end TCP port to search
+
+    scheduler: str or class, optional
+        The scheduler policy of every device key, see :any:`Tracker`.
+
+    scheduler_kwargs: dict, optional
+        Additional arguments of the scheduler.
+
+    quarantine: bool, optional
+        Whether unhealthy servers are taken out of service for a while.
+
+    Returns
+    -------
+    tracker : AsyncTracker
+        The running tracker, call its stop method to shut it down.
+    """
+    return AsyncTracker(_bind(host, port, port_end), base.random_key("tracker"),
+                        scheduler, scheduler_kwargs, quarantine)
+
+
+class _ProxyConnection(object):
+    """A connection from a RPC server or client to the proxy"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.rpc_key = None
+        self.match_key = None
+        self.alloc_time = None
+        # resolves to the peer connection, or None when the connection is rejected
+        self.paired = asyncio.Future()
+
+    def name(self):
+        """Name of this connection."""
+        return "TCPSocketProxy:%s:%s" % (
+            str(self.writer.get_extra_info("peername")), self.rpc_key)
+
+    def reject(self, code):
+        """Send an error code and close the connection"""
+        self.writer.write(struct.pack('<i', code))
+        self.writer.close()
+        if not self.paired.done():
+            self.paired.set_result(None)
+
+
+class AsyncProxy(object):
+    """RPC proxy serving TCP connections on an asyncio event loop.
+
+    It pairs RPC servers and clients by match key like :any:`Proxy`, but
+    does not serve the websocket endpoint. Use :any:`start_proxy` to create
+    one on the current event loop.
+
+    Parameters
+    ----------
+    listen_port : int
+        The port the proxy listens to, reported to the tracker.
+
+    timeout_client : float, optional
+        Timeout of client until it sees a matching connection.
+
+    timeout_server : float, optional
+        Timeout of server until it sees a matching connection.
+
+    tracker_addr: Tuple (str, int) , optional
+        The address of RPC Tracker in tuple (host, ip) format.
+        If is not None, the proxy registers its servers to the tracker.
+    """
+    def __init__(self, listen_port, timeout_client=600, timeout_server=600, tracker_addr=None):
+        self.host = None
+        self.port = listen_port
+        self.timeout_alloc = 5
+        self.timeout_client = timeout_client
+        self.timeout_server = timeout_server
+        self.update_tracker_period = 2
+        self._client_pool = {}
+        self._server_pool = {}
+        self._server = None
+        self._tasks = []
+        # tracker information
+        self._tracker_addr = tracker_addr
+        self._tracker = None
+        self._tracker_lock = asyncio.Lock()
+        self._tracker_pending_puts = []
+        self._key_set = set()
+
+    async def start(self, sock):
+        """Start serving the listening socket"""
+        self._server = await asyncio.start_server(self._handle, sock=sock)
+        if self._tracker_addr:
+            logger.info("Tracker address:%s", str(self._tracker_addr))
+            self._tasks.append(asyncio.ensure_future(self._tracker_loop()))
+
+    def close(self):
+        """Stop serving and close all connections."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for conn in list(self._client_pool.values()) + list(self._server_pool.values()):
+            conn.writer.close()
+        if self._tracker is not None:
+            self._tracker[1].close()
+            self._tracker = None
+
+    async def _handle(self, reader, writer):
+        """Serve one connection from the handshake to the end of its session"""
+        conn = _ProxyConnection(reader, writer)
+        try:
+            magic = struct.unpack('<i', await reader.readexactly(4))[0]
+            if magic != base.RPC_MAGIC:
+                logger.info("Invalid RPC magic from %s", conn.name())
+                writer.close()
+                return
+            keylen = struct.unpack('<i', await reader.readexactly(4))[0]
+            conn.rpc_key = py_str(await reader.readexactly(keylen))
+            # match key is used to do the matching
+            conn.match_key = conn.rpc_key[7:].split()[0]
+            logger.info("Handler ready %s", conn.name())
+            if self._tracker_addr:
+                self._ready_tracker_mode(conn)
+            else:
+                self._ready_proxy_mode(conn)
+
+            # watch the connection while it waits, a peer sends nothing before it is paired
+            read = asyncio.ensure_future(reader.read(1 << 16))
+            await asyncio.wait([conn.paired, read], return_when=asyncio.FIRST_COMPLETED)
+            data = b""
+            if read.done():
+                data = read.result()
+                if not data or not conn.paired.done():
+                    logger.info("Invalid RPC protocol or closed before pairing %s", conn.name())
+                    return
+            else:
+                read.cancel()
+            peer = conn.paired.result()
+            if peer is not None:
+                await self._forward(conn, peer, data)
+        except (OSError, EOFError) as err:
+            logger.info("%s: Error in RPC %s", conn.name(), err)
+        finally:
+            self._on_close(conn)
+
+    @staticmethod
+    async def _forward(conn, peer, data=b""):
+        """Forward the data of conn to its peer until conn closes"""
+        try:
+            if data:
+                peer.writer.write(data)
+            while True:
+                data = await conn.reader.read(1 << 16)
+                if not data:
+                    break
+                peer.writer.write(data)
+                await peer.writer.drain()
+        finally:
+            peer.writer.close()
+
+    def _on_close(self, conn):
+        logger.info("RPCProxy:on_close %s ...", conn.name())
+        if conn.match_key:
+            key = conn.match_key
+            if self._client_pool.get(key, None) is conn:
+                self._client_pool.pop(key)
+            if self._server_pool.get(key, None) is conn:
+                self._server_pool.pop(key)
+        if not conn.paired.done():
+            conn.paired.set_result(None)
+        conn.writer.close()
+
+    @staticmethod
+    def _pair_up(lhs, rhs):
+        for src, dst in ((lhs, rhs), (rhs, lhs)):
+            src.writer.write(struct.pack('<i', base.RPC_CODE_SUCCESS))
+            src.writer.write(struct.pack('<i', len(dst.rpc_key)))
+            src.writer.write(dst.rpc_key.encode("utf-8"))
+            # the connection may have been closed, which resolves it with None
+            if not src.paired.done():
+                src.paired.set_result(dst)
+        logger.info("Pairup connect %s  and %s", lhs.name(), rhs.name())
+
+    def _ready_tracker_mode(self, conn):
+        """tracker mode to handle a connection after its handshake."""
+        if conn.rpc_key.startswith("server:"):
+            key = base.random_key(conn.match_key + ":", self._server_pool)
+            conn.match_key = key
+            self._server_pool[key] = conn
+            self._tracker_pending_puts.append(key)
+            self._tasks = [task for task in self._tasks if not task.done()]
+            self._tasks.append(asyncio.ensure_future(self._update_tracker()))
+        else:
+            if conn.match_key in self._server_pool:
+                self._pair_up(self._server_pool.pop(conn.match_key), conn)
+            else:
+                conn.reject(base.RPC_CODE_MISMATCH)
+
+    def _ready_proxy_mode(self, conn):
+        """Normal proxy mode to handle a connection after its handshake."""
+        if conn.rpc_key.startswith("server:"):
+            pool_src, pool_dst = self._client_pool, self._server_pool
+            timeout = self.timeout_server
+        else:
+            pool_src, pool_dst = self._server_pool, self._client_pool
+            timeout = self.timeout_client
+
+        key = conn.match_key
+        if key in pool_src:
+            self._pair_up(pool_src.pop(key), conn)
+            return
+        if key not in pool_dst:
+            pool_dst[key] = conn
+            def cleanup():
+                """Cleanup connection if timeout"""
+                if pool_dst.get(key, None) is conn:
+                    logger.info("Timeout client connection %s, cannot find match key=%s",
+                                conn.name(), key)
+                    pool_dst.pop(key)
+                    conn.reject(base.RPC_CODE_MISMATCH)
+            asyncio.get_event_loop().call_later(timeout, cleanup)
+        else:
+            logger.info("Duplicate connection with same key=%s", key)
+            conn.reject(base.RPC_CODE_DUPLICATE)
+
+    def _regenerate_server_keys(self, keys):
+        """Regenerate keys for server pool"""
+        keyset = set(self._server_pool.keys())
+        new_keys = []
+        # re-generate the server match key, so old information is invalidated.
+        for key in keys:
+            rpc_key, _ = key.split(":")
+            handle = self._server_pool.pop(key)
+            new_key = base.random_key(rpc_key + ":", keyset)
+            handle.match_key = new_key
+            self._server_pool[new_key] = handle
+            keyset.add(new_key)
+            new_keys.append(new_key)
+        return new_keys
+
+    async def _tracker_call(self, data):
+        await _sendjson(self._tracker[1], data)
+        return await _recvjson(self._tracker[0])
+
+    async def _tracker_loop(self):
+        while True:
+            await self._update_tracker(True)
+            await asyncio.sleep(self.update_tracker_period)
+
+    async def _update_tracker(self, period_update=False):
+        """Update information on tracker."""
+        async with self._tracker_lock:
+            try:
+                if self._tracker is None:
+                    self._tracker = await _open_tracker(self._tracker_addr)
+                    # just connect to tracker, need to update all keys
+                    self._tracker_pending_puts = list(self._server_pool.keys())
+                    self._key_set = set()
+
+                if period_update:
+                    # regenerate key if the key is not in tracker anymore
+                    # and there is no in-coming connection after timeout_alloc
+                    pending_keys = set(await self._tracker_call(
+                        [TrackerCode.GET_PENDING_MATCHKEYS]))
+                    update_keys = []
+                    for k, v in self._server_pool.items():
+                        if k not in pending_keys:
+                            if v.alloc_time is None:
+                                v.alloc_time = time.time()
+                            elif time.time() - v.alloc_time > self.timeout_alloc:
+                                update_keys.append(k)
+                                v.alloc_time = None
+                    if update_keys:
+                        logger.info("RPCProxy: No incoming conn on %s, regenerate keys...",
+                                    str(update_keys))
+                        self._tracker_pending_puts += self._regenerate_server_keys(update_keys)
+
+                need_update_info = False
+                # report new connections
+                for key in self._tracker_pending_puts:
+                    if key not in self._server_pool:
+                        continue
+                    rpc_key = key.split(":")[0]
+                    assert await self._tracker_call(
+                        [TrackerCode.PUT, rpc_key, (self.port, key), None]) == TrackerCode.SUCCESS
+                    if rpc_key not in self._key_set:
+                        self._key_set.add(rpc_key)
+                        need_update_info = True
+
+                if need_update_info:
+                    keylist = "[" + ",".join(self._key_set) + "]"
+                    cinfo = {"key": "server:proxy" + keylist}
+                    assert await self._tracker_call(
+                        [TrackerCode.UPDATE_INFO, cinfo]) == TrackerCode.SUCCESS
+                self._tracker_pending_puts = []
+            except (OSError, EOFError) as err:
+                logger.info("Lost tracker connection: %s, try reconnect in %g sec",
+                            str(err), self.update_tracker_period)
+                if self._tracker is not None:
+                    self._tracker[1].close()
+                    self._tracker = None
+                self._regenerate_server_keys(list(self._server_pool.keys()))
+
+
+async def start_proxy(host="0.0.0.0",
+                      port=9091,
+                      port_end=9199,
+                      timeout_client=600,
+                      timeout_server=600,
+                      tracker_addr=None):
+    """Start a RPC proxy on the current event loop.
+
+    Parameters
+    ----------
+    host : str
+        The host url of the proxy.
+
+    port : int
+        The TCP port to be bind to
+
+    port_end : int, optional
+        The end TCP port to search
+
+    timeout_client : float, optional
+        Timeout of client until it sees a matching connection.
+
+    timeout_server : float, optional
+        Timeout of server until it sees a matching connection.
+
+    tracker_addr: Tuple (str, int) , optional
+        The address of RPC Tracker in tuple (host, ip) format.
+
+    Returns
+    -------
+    proxy : AsyncProxy
+        The running proxy, call its close method to shut it down.
+    """
+    sock = _bind(host, port, port_end)
+    proxy = AsyncProxy(sock.getsockname()[1], timeout_client, timeout_server, tracker_addr)
+    proxy.host = host
+    await proxy.start(sock)
+    return proxy
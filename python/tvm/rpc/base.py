@@ -22,6 +22,7 @@ from __future__ import absolute_import
 import socket
 import time
 import json
+import hashlib
 import errno
 import struct
 import random
@@ -57,6 +58,9 @@ class TrackerCode(object):
 
 RPC_SESS_MASK = 128
 
+# maximum number of bytes received at a time by recvall
+RECV_CHUNK_SIZE = 1 << 16
+
 
 def get_addr_family(addr):
     res = socket.getaddrinfo(addr[0], addr[1], 0, 0, socket.IPPROTO_TCP)
@@ -74,15 +78,41 @@ def recvall(sock, nbytes):
     nbytes : int
        Number of bytes to be received.
     """
-    res = []
+    res = bytearray(nbytes)
+    view = memoryview(res)
     nread = 0
     while nread < nbytes:
-        chunk = sock.recv(min(nbytes - nread, 1024))
-        if not chunk:
+        chunk_size = sock.recv_into(view[nread:], min(nbytes - nread, RECV_CHUNK_SIZE))
+        if not chunk_size:
             raise IOError("connection reset")
-        nread += len(chunk)
-        res.append(chunk)
-    return b"".join(res)
+        nread += chunk_size
+    return bytes(res)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Compute the sha256 digest of a file without loading it at once.
+
+    Parameters
+    ----------
+    path : str
+        The file path.
+
+    chunk_size : int, optional
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    digest : str
+        The hex digest.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as in_file:
+        while True:
+            chunk = in_file.read(chunk_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
 
 
 def sendjson(sock, data):
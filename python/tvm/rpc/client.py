@@ -18,9 +18,12 @@
 from __future__ import absolute_import
 
 import os
+import json
+import shutil
 import socket
 import struct
 import time
+import zlib
 
 from . import base
 from ..contrib import util
@@ -132,6 +135,145 @@ class RPCSession(object):
                 "tvm.rpc.server.remove")
         self._remote_funcs["remove"](path)
 
+    def _get_stream_func(self, name):
+        """Get a function of the chunked file transfer, None if the server lacks it"""
+        key = "stream." + name
+        if key not in self._remote_funcs:
+            try:
+                self._remote_funcs[key] = self.get_function("tvm.rpc.server." + key)
+            except AttributeError:
+                self._remote_funcs[key] = None
+        return self._remote_funcs[key]
+
+    def upload_stream(self, data, target=None, chunk_size=1 << 20, compress=False):
+        """Upload file to remote runtime temp folder in fixed-size chunks.
+
+        Only one chunk is held in memory at a time. The content is identified by
+        its sha256 digest: nothing is sent if the remote already has it, and an
+        upload interrupted by a dropped connection resumes where it stopped when
+        the same content is uploaded again, even from a new session.
+        Falls back to :any:`upload` if the server does not support streaming.
+
+        Parameters
+        ----------
+        data : str or bytearray
+            The file name or binary in local to upload.
+
+        target : str, optional
+            The path in remote
+
+        chunk_size : int, optional
+            Number of bytes sent per chunk.
+
+        compress : bool, optional
+            Whether to compress the chunks with zlib.
+
+        Returns
+        -------
+        nbytes : int
+            The number of bytes of content sent.
+        """
+        if isinstance(data, bytearray):
+            if not target:
+                raise ValueError("target must present when file is a bytearray")
+            temp = util.tempdir()
+            path = temp.relpath("data.bin")
+            with open(path, "wb") as out_file:
+                out_file.write(data)
+            return self.upload_stream(path, target, chunk_size, compress)
+        if not target:
+            target = os.path.basename(data)
+
+        begin = self._get_stream_func("upload_begin")
+        if begin is None:
+            self.upload(data, target)
+            return os.path.getsize(data)
+        upload_chunk = self._get_stream_func("upload_chunk")
+
+        digest = base.file_digest(data)
+        size = os.path.getsize(data)
+        offset = begin(target, digest, size)
+        if offset < 0:
+            return 0
+        start = offset
+        with open(data, "rb") as in_file:
+            in_file.seek(offset)
+            while offset < size:
+                chunk = in_file.read(chunk_size)
+                if compress:
+                    chunk = zlib.compress(chunk, 1)
+                offset = upload_chunk(digest, offset, bytearray(chunk), compress)
+        self._get_stream_func("upload_finish")(target, digest)
+        return size - start
+
+    def download_stream(self, path, target=None, chunk_size=1 << 20, compress=False):
+        """Download file from remote temp folder in fixed-size chunks.
+
+        When target is given, the chunks are written to target + ".part" as they
+        arrive, and a download interrupted by a dropped connection resumes from
+        that file. The sha256 digest of the result is checked against the remote.
+        Falls back to :any:`download` if the server does not support streaming.
+
+        Parameters
+        ----------
+        path : str
+            The relative location to remote temp folder.
+
+        target : str, optional
+            The local file to write to.
+
+        chunk_size : int, optional
+            Number of bytes received per chunk.
+
+        compress : bool, optional
+            Whether to compress the chunks with zlib.
+
+        Returns
+        -------
+        result : str or bytearray
+            target if it is given, otherwise the result blob from the file.
+        """
+        stat = self._get_stream_func("stat")
+        if stat is None:
+            blob = self.download(path)
+            if target is None:
+                return blob
+            with open(target, "wb") as out_file:
+                out_file.write(blob)
+            return target
+        info = stat(path)
+        if not info:
+            raise IOError("Remote file %s does not exist" % path)
+        info = json.loads(info)
+        download_chunk = self._get_stream_func("download_chunk")
+
+        if target is None:
+            temp = util.tempdir()
+            part = temp.relpath("data.bin.part")
+        else:
+            part = target + ".part"
+        offset = os.path.getsize(part) if os.path.isfile(part) else 0
+        if offset > info["size"]:
+            offset = 0
+        with open(part, "r+b" if offset else "wb") as out_file:
+            out_file.seek(offset)
+            out_file.truncate()
+            while offset < info["size"]:
+                chunk = download_chunk(path, offset, chunk_size, compress)
+                if compress:
+                    chunk = zlib.decompress(bytes(chunk))
+                out_file.write(chunk)
+                offset += len(chunk)
+        if base.file_digest(part) != info["sha256"]:
+            os.remove(part)
+            raise IOError("Content hash mismatch when downloading %s" % path)
+
+        if target is None:
+            with open(part, "rb") as in_file:
+                return bytearray(in_file.read())
+        os.rename(part, target)
+        return target
+
     def load_module(self, path):
         """Load a remote module, the file need to be uploaded first.
 
@@ -203,10 +345,89 @@ class LocalSession(RPCSession):
     def download(self, path):
         return bytearray(open(self._temp.relpath(path), "rb").read())
 
+    def upload_stream(self, data, target=None, chunk_size=1 << 20, compress=False):
+        self.upload(data, target)
+        return len(data) if isinstance(data, bytearray) else os.path.getsize(data)
+
+    def download_stream(self, path, target=None, chunk_size=1 << 20, compress=False):
+        if target is None:
+            return self.download(path)
+        shutil.copyfile(self._temp.relpath(path), target)
+        return target
+
     def load_module(self, path):
         return _load_module(self._temp.relpath(path))
 
 
+def _format_summary(data):
+    """Format the summary dict of a tracker as text."""
+    total_ct = {}
+
+    res = ""
+    res += "Server List\n"
+    res += "--------------------------------------------------------------------------\n"
+    res += "server-address\tkey\tsessions  success  latency(s)  load  temp  status\n"
+    res += "--------------------------------------------------------------------------\n"
+    for item in data["server_info"]:
+        addr = item["addr"]
+        res += addr[0] + ":" + str(addr[1]) + "\t"
+        res += item["key"]
+        stats = item.get("stats")
+        if stats:
+            health = stats["health"]
+            res += "\t%-8d  %-7.2f  %-10s  %-4s  %-4s  %s" % (
+                stats["sessions"], stats["success_rate"],
+                "%.3g" % stats["latency"] if stats["latency"] is not None else "-",
+                "%.2f" % health["load"] if "load" in health else "-",
+                "%.0f" % health["temperature"] if "temperature" in health else "-",
+                "quarantined" if stats["quarantined"] else "ok")
+        res += "\n"
+        key = item['key'].split(':')[1]   # 'server:rasp3b` -> 'rasp3b'
+        if key not in total_ct:
+            total_ct[key] = 0
+        total_ct[key] += 1
+    res += "--------------------------------------------------------------------------\n"
+    res += "\n"
+
+    # compute max length of device key
+    queue_info = data['queue_info']
+    keys = list(queue_info.keys())
+    if keys:
+        keys.sort()
+        max_key_len = max([len(k) for k in keys])
+    else:
+        max_key_len = 0
+
+    res += "Queue Status\n"
+    title = ("%%-%ds" % max_key_len + "   total  free  pending\n") % 'key'
+    separate_line = '-' * len(title) + '\n'
+    res += separate_line + title + separate_line
+    for k in keys:
+        total = total_ct.get(k, 0)
+        free, pending = queue_info[k]["free"], queue_info[k]["pending"]
+        if total or pending:
+            res += ("%%-%ds" % max_key_len + "   %-5d  %-4d  %-7d\n") % \
+                   (k, total, free, pending)
+    res += separate_line
+
+    # per-user statistics of the queues
+    user_lines = []
+    for k in keys:
+        for user, stats in sorted(queue_info[k].get("users", {}).items()):
+            user_lines.append(("%%-%ds" % max_key_len + "   %-12s  %-6d  %-7d  %-7d  %.2f\n") %
+                              (k, user or "-", stats["active"], stats["pending"],
+                               stats["granted"], stats["avg_wait"]))
+    if user_lines:
+        res += "\nUser Status\n"
+        title = ("%%-%ds" % max_key_len +
+                 "   user          active  pending  granted  avg_wait(s)\n") % 'key'
+        separate_line = '-' * len(title) + '\n'
+        res += separate_line + title + separate_line
+        res += "".join(user_lines)
+        res += separate_line
+    return res
+
+
 class TrackerSession(object):
     """Tracker client session.
 
@@ -214,9 +435,14 @@ class TrackerSession(object):
     ----------
     addr : tuple
         The address tuple
+
+    user : str, optional
+        The user name reported with requests, used by the tracker for fair-share
+        scheduling. Defaults to the TVM_TRACKER_USER environment variable.
     """
-    def __init__(self, addr):
+    def __init__(self, addr, user=None):
         self._addr = addr
+        self._user = user if user is not None else os.environ.get("TVM_TRACKER_USER", "")
         self._sock = None
         self._connect()
 
@@ -246,49 +472,9 @@ class TrackerSession(object):
 
     def text_summary(self):
         """Get a text summary of the tracker."""
-        data = self.summary()
-
-        total_ct = {}
-
-        res = ""
-        res += "Server List\n"
-        res += "----------------------------\n"
-        res += "server-address\tkey\n"
-        res += "----------------------------\n"
-        for item in data["server_info"]:
-            addr = item["addr"]
-            res += addr[0] + ":" + str(addr[1]) + "\t"
-            res += item["key"] + "\n"
-            key = item['key'].split(':')[1]   # 'server:rasp3b` -> 'rasp3b'
-            if key not in total_ct:
-                total_ct[key] = 0
-            total_ct[key] += 1
-        res += "----------------------------\n"
-        res += "\n"
-
-        # compute max length of device key
-        queue_info = data['queue_info']
-        keys = list(queue_info.keys())
-        if keys:
-            keys.sort()
-            max_key_len = max([len(k) for k in keys])
-        else:
-            max_key_len = 0
+        return _format_summary(self.summary())
 
-        res += "Queue Status\n"
-        title = ("%%-%ds" % max_key_len + "   total  free  pending\n") % 'key'
-        separate_line = '-' * len(title) + '\n'
-        res += separate_line + title + separate_line
-        for k in keys:
-            total = total_ct.get(k, 0)
-            free, pending = queue_info[k]["free"], queue_info[k]["pending"]
-            if total or pending:
-                res += ("%%-%ds" % max_key_len + "   %-5d  %-4d  %-7d\n") % \
-                       (k, total, free, pending)
-        res += separate_line
-        return res
-
-    def request(self, key, priority=1, session_timeout=0, max_retry=5):
+    def request(self, key, priority=1, session_timeout=0, max_retry=5, prefer=None):
         """Request a new connection from the tracker.
 
         Parameters
@@ -306,14 +492,21 @@ class TrackerSession(object):
 
         max_retry : int, optional
             Maximum number of times to retry before give up.
+
+        prefer : str, optional
+            Which of the free matching servers to get: "least_loaded" for the
+            server with the fewest sessions and lowest load, "fastest" for the
+            server with the shortest sessions so far.
         """
+        if prefer not in (None, "least_loaded", "fastest"):
+            raise ValueError("Invalid prefer: %s" % prefer)
         last_err = None
         for _ in range(max_retry):
             try:
                 if self._sock is None:
                     self._connect()
                 base.sendjson(self._sock,
-                              [base.TrackerCode.REQUEST, key, "", priority])
+                              [base.TrackerCode.REQUEST, key, self._user, priority, prefer])
                 value = base.recvjson(self._sock)
                 if value[0] != base.TrackerCode.SUCCESS:
                     raise RuntimeError("Invalid return value %s" % str(value))
@@ -411,7 +604,7 @@ def connect(url, port, key="", session_timeout=0):
     return RPCSession(sess)
 
 
-def connect_tracker(url, port):
+def connect_tracker(url, port, user=None):
     """Connect to a RPC tracker
 
     Parameters
@@ -422,9 +615,12 @@ def connect_tracker(url, port):
     port : int
         The port to connect to
 
+    user : str, optional
+        The user name reported to the tracker with every request.
+
     Returns
     -------
     sess : TrackerSession
         The connected tracker session.
     """
-    return TrackerSession((url, port))
+    return TrackerSession((url, port), user=user)
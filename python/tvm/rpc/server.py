@@ -29,7 +29,9 @@ Server is TCP based with the following protocol:
 from __future__ import absolute_import
 
 import os
+import collections
 import ctypes
+import glob
 import socket
 import select
 import struct
@@ -39,9 +41,19 @@ import subprocess
 import time
 import sys
 import signal
+import json
+import shutil
+import tempfile
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 from .._ffi.function import register_func
-from .._ffi.base import py_str
+from .._ffi.base import py_str, TVMError
+from .._ffi.ndarray import context as _context
 from .._ffi.libinfo import find_lib_path
 from ..module import load as _load_module
 from ..contrib import util
@@ -50,12 +62,14 @@ from . base import TrackerCode
 
 logger = logging.getLogger('RPCServer')
 
-def _server_env(load_library, work_path=None):
+def _server_env(load_library, work_path=None, cache=None):
     """Server environment function return temp dir"""
     if work_path:
         temp = work_path
     else:
         temp = util.tempdir()
+    # digest -> module, the most recently used last
+    resident_modules = collections.OrderedDict()
 
     # pylint: disable=unused-variable
     @register_func("tvm.rpc.server.workpath")
@@ -66,10 +80,46 @@ def _server_env(load_library, work_path=None):
     def load_module(file_name):
         """Load module from remote side."""
         path = temp.relpath(file_name)
-        m = _load_module(path)
-        logger.info("load_module %s", path)
+        if cache is None or not cache.num_resident:
+            m = _load_module(path)
+            logger.info("load_module %s", path)
+            return m
+        digest = _cached_digest(path)
+        if digest in resident_modules:
+            m = resident_modules.pop(digest)
+            logger.info("load_module %s (resident)", path)
+        else:
+            m = _load_module(path)
+            logger.info("load_module %s", path)
+            if len(resident_modules) >= cache.num_resident:
+                resident_modules.popitem(last=False)
+        resident_modules[digest] = m
         return m
 
+    @register_func("tvm.rpc.server.time_batch", override=True)
+    def time_batch(mod, spec, *args):
+        """Time several functions of a module in one call.
+
+        spec is a json dict with the device, the time_evaluator options and
+        "funcs", a list of [function name, indices of its arguments in args].
+        Returns a json list with the costs of every function, or its error message.
+        """
+        spec = json.loads(spec)
+        ctx = _context(spec["device_type"], spec["device_id"])
+        results = []
+        for name, indices in spec["funcs"]:
+            try:
+                time_f = mod.time_evaluator(name, ctx, number=spec["number"],
+                                            repeat=spec["repeat"],
+                                            min_repeat_ms=spec["min_repeat_ms"])
+                results.append(list(time_f(*[args[i] for i in indices]).results))
+            except TVMError as err:
+                results.append(str(err))
+            time.sleep(spec["cooldown_interval"])
+        return json.dumps(results)
+
+    _register_stream_funcs(temp, cache)
+
     libs = []
     load_library = load_library.split(":") if load_library else []
     for file_name in load_library:
@@ -79,15 +129,276 @@ def _server_env(load_library, work_path=None):
     temp.libs = libs
     return temp
 
-def _serve_loop(sock, addr, load_library, work_path=None):
+def _stage_dir():
+    """Directory keeping partial uploads across sessions, so that they can be resumed"""
+    path = os.environ.get("TVM_RPC_STAGE_DIR",
+                          os.path.join(tempfile.gettempdir(), "tvm_rpc_stage"))
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+    return path
+
+# path -> (size, mtime, digest), avoid hashing unchanged files again
+_DIGEST_CACHE = {}
+
+def _cached_digest(path):
+    """sha256 digest of a file, computed again only when the file changes"""
+    stat = os.stat(path)
+    cached = _DIGEST_CACHE.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime):
+        return cached[2]
+    digest = base.file_digest(path)
+    _DIGEST_CACHE[path] = (stat.st_size, stat.st_mtime, digest)
+    return digest
+
+
+class _ContentCache(object):
+    """Content-addressed file cache shared by the sessions of a server.
+
+    Files are stored under their sha256 digest. The least recently used files
+    are evicted when the cache grows over max_bytes. Entries are always copied
+    in and out, so that writing a file in a work dir never changes the cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+
+    max_bytes : int
+        The disk budget of the cache.
+
+    num_resident : int
+        The number of loaded modules each session keeps resident.
+    """
+    def __init__(self, cache_dir, max_bytes, num_resident):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.num_resident = num_resident
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def get(self, digest, path):
+        """Copy the cached content to path, return whether it is cached"""
+        src = os.path.join(self.cache_dir, digest)
+        try:
+            shutil.copyfile(src, path)
+            os.utime(src, None)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def put(self, path, digest):
+        """Add the file at path with the given digest to the cache"""
+        dst = os.path.join(self.cache_dir, digest)
+        if os.path.isfile(dst):
+            os.utime(dst, None)
+            return
+        tmp = "%s.%d.tmp" % (dst, os.getpid())
+        shutil.copyfile(path, tmp)
+        os.rename(tmp, dst)
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used files until the cache fits in its budget"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(entry[1] for entry in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
+            logger.info("evict %s from cache", name)
+
+
+def _register_stream_funcs(temp, cache=None, stale_time=24 * 3600):
+    """Register the server side of the chunked file transfer.
+
+    Uploads are staged in _stage_dir() under their sha256 digest and moved into
+    the work dir once the digest is verified. A partial upload survives a dropped
+    session and is resumed by the next upload of the same content.
+    Received files are added to the content cache, if any, and an upload whose
+    content is cached is served from the cache instead.
+
+    The stage dir is shared by all the sessions on the host. A session owns the
+    shared part file of a digest while it holds the lock of that digest, which is
+    released when the session process exits. A concurrent upload of the same
+    content is staged to a part file private to its session instead.
+    """
+    # digest -> path of files in the work dir, for dedup
+    received = {}
+    # digest -> (part file, lock file or None) of the uploads of this session
+    staging = {}
+    _digest = _cached_digest
+
+    def _lock_digest(digest):
+        """Take the lock of the shared part file of a digest, None if it is busy"""
+        if fcntl is None:
+            return None
+        lock_file = open(os.path.join(_stage_dir(), digest + ".lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _unstage(digest):
+        part, lock_file = staging.pop(digest)
+        if lock_file is not None:
+            lock_file.close()
+        return part
+
+    # pylint: disable=unused-variable
+    @register_func("tvm.rpc.server.stream.stat", override=True)
+    def stream_stat(path):
+        path = temp.relpath(path)
+        if not os.path.isfile(path):
+            return ""
+        return json.dumps({"size": os.path.getsize(path), "sha256": _digest(path)})
+
+    @register_func("tvm.rpc.server.stream.upload_begin", override=True)
+    def stream_upload_begin(target, digest, size):
+        """Return -1 if the content is already present, else the offset to resume from"""
+        path = temp.relpath(target)
+        if os.path.isfile(path) and _digest(path) == digest:
+            return -1
+        src = received.get(digest)
+        if src and os.path.isfile(src) and _digest(src) == digest:
+            shutil.copyfile(src, path)
+            return -1
+        if cache is not None and cache.get(digest, path):
+            logger.info("upload %s from cache", path)
+            received[digest] = path
+            return -1
+
+        now = time.time()
+        for name in os.listdir(_stage_dir()):
+            stale = os.path.join(_stage_dir(), name)
+            try:
+                if name.endswith(".part") and now - os.path.getmtime(stale) > stale_time:
+                    os.remove(stale)
+            except OSError:
+                pass
+
+        if digest in staging:
+            _unstage(digest)
+        lock_file = _lock_digest(digest)
+        if lock_file is None:
+            # another session is uploading the same content, do not share its part file
+            fd, part = tempfile.mkstemp(prefix=digest + ".", suffix=".part", dir=_stage_dir())
+            os.close(fd)
+            staging[digest] = (part, None)
+            return 0
+        part = os.path.join(_stage_dir(), digest + ".part")
+        staging[digest] = (part, lock_file)
+        if os.path.isfile(part) and os.path.getsize(part) <= size:
+            logger.info("resume upload of %s at %d", target, os.path.getsize(part))
+            return os.path.getsize(part)
+        open(part, "wb").close()
+        return 0
+
+    @register_func("tvm.rpc.server.stream.upload_chunk", override=True)
+    def stream_upload_chunk(digest, offset, data, compressed):
+        if compressed:
+            data = zlib.decompress(bytes(data))
+        with open(staging[digest][0], "r+b") as part_file:
+            part_file.seek(offset)
+            part_file.write(data)
+            part_file.truncate()
+        return offset + len(data)
+
+    @register_func("tvm.rpc.server.stream.upload_finish", override=True)
+    def stream_upload_finish(target, digest):
+        part = staging[digest][0]
+        if base.file_digest(part) != digest:
+            os.remove(part)
+            _unstage(digest)
+            raise RuntimeError("Content hash mismatch when uploading %s" % target)
+        path = temp.relpath(target)
+        shutil.move(part, path)
+        _unstage(digest)
+        received[digest] = path
+        if cache is not None:
+            cache.put(path, digest)
+        logger.info("upload %s... nbytes=%d", path, os.path.getsize(path))
+
+    @register_func("tvm.rpc.server.stream.download_chunk", override=True)
+    def stream_download_chunk(path, offset, nbytes, compress):
+        with open(temp.relpath(path), "rb") as in_file:
+            in_file.seek(offset)
+            data = in_file.read(nbytes)
+        if compress:
+            data = zlib.compress(data, 1)
+        return bytearray(data)
+
+def _serve_loop(sock, addr, load_library, work_path=None, cache=None):
     """Server loop"""
     sockfd = sock.fileno()
-    temp = _server_env(load_library, work_path)
+    temp = _server_env(load_library, work_path, cache)
     base._ServerLoop(sockfd)
     if not work_path:
         temp.remove()
     logger.info("Finish serving %s", addr)
 
+def _serve_slot_loop(sock, addr, load_library, work_path, cpus=None, device=None, cache=None):
+    """Server loop of a session slot, pinned to the given cpus and device"""
+    if cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if device is not None:
+        # restrict the session to one device before any runtime initializes it
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(device)
+        os.environ["HIP_VISIBLE_DEVICES"] = str(device)
+    _serve_loop(sock, addr, load_library, work_path, cache)
+
+def _kill_serve_proc(server_proc):
+    """Kill a serving process together with its children"""
+    import psutil
+    parent = psutil.Process(server_proc.pid)
+    # terminate worker childs
+    for child in parent.children(recursive=True):
+        child.terminate()
+    # terminate the worker
+    server_proc.terminate()
+
+def _health_info():
+    """Lightweight health metrics of this machine, reported to the tracker"""
+    health = {}
+    if hasattr(os, "getloadavg"):
+        health["load"] = os.getloadavg()[0] / multiprocessing.cpu_count()
+    temps = []
+    for path in glob.glob("/sys/class/thermal/thermal_zone*/temp"):
+        try:
+            with open(path) as f:
+                temps.append(int(f.read()) / 1000.0)
+        except (IOError, OSError, ValueError):
+            continue
+    if temps:
+        health["temperature"] = max(temps)
+    return health
+
+def _report_session(tracker_conn, duration, success, timeout=False):
+    """Report the outcome of a finished session and the current health to the tracker"""
+    if tracker_conn is None:
+        return
+    session = {"duration": duration, "success": success, "timeout": timeout}
+    base.sendjson(tracker_conn,
+                  [TrackerCode.UPDATE_INFO, {"health": _health_info(), "session": session}])
+    assert base.recvjson(tracker_conn) == TrackerCode.SUCCESS
+
 def _parse_server_opt(opts):
     # parse client options
     ret = {}
@@ -96,7 +407,7 @@ def _parse_server_opt(opts):
             ret["timeout"] = float(kv[9:])
     return ret
 
-def _listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr):
+def _listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr, cache=None):
     """Listening loop of the server master."""
     def _accept_conn(listen_sock, tracker_conn, ping_period=2):
         """Accept connection from the other places.
@@ -171,6 +482,7 @@ def _listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr):
 
     # Server logic
     tracker_conn = None
+    last_session = None
     while True:
         try:
             # step 1: setup tracker and report to tracker
@@ -181,10 +493,13 @@ def _listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr):
                 if magic != base.RPC_TRACKER_MAGIC:
                     raise RuntimeError("%s is not RPC Tracker" % str(tracker_addr))
                 # report status of current queue
-                cinfo = {"key" : "server:" + rpc_key}
+                cinfo = {"key" : "server:" + rpc_key, "health" : _health_info()}
                 base.sendjson(tracker_conn,
                               [TrackerCode.UPDATE_INFO, cinfo])
                 assert base.recvjson(tracker_conn) == TrackerCode.SUCCESS
+            elif last_session is not None:
+                _report_session(tracker_conn, *last_session)
+            last_session = None
 
             # step 2: wait for in-coming connections
             conn, addr, opts = _accept_conn(sock, tracker_conn)
@@ -201,8 +516,10 @@ def _listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr):
         work_path = util.tempdir()
         logger.info("connection from %s", addr)
         server_proc = multiprocessing.Process(target=_serve_loop,
-                                              args=(conn, addr, load_library, work_path))
+                                              args=(conn, addr, load_library, work_path,
+                                                    cache))
         server_proc.deamon = True
+        start = time.time()
         server_proc.start()
         # close from our side.
         conn.close()
@@ -210,17 +527,179 @@ def _listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr):
         server_proc.join(opts.get("timeout", None))
         if server_proc.is_alive():
             logger.info("Timeout in RPC session, kill..")
-            import psutil
-            parent = psutil.Process(server_proc.pid)
-            # terminate worker childs
-            for child in parent.children(recursive=True):
-                child.terminate()
-            # terminate the worker
-            server_proc.terminate()
+            _kill_serve_proc(server_proc)
+            last_session = (time.time() - start, False, True)
+        else:
+            last_session = (time.time() - start, server_proc.exitcode == 0, False)
         work_path.remove()
 
 
-def _connect_proxy_loop(addr, key, load_library):
+class _SessionSlot(object):
+    """A session slot of a multi-session server.
+
+    Each slot serves at most one session at a time in its own process and
+    work dir, and is advertised to the tracker with its own match key.
+    """
+    def __init__(self, index, cpus=None, device=None):
+        self.index = index
+        self.cpus = cpus
+        self.device = device
+        self.matchkey = None
+        self.unmatch_count = 0
+        self.proc = None
+        self.work_path = None
+        self.deadline = None
+        self.start_time = None
+        # (duration, success, timeout) of the last finished session
+        self.last_session = None
+
+    @property
+    def busy(self):
+        """Whether the slot is serving a session"""
+        return self.proc is not None
+
+    def start(self, conn, addr, load_library, timeout=None, cache=None):
+        """Start serving a session in this slot"""
+        self.work_path = util.tempdir()
+        self.proc = multiprocessing.Process(
+            target=_serve_slot_loop,
+            args=(conn, addr, load_library, self.work_path, self.cpus, self.device, cache))
+        self.proc.start()
+        self.start_time = time.time()
+        self.deadline = self.start_time + timeout if timeout else None
+        logger.info("slot %d: connection from %s", self.index, addr)
+
+    def poll(self):
+        """Check the session, return True if the slot became free"""
+        if self.proc is None:
+            return False
+        timeout = False
+        if self.proc.is_alive():
+            if self.deadline is None or time.time() < self.deadline:
+                return False
+            logger.info("slot %d: timeout in RPC session, kill..", self.index)
+            _kill_serve_proc(self.proc)
+            timeout = True
+        self.proc.join()
+        self.last_session = (time.time() - self.start_time,
+                             not timeout and self.proc.exitcode == 0, timeout)
+        self.work_path.remove()
+        self.proc = self.work_path = self.deadline = None
+        return True
+
+
+def _multi_slot_listen_loop(sock, port, rpc_key, tracker_addr, load_library, custom_addr,
+                            slots, cache=None, ping_period=2):
+    """Listening loop of a server master that serves several sessions at once.
+
+    Every free slot reports its own match key to the tracker, so the tracker
+    hands out up to len(slots) sessions of this server concurrently.
+    """
+    unmatch_timeout = 4
+    old_keyset = set()
+
+    def _put(tracker_conn, slot):
+        """Report a free slot to the tracker with a new match key"""
+        slot.unmatch_count = 0
+        if tracker_conn is None:
+            slot.matchkey = rpc_key
+            return
+        released = slot.matchkey
+        slot.matchkey = base.random_key(rpc_key + ":", old_keyset)
+        old_keyset.add(slot.matchkey)
+        # name the key of the ended session, so the tracker ends the right lease
+        base.sendjson(tracker_conn, [TrackerCode.PUT, rpc_key, (port, slot.matchkey), custom_addr,
+                                     released])
+        assert base.recvjson(tracker_conn) == TrackerCode.SUCCESS
+
+    def _check_pending(tracker_conn):
+        """Regenerate keys that were acquired by clients but not used"""
+        base.sendjson(tracker_conn, [TrackerCode.GET_PENDING_MATCHKEYS])
+        pending_keys = base.recvjson(tracker_conn)
+        for slot in slots:
+            if slot.busy:
+                continue
+            if slot.matchkey not in pending_keys:
+                slot.unmatch_count += 1
+            else:
+                slot.unmatch_count = 0
+            if slot.unmatch_count * ping_period > unmatch_timeout + ping_period:
+                logger.info("slot %d: no incoming connections, regenerate key ...", slot.index)
+                _put(tracker_conn, slot)
+
+    def _accept(tracker_conn):
+        """Accept a connection and start it in the slot owning the match key"""
+        conn, addr = sock.accept()
+        magic = struct.unpack("<i", base.recvall(conn, 4))[0]
+        if magic != base.RPC_MAGIC:
+            conn.close()
+            return
+        keylen = struct.unpack("<i", base.recvall(conn, 4))[0]
+        key = py_str(base.recvall(conn, keylen))
+        arr = key.split()
+        slot = None
+        for item in slots:
+            if not item.busy and arr[0] == "client:" + item.matchkey:
+                slot = item
+                break
+        if slot is None:
+            conn.sendall(struct.pack("<i", base.RPC_CODE_MISMATCH))
+            conn.close()
+            logger.warning("mismatch key from %s", addr)
+            return
+        server_key = "server:" + rpc_key
+        conn.sendall(struct.pack("<i", base.RPC_CODE_SUCCESS))
+        conn.sendall(struct.pack("<i", len(server_key)))
+        conn.sendall(server_key.encode("utf-8"))
+        slot.start(conn, addr, load_library, _parse_server_opt(arr[1:]).get("timeout", None),
+                   cache)
+        # close from our side.
+        conn.close()
+
+    tracker_conn = None
+    last_ping = time.time()
+    while True:
+        try:
+            # setup tracker and report all free slots
+            if tracker_addr and tracker_conn is None:
+                tracker_conn = base.connect_with_retry(tracker_addr)
+                tracker_conn.sendall(struct.pack("<i", base.RPC_TRACKER_MAGIC))
+                magic = struct.unpack("<i", base.recvall(tracker_conn, 4))[0]
+                if magic != base.RPC_TRACKER_MAGIC:
+                    raise RuntimeError("%s is not RPC Tracker" % str(tracker_addr))
+                cinfo = {"key" : "server:" + rpc_key, "slots" : len(slots),
+                         "health" : _health_info()}
+                base.sendjson(tracker_conn, [TrackerCode.UPDATE_INFO, cinfo])
+                assert base.recvjson(tracker_conn) == TrackerCode.SUCCESS
+                for slot in slots:
+                    if not slot.busy:
+                        _put(tracker_conn, slot)
+            elif not tracker_addr and slots[0].matchkey is None:
+                for slot in slots:
+                    _put(None, slot)
+
+            # poll sessions more often than the tracker while any slot is busy
+            busy = any(slot.busy for slot in slots)
+            trigger = select.select([sock], [], [], min(ping_period, 0.1) if busy else ping_period)
+            if sock in trigger[0]:
+                _accept(tracker_conn)
+
+            for slot in slots:
+                if slot.poll():
+                    _report_session(tracker_conn, *slot.last_session)
+                    _put(tracker_conn, slot)
+
+            if tracker_conn and time.time() - last_ping >= ping_period:
+                last_ping = time.time()
+                _check_pending(tracker_conn)
+        except (socket.error, IOError):
+            # retry when tracker is dropped
+            if tracker_conn:
+                tracker_conn.close()
+                tracker_conn = None
+
+
+def _connect_proxy_loop(addr, key, load_library, cache=None):
     key = "server:" + key
     retry_count = 0
     max_retry = 5
@@ -244,7 +723,7 @@ def _connect_proxy_loop(addr, key, load_library):
             opts = _parse_server_opt(remote_key.split()[1:])
             logger.info("connected to %s", str(addr))
             process = multiprocessing.Process(
-                target=_serve_loop, args=(sock, addr, load_library))
+                target=_serve_loop, args=(sock, addr, load_library, None, cache))
             process.deamon = True
             process.start()
             sock.close()
@@ -315,6 +794,32 @@ class Server(object):
 
     silent: bool, optional
         Whether run this server in silent mode.
+
+    num_slots: int, optional
+        The number of sessions the server can serve concurrently.
+        Each slot has its own work dir and is reported to the tracker
+        with its own match key.
+
+    slot_cpus: list of list of int, optional
+        The cpu cores each slot is pinned to.
+
+    slot_devices: list of int, optional
+        The device each slot is pinned to. The device is exposed to the session
+        through CUDA_VISIBLE_DEVICES and HIP_VISIBLE_DEVICES, so the session
+        sees it as device 0.
+
+    cache_dir: str, optional
+        If set, files received through :any:`RPCSession.upload_stream` are kept in
+        this content-addressed cache, and later uploads of the same content are
+        served from it without being sent.
+
+    cache_size: int, optional
+        The disk budget of the cache in bytes. The least recently used files
+        are evicted beyond it.
+
+    resident_modules: int, optional
+        The number of loaded modules a session keeps resident when the cache is
+        enabled, so that loading the same library again does not reload it.
     """
     def __init__(self,
                  host,
@@ -326,7 +831,13 @@ class Server(object):
                  key="",
                  load_library=None,
                  custom_addr=None,
-                 silent=False):
+                 silent=False,
+                 num_slots=1,
+                 slot_cpus=None,
+                 slot_devices=None,
+                 cache_dir=None,
+                 cache_size=1 << 30,
+                 resident_modules=8):
         try:
             if base._ServerLoop is None:
                 raise RuntimeError("Please compile with USE_RPC=1")
@@ -337,6 +848,11 @@ class Server(object):
         self.libs = []
         self.custom_addr = custom_addr
         self.use_popen = use_popen
+        for pinning in (slot_cpus, slot_devices):
+            if pinning is not None and len(pinning) != num_slots:
+                raise ValueError("slot pinning must have one entry per slot")
+        multi_slot = num_slots > 1 or slot_cpus is not None or slot_devices is not None
+        cache = _ContentCache(cache_dir, cache_size, resident_modules) if cache_dir else None
 
         if silent:
             logger.setLevel(logging.ERROR)
@@ -356,6 +872,17 @@ class Server(object):
                 cmd += ["--custom-addr", custom_addr]
             if silent:
                 cmd += ["--silent"]
+            if multi_slot:
+                cmd += ["--slots=%d" % num_slots]
+            if slot_cpus is not None:
+                cmd += ["--slot-cpus", ";".join(",".join(str(cpu) for cpu in cpus)
+                                                for cpus in slot_cpus)]
+            if slot_devices is not None:
+                cmd += ["--slot-devices", ",".join(str(dev) for dev in slot_devices)]
+            if cache_dir:
+                cmd += ["--cache-dir", cache_dir,
+                        "--cache-size=%d" % cache_size,
+                        "--resident-modules=%d" % resident_modules]
 
             # prexec_fn is not thread safe and may result in deadlock.
             # python 3.2 introduced the start_new_session parameter as
@@ -384,17 +911,27 @@ class Server(object):
             if not self.port:
                 raise ValueError("cannot bind to any port in [%d, %d)" % (port, port_end))
             logger.info("bind to %s:%d", host, self.port)
-            sock.listen(1)
+            sock.listen(num_slots)
             self.sock = sock
-            self.proc = multiprocessing.Process(
-                target=_listen_loop, args=(
-                    self.sock, self.port, key, tracker_addr, load_library,
-                    self.custom_addr))
+            if multi_slot:
+                slots = [_SessionSlot(i,
+                                      slot_cpus[i] if slot_cpus is not None else None,
+                                      slot_devices[i] if slot_devices is not None else None)
+                         for i in range(num_slots)]
+                self.proc = multiprocessing.Process(
+                    target=_multi_slot_listen_loop, args=(
+                        self.sock, self.port, key, tracker_addr, load_library,
+                        self.custom_addr, slots, cache))
+            else:
+                self.proc = multiprocessing.Process(
+                    target=_listen_loop, args=(
+                        self.sock, self.port, key, tracker_addr, load_library,
+                        self.custom_addr, cache))
             self.proc.deamon = True
             self.proc.start()
         else:
             self.proc = multiprocessing.Process(
-                target=_connect_proxy_loop, args=((host, port), key, load_library))
+                target=_connect_proxy_loop, args=((host, port), key, load_library, cache))
             self.proc.deamon = True
             self.proc.start()
 
@@ -36,12 +36,20 @@ List of available APIs:
   - return: TrackerCode.SUCCESS
   - note: match-key is a randomly generated identify the resource during connection.
 - REQUEST: request a new resource from tracker
-  - input: [TrackerCode.REQUEST, [key, user, priority]]
+  - input: [TrackerCode.REQUEST, [key, user, priority, prefer]]
   - return: [TrackerCode.SUCCESS, [url, port, match-key]]
+  - note: prefer is optional, "least_loaded" or "fastest" picks the matching server.
+- UPDATE_INFO: update the information of a connection
+  - input: [TrackerCode.UPDATE_INFO, info-dict]
+  - return: TrackerCode.SUCCESS
+  - note: servers report their "health" and the outcome of the last "session".
+    A session the server killed on timeout is not counted as a failure.
 """
 # pylint: disable=invalid-name
 
+import collections
 import heapq
+import itertools
 import time
 import logging
 import socket
@@ -63,6 +71,115 @@ from .base import RPC_TRACKER_MAGIC, TrackerCode
 
 logger = logging.getLogger("RPCTracker")
 
+# number of consecutive failed sessions that quarantine a server
+QUARANTINE_FAILURES = 3
+# minimum success rate over the recent sessions of a server
+MIN_SUCCESS_RATE = 0.5
+# temperature in Celsius at which a server is considered throttled
+MAX_TEMPERATURE = 85.0
+# seconds a server stays in quarantine
+QUARANTINE_TIME = 120.0
+
+
+class _ServerStats(object):
+    """Session statistics and health of a server connection.
+
+    Parameters
+    ----------
+    window : int, optional
+        The number of recent sessions used for the success rate.
+
+    decay : float, optional
+        The weight of the newest session in the moving average of the latency.
+    """
+    def __init__(self, window=20, decay=0.3):
+        self.sessions = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.consecutive_failures = 0
+        # moving average of the session duration in seconds
+        self.latency = None
+        self.health = {}
+        self.quarantine_until = 0.0
+        self._recent = collections.deque(maxlen=window)
+        self._decay = decay
+
+    def success_rate(self):
+        """Success rate of the recent sessions, 1 before any session"""
+        if not self._recent:
+            return 1.0
+        return sum(self._recent) / float(len(self._recent))
+
+    def quarantined(self):
+        """Whether the server must not be handed out now"""
+        return time.time() < self.quarantine_until
+
+    def add_session(self, duration, success, timeout=False):
+        """Record the outcome of a session, return True if the server is unhealthy.
+        A session killed by the server on timeout was ended by the limit the
+        client asked for, and says nothing about the device."""
+        self.sessions += 1
+        if timeout:
+            self.timeouts += 1
+            return False
+        self._recent.append(1 if success else 0)
+        if success:
+            self.consecutive_failures = 0
+            if self.latency is None:
+                self.latency = duration
+            else:
+                self.latency += self._decay * (duration - self.latency)
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+        return self.consecutive_failures >= QUARANTINE_FAILURES or \
+            (len(self._recent) >= 5 and self.success_rate() < MIN_SUCCESS_RATE)
+
+    def update_health(self, health):
+        """Record the health reported by the server, return True if it is unhealthy"""
+        self.health = health
+        return health.get("temperature", 0) >= MAX_TEMPERATURE
+
+    def quarantine(self):
+        """Stop handing out the server for QUARANTINE_TIME seconds"""
+        logger.warning("Quarantine server for %g seconds: success rate %.2f, health %s",
+                       QUARANTINE_TIME, self.success_rate(), self.health)
+        self.quarantine_until = time.time() + QUARANTINE_TIME
+        # the server gets a fresh start once the quarantine ends
+        self._recent.clear()
+        self.consecutive_failures = 0
+
+    def summary(self):
+        return {"sessions": self.sessions,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "success_rate": self.success_rate(),
+                "latency": self.latency,
+                "health": self.health,
+                "quarantined": self.quarantined()}
+
+
+def _value_order(prefer):
+    """Sort key of the free resources for a request preference.
+
+    By default the resources are taken in FIFO order, after the servers
+    without a recent failure. "least_loaded" prefers servers with the fewest
+    active sessions per slot and the lowest reported load, "fastest" the
+    servers with the shortest sessions, servers without history first.
+    """
+    if prefer == "least_loaded":
+        def _order(value):
+            conn = value[0]
+            return (len(conn.leased_matchkeys) / float(conn.summary().get("slots", 1)),
+                    conn.stats.health.get("load", 0))
+    elif prefer == "fastest":
+        def _order(value):
+            return value[0].stats.latency or 0
+    else:
+        def _order(value):
+            return value[0].stats.consecutive_failures > 0
+    return _order
+
 class Scheduler(object):
     """Abstratc interface of scheduler."""
     def put(self, value):
@@ -77,7 +194,7 @@ class Scheduler(object):
         """
         raise NotImplementedError()
 
-    def request(self, user, priority, callback):
+    def request(self, user, priority, callback, prefer=None):
         """Request a resource.
 
         Parameters
@@ -91,6 +208,9 @@ class Scheduler(object):
         callback : function: value->bool
             Callback function to receive an resource when ready
             returns True if the resource is consumed.
+
+        prefer : str, optional
+            Which free resource to prefer, "least_loaded" or "fastest".
         """
         raise NotImplementedError()
 
@@ -103,35 +223,90 @@ class Scheduler(object):
             The resource to remove
         """
 
+    def release(self, matchkey):
+        """Notify the scheduler that the lease of a resource ended.
+
+        Parameters
+        ----------
+        matchkey: str
+            The match key of the resource handed out
+        """
+
+    def refresh(self):
+        """Serve pending requests again after the state of a resource changed."""
 
     def summary(self):
         """Get summary information of the scheduler."""
         raise NotImplementedError()
 
 
+class _UserStats(object):
+    """Per-user lease statistics of a scheduler"""
+    def __init__(self):
+        self.pending = 0
+        self.active = 0
+        self.granted = 0
+        self.total_wait = 0.0
+
+    def summary(self):
+        return {"pending": self.pending,
+                "active": self.active,
+                "granted": self.granted,
+                "avg_wait": self.total_wait / self.granted if self.granted else 0.0}
+
+
 class PriorityScheduler(Scheduler):
     """Priority based scheduler, FIFO based on time"""
     def __init__(self, key):
         self._key = key
-        self._values = []
+        self._values = collections.deque()
         self._requests = []
+        # match key -> user of the resources handed out
+        self._leases = {}
+        self._users = collections.defaultdict(_UserStats)
+        # tie breaker of requests made at the same time
+        self._seq = itertools.count()
+
+    def _grant(self, value, user, request_time):
+        """Record that value was handed out to user"""
+        value[0].pending_matchkeys.remove(value[-1])
+        value[0].leased_matchkeys.append(value[-1])
+        self._leases[value[-1]] = user
+        stats = self._users[user]
+        stats.active += 1
+        stats.granted += 1
+        stats.total_wait += time.time() - request_time
+
+    def _pop_value(self, prefer=None):
+        """Take the free resource preferred by a request, None if every one is quarantined"""
+        candidates = [value for value in self._values if not value[0].stats.quarantined()]
+        if not candidates:
+            return None
+        value = min(candidates, key=_value_order(prefer))
+        self._values.remove(value)
+        return value
 
     def _schedule(self):
         while self._requests and self._values:
-            value = self._values.pop(0)
+            value = self._pop_value(self._requests[0][4])
+            if value is None:
+                return
             item = heapq.heappop(self._requests)
-            callback = item[-1]
+            user, callback = item[3], item[-1]
+            self._users[user].pending -= 1
             if callback(value[1:]):
-                value[0].pending_matchkeys.remove(value[-1])
+                self._grant(value, user, item[1])
             else:
-                self._values.append(value)
+                self._values.appendleft(value)
 
     def put(self, value):
         self._values.append(value)
         self._schedule()
 
-    def request(self, user, priority, callback):
-        heapq.heappush(self._requests, (-priority, time.time(), callback))
+    def request(self, user, priority, callback, prefer=None):
+        self._users[user].pending += 1
+        heapq.heappush(self._requests,
+                       (-priority, time.time(), next(self._seq), user, prefer, callback))
         self._schedule()
 
     def remove(self, value):
@@ -139,21 +314,127 @@ class PriorityScheduler(Scheduler):
             self._values.remove(value)
             self._schedule()
 
+    def release(self, matchkey):
+        user = self._leases.pop(matchkey, None)
+        if user is not None:
+            self._users[user].active -= 1
+            self._schedule()
+
+    def refresh(self):
+        self._schedule()
+
     def summary(self):
         """Get summary information of the scheduler."""
         return {"free": len(self._values),
-                "pending": len(self._requests)}
+                "pending": len(self._requests),
+                "users": {user: stats.summary() for user, stats in self._users.items()}}
+
+
+class FairShareScheduler(PriorityScheduler):
+    """Weighted fair-share scheduler across users.
+
+    Every user has its own queue ordered by priority and then time.
+    A free resource goes to the user with the fewest active leases relative
+    to its weight, ties broken by the aged priority of the head request.
+    A request waiting longer than the deadline is served before any other.
+
+    Parameters
+    ----------
+    key : str
+        The device key.
 
+    user_weights : dict of str to float, optional
+        The share of every user, 1 for users not in the dict.
 
-class TCPEventHandler(tornado_util.TCPHandler):
+    max_leases : int, optional
+        Maximum number of resources a user can hold at the same time.
+
+    deadline : float, optional
+        Requests waiting longer than this number of seconds are served first.
+
+    aging : float, optional
+        The priority of a request increases by one every this number of seconds.
+    """
+    def __init__(self, key, user_weights=None, max_leases=None, deadline=None, aging=60):
+        super(FairShareScheduler, self).__init__(key)
+        self._user_weights = user_weights or {}
+        self._max_leases = max_leases
+        self._deadline = deadline
+        self._aging = aging
+        # user -> heap of (-priority, time, seq, user, prefer, callback)
+        self._user_requests = collections.defaultdict(list)
+        self._num_requests = 0
+
+    def _pick_user(self):
+        """The user to serve next, None if no user can be served"""
+        now = time.time()
+        best, best_key = None, None
+        for user, requests in self._user_requests.items():
+            if not requests:
+                continue
+            stats = self._users[user]
+            if self._max_leases is not None and stats.active >= self._max_leases:
+                continue
+            neg_priority, request_time = requests[0][:2]
+            wait = now - request_time
+            if self._deadline is not None and wait > self._deadline:
+                order = (0, request_time)
+            else:
+                share = stats.active / float(self._user_weights.get(user, 1))
+                aged_priority = -neg_priority + (wait / self._aging if self._aging else 0)
+                order = (1, share, -aged_priority, request_time)
+            if best_key is None or order < best_key:
+                best, best_key = user, order
+        return best
+
+    def _schedule(self):
+        while self._num_requests and self._values:
+            user = self._pick_user()
+            if user is None:
+                return
+            value = self._pop_value(self._user_requests[user][0][4])
+            if value is None:
+                return
+            item = heapq.heappop(self._user_requests[user])
+            self._num_requests -= 1
+            self._users[user].pending -= 1
+            if item[-1](value[1:]):
+                self._grant(value, user, item[1])
+            else:
+                self._values.appendleft(value)
+
+    def request(self, user, priority, callback, prefer=None):
+        self._users[user].pending += 1
+        heapq.heappush(self._user_requests[user],
+                       (-priority, time.time(), next(self._seq), user, prefer, callback))
+        self._num_requests += 1
+        self._schedule()
+
+    def summary(self):
+        """Get summary information of the scheduler."""
+        res = super(FairShareScheduler, self).summary()
+        res["pending"] = self._num_requests
+        return res
+
+
+SCHEDULERS = {
+    "priority": PriorityScheduler,
+    "fairshare": FairShareScheduler,
+}
+
+
+class TrackerConnection(object):
     """Base asynchronize message handler.
 
     The tracker and client follows a simple message protocol.
     The message is in form [nbytes(int32)] [json-str].
     All the information is packed in json-str
+
+    The transport is provided by a subclass, which sets the ``_sock``
+    attribute, implements ``write_message`` and ``close``, and calls
+    ``on_message`` with the received bytes and ``on_close`` once closed.
     """
-    def __init__(self, tracker, sock, addr):
-        super(TCPEventHandler, self).__init__(sock)
+    def __init__(self, tracker, addr):
         self._data = bytearray()
         self._tracker = tracker
         self._msg_size = 0
@@ -162,6 +443,9 @@ class TCPEventHandler(tornado_util.TCPHandler):
         self._info = {"addr": addr}
         # list of pending match keys that has not been used.
         self.pending_matchkeys = set()
+        # match keys handed out to clients whose session has not ended yet.
+        self.leased_matchkeys = []
+        self.stats = _ServerStats()
         self._tracker._connections.add(self)
         self.put_values = []
 
@@ -173,6 +457,13 @@ class TCPEventHandler(tornado_util.TCPHandler):
         """Summary of this connection"""
         return self._info
 
+    def server_summary(self):
+        """Summary of this connection including the statistics of the server"""
+        res = dict(self._info)
+        res["stats"] = self.stats.summary()
+        res["active"] = len(self.leased_matchkeys)
+        return res
+
     def _init_conn(self, message):
         """Initialie the connection"""
         if len(message) != 4:
@@ -228,6 +519,17 @@ class TCPEventHandler(tornado_util.TCPHandler):
         if code == TrackerCode.PUT:
             key = args[1]
             port, matchkey = args[2]
+            # a server reports a resource again once its previous session ended,
+            # optionally naming the match key of that session. Without a name,
+            # the lease is only known when the server holds exactly one.
+            released = args[4] if len(args) > 4 else None
+            if released is None and len(self.leased_matchkeys) == 1:
+                released = self.leased_matchkeys[0]
+            if released in self.leased_matchkeys:
+                self.leased_matchkeys.remove(released)
+                self._tracker.release(key, released)
+            elif released is not None:
+                logger.warning("%s released unknown match key %s", self.name(), released)
             self.pending_matchkeys.add(matchkey)
             # got custom address (from rpc server)
             if args[3] is not None:
@@ -241,6 +543,7 @@ class TCPEventHandler(tornado_util.TCPHandler):
             key = args[1]
             user = args[2]
             priority = args[3]
+            prefer = args[4] if len(args) > 4 else None
             def _cb(value):
                 # if the connection is already closed
                 if not self._sock:
@@ -250,7 +553,7 @@ class TCPEventHandler(tornado_util.TCPHandler):
                 except (socket.error, IOError):
                     return False
                 return True
-            self._tracker.request(key, user, priority, _cb)
+            self._tracker.request(key, user, priority, _cb, prefer)
         elif code == TrackerCode.PING:
             self.ret_value(TrackerCode.SUCCESS)
         elif code == TrackerCode.GET_PENDING_MATCHKEYS:
@@ -263,7 +566,17 @@ class TCPEventHandler(tornado_util.TCPHandler):
             else:
                 self.ret_value(TrackerCode.FAIL)
         elif code == TrackerCode.UPDATE_INFO:
-            self._info.update(args[1])
+            info = dict(args[1])
+            session = info.pop("session", None)
+            unhealthy = False
+            if "health" in info:
+                unhealthy = self.stats.update_health(info.pop("health"))
+            if session is not None:
+                unhealthy |= self.stats.add_session(session["duration"], session["success"],
+                                                    session.get("timeout", False))
+            self._info.update(info)
+            if unhealthy and "key" in self._info:
+                self._tracker.quarantine(self)
             self.ret_value(TrackerCode.SUCCESS)
         elif code == TrackerCode.SUMMARY:
             status = self._tracker.summary()
@@ -280,32 +593,54 @@ class TCPEventHandler(tornado_util.TCPHandler):
         self.close()
 
 
+class TCPEventHandler(TrackerConnection, tornado_util.TCPHandler):
+    """Tracker connection on the tornado event loop."""
+    def __init__(self, tracker, sock, addr):
+        tornado_util.TCPHandler.__init__(self, sock)
+        TrackerConnection.__init__(self, tracker, addr)
+
+
 class TrackerServerHandler(object):
     """Tracker that tracks the resources."""
-    def __init__(self, sock, stop_key):
+    def __init__(self, sock, stop_key, scheduler="priority", scheduler_kwargs=None,
+                 quarantine=False):
         self._scheduler_map = {}
+        self._quarantine = quarantine
+        if isinstance(scheduler, str):
+            scheduler = SCHEDULERS[scheduler]
+        self._scheduler_cls = scheduler
+        self._scheduler_kwargs = scheduler_kwargs or {}
         self._sock = sock
         self._sock.setblocking(0)
-        self._ioloop = ioloop.IOLoop.current()
         self._stop_key = stop_key
         self._connections = set()
+        self._ioloop = None
+        self._listen()
+
+    def _listen(self):
+        """Start accepting connections on the event loop."""
+        self._ioloop = ioloop.IOLoop.current()
         def _event_handler(_, events):
             self._on_event(events)
         self._ioloop.add_handler(
             self._sock.fileno(), _event_handler, self._ioloop.READ)
 
+    def _new_connection(self, conn, addr):
+        """Handle an accepted connection."""
+        TCPEventHandler(self, conn, addr)
+
     def _on_event(self, _):
         while True:
             try:
                 conn, addr = self._sock.accept()
-                TCPEventHandler(self, conn, addr)
+                self._new_connection(conn, addr)
             except socket.error as err:
                 if err.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
                     break
 
     def create_scheduler(self, key):
         """Create a new scheduler."""
-        return PriorityScheduler(key)
+        return self._scheduler_cls(key, **self._scheduler_kwargs)
 
     def put(self, key, value):
         """Report a new resource to the tracker."""
@@ -313,11 +648,36 @@ class TrackerServerHandler(object):
             self._scheduler_map[key] = self.create_scheduler(key)
         self._scheduler_map[key].put(value)
 
-    def request(self, key, user, priority, callback):
+    def request(self, key, user, priority, callback, prefer=None):
         """Request a new resource."""
         if key not in self._scheduler_map:
             self._scheduler_map[key] = self.create_scheduler(key)
-        self._scheduler_map[key].request(user, priority, callback)
+        self._scheduler_map[key].request(user, priority, callback, prefer)
+
+    def refresh_later(self, key, delay):
+        """Serve the pending requests of key again once a quarantine ends."""
+        def _refresh():
+            if key in self._scheduler_map:
+                self._scheduler_map[key].refresh()
+        self._ioloop.call_later(delay, _refresh)
+
+    def quarantine(self, conn):
+        """Quarantine an unhealthy server, unless quarantine is disabled
+        or no other server of its key would be left to serve the requests."""
+        if not self._quarantine:
+            return
+        key = conn._info["key"]
+        if not any(other is not conn and other._info.get("key") == key and
+                   not other.stats.quarantined() for other in self._connections):
+            logger.warning("Do not quarantine the last server of %s", key)
+            return
+        conn.stats.quarantine()
+        self.refresh_later(key.split(':')[1], QUARANTINE_TIME)
+
+    def release(self, key, matchkey):
+        """Notify that the session of a resource handed out ended."""
+        if key in self._scheduler_map:
+            self._scheduler_map[key].release(matchkey)
 
     def close(self, conn):
         self._connections.remove(conn)
@@ -325,6 +685,8 @@ class TrackerServerHandler(object):
             key = conn._info['key'].split(':')[1]  # 'server:rasp3b' -> 'rasp3b'
             for value in conn.put_values:
                 self._scheduler_map[key].remove(value)
+            for matchkey in conn.leased_matchkeys:
+                self.release(key, matchkey)
 
     def stop(self):
         """Safely stop tracker."""
@@ -341,7 +703,7 @@ class TrackerServerHandler(object):
         cinfo = []
         # ignore client connections without key
         for conn in self._connections:
-            res = conn.summary()
+            res = conn.server_summary()
             if res.get("key", "").startswith("server"):
                 cinfo.append(res)
         return {"queue_info": qinfo, "server_info": cinfo}
@@ -350,8 +712,9 @@ class TrackerServerHandler(object):
         """Run the tracker server"""
         self._ioloop.start()
 
-def _tracker_server(listen_sock, stop_key):
-    handler = TrackerServerHandler(listen_sock, stop_key)
+def _tracker_server(listen_sock, stop_key, scheduler, scheduler_kwargs, quarantine):
+    handler = TrackerServerHandler(listen_sock, stop_key, scheduler, scheduler_kwargs,
+                                   quarantine)
     handler.run()
 
 
@@ -373,12 +736,27 @@ class Tracker(object):
 
     silent: bool, optional
         Whether run in silent mode
+
+    scheduler: str or class, optional
+        The scheduler policy of every device key, either a name in SCHEDULERS
+        ('priority' or 'fairshare') or a :any:`Scheduler` class.
+
+    scheduler_kwargs: dict, optional
+        Additional arguments of the scheduler, e.g. user_weights,
+        max_leases, deadline and aging for the fairshare scheduler.
+
+    quarantine: bool, optional
+        Whether servers with repeated failed sessions or a high temperature
+        are taken out of service for a while.
     """
     def __init__(self,
                  host,
                  port=9190,
                  port_end=9199,
-                 silent=False):
+                 silent=False,
+                 scheduler="priority",
+                 scheduler_kwargs=None,
+                 quarantine=False):
         if silent:
             logger.setLevel(logging.WARN)
 
@@ -400,7 +778,8 @@ class Tracker(object):
         logger.info("bind to %s:%d", host, self.port)
         sock.listen(1)
         self.proc = multiprocessing.Process(
-            target=_tracker_server, args=(sock, self.stop_key))
+            target=_tracker_server,
+            args=(sock, self.stop_key, scheduler, scheduler_kwargs, quarantine))
         self.proc.start()
         self.host = host
         # close the socket on this process
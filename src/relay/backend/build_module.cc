@@ -126,8 +126,9 @@ class RelayBuildModule : public runtime::ModuleNode {
       });
     } else if (name == "build") {
       return PackedFunc([sptr_to_self, this](TVMArgs args, TVMRetValue* rv) {
-        CHECK_EQ(args.num_args, 3);
-        this->Build(args[0], args[1], args[2]);
+        CHECK(args.num_args == 3 || args.num_args == 4);
+        bool codegen = args.num_args == 3 || static_cast<bool>(args[3]);
+        this->Build(args[0], args[1], args[2], codegen);
       });
     } else if (name == "list_params") {
       return PackedFunc([sptr_to_self, this](TVMArgs args, TVMRetValue* rv) {
@@ -223,13 +224,16 @@ class RelayBuildModule : public runtime::ModuleNode {
    * \param func Relay Function
    * \param target Target device
    * \param target_host Host target device
+   * \param codegen Whether to generate the module from the lowered functions.
+   *  If false, the caller gets the lowered functions and generates the code.
    */
   void Build(Function func,
              const TargetsMap& targets,
-             const tvm::Target& target_host) {
+             const tvm::Target& target_host,
+             bool codegen = true) {
     targets_ = targets;
     target_host_ = target_host;
-    BuildRelay(func, params_);
+    BuildRelay(func, params_, codegen);
   }
 
  protected:
@@ -436,10 +440,12 @@ class RelayBuildModule : public runtime::ModuleNode {
    *
    * \param func The Relay function.
    * \param params The parameters.
+   * \param codegen Whether to generate the module from the lowered functions.
    */
   void BuildRelay(
       Function func,
-      const std::unordered_map<std::string, tvm::runtime::NDArray>& params) {
+      const std::unordered_map<std::string, tvm::runtime::NDArray>& params,
+      bool codegen = true) {
     if (params.size()) {
       func = BindParamsByName(func, params);
     }
@@ -462,7 +468,7 @@ class RelayBuildModule : public runtime::ModuleNode {
     auto lowered_funcs = graph_codegen_->GetLoweredFunc();
     if (lowered_funcs.size() == 0) {
       LOG(WARNING) << "no lowered funcs exist in the compiled module";
-    } else {
+    } else if (codegen) {
       ret_.mod = tvm::build(
         lowered_funcs,
         target_host_,
@@ -28,6 +28,7 @@
 #include <tvm/runtime/packed_func.h>
 #include <tvm/runtime/registry.h>
 #include <tvm/runtime/serializer.h>
+#include <tvm/runtime/util.h>
 
 #include <algorithm>
 #include <functional>
@@ -90,7 +91,7 @@ void GraphRuntime::Init(const std::string& graph_json,
  * \param name The name of the input.
  * \return The index of input.
  */
-int GraphRuntime::GetInputIndex(const std::string& name) {
+int GraphRuntime::GetInputIndex(const std::string& name) const {
   auto it = input_map_.find(name);
   if (it != input_map_.end()) {
     return it->second;
@@ -133,6 +134,36 @@ void GraphRuntime::SetInputZeroCopy(int index, DLTensor* data_ref) {
     t->data = data_ref->data;
   }
 }
+/*!
+ * \brief set index-th output of the graph to a buffer owned by the caller.
+ *  The ops write the output into the buffer directly.
+ * \param index The output index.
+ * \param data_ref The output buffer that is referred.
+ */
+void GraphRuntime::SetOutputZeroCopy(int index, DLTensor* data_ref) {
+  CHECK_LT(static_cast<size_t>(index), outputs_.size());
+  uint32_t eid = this->entry_id(outputs_[index]);
+  CHECK(!output_dltensors_[eid].empty())
+      << "output " << index << " is not computed by an op and cannot be bound";
+  const DLTensor* old_t = data_entry_[eid].operator->();
+
+  // check the consistency of output
+  CHECK_EQ(data_alignment_[eid], details::GetDataAlignment(*data_ref));
+  CHECK_EQ(reinterpret_cast<size_t>(data_ref->data) % kAllocAlignment, 0);
+  CHECK(TypeMatch(old_t->dtype, data_ref->dtype.code, data_ref->dtype.bits,
+                  data_ref->dtype.lanes));
+  CHECK_EQ(old_t->ndim, static_cast<size_t>(data_ref->ndim));
+  CHECK_EQ(old_t->ctx.device_type, data_ref->ctx.device_type);
+  CHECK_EQ(old_t->ctx.device_id, data_ref->ctx.device_id);
+  for (auto i = 0; i < data_ref->ndim; ++i) {
+    CHECK_EQ(old_t->shape[i], data_ref->shape[i]);
+  }
+
+  // Update the data pointer for the op writing the output and the ops reading it
+  for (DLTensor* t : output_dltensors_[eid]) {
+    t->data = data_ref->data;
+  }
+}
 /*!
  * \brief Get the number of outputs
  *
@@ -235,16 +266,43 @@ void GraphRuntime::ShareParams(const GraphRuntime& other, dmlc::Stream* strm) {
   strm->Read(&sz);
   size_t size = static_cast<size_t>(sz);
   CHECK(size == names.size()) << "Invalid parameters file format";
+  std::unordered_set<uint32_t> shared_eids;
   for (size_t i = 0; i < size; ++i) {
     int in_idx = GetInputIndex(names[i]);
     CHECK_GE(in_idx, 0) << "Found param for non-existent input: " << names[i];
     uint32_t eid = this->entry_id(input_nodes_[in_idx], 0);
     CHECK_LT(eid, data_entry_.size());
     CHECK_EQ(data_entry_[eid].use_count(), 1);
-    data_entry_[eid] = other.GetInput(GetInputIndex(names[i]));
+    // the graphs may differ, e.g. when they are compiled for different batch sizes
+    int other_idx = other.GetInputIndex(names[i]);
+    CHECK_GE(other_idx, 0) << "Found param missing in the shared runtime: " << names[i];
+    NDArray shared = other.GetInput(other_idx);
+    const DLTensor* own = data_entry_[eid].operator->();
+    const DLTensor* src = shared.operator->();
+    CHECK(own->ndim == src->ndim &&
+          std::equal(own->shape, own->shape + own->ndim, src->shape) &&
+          own->dtype.code == src->dtype.code && own->dtype.bits == src->dtype.bits &&
+          own->dtype.lanes == src->dtype.lanes)
+      << "Cannot share param " << names[i] << " of a different shape or type";
+    data_entry_[eid] = shared;
     CHECK_GT(data_entry_[eid].use_count(), 1);
     const DLTensor* tmp = data_entry_[eid].operator->();
     data_alignment_[eid] = details::GetDataAlignment(*tmp);
+    shared_eids.insert(eid);
+  }
+  // Release the storage that only held the shared params, so that an instance
+  // sharing the params only keeps the memory of its activations.
+  std::vector<bool> releasable(storage_pool_.size(), false);
+  for (uint32_t eid : shared_eids) {
+    releasable[attrs_.storage_id[eid]] = true;
+  }
+  for (size_t eid = 0; eid < data_entry_.size(); ++eid) {
+    if (shared_eids.count(eid) == 0) {
+      releasable[attrs_.storage_id[eid]] = false;
+    }
+  }
+  for (size_t sid = 0; sid < storage_pool_.size(); ++sid) {
+    if (releasable[sid]) storage_pool_[sid] = NDArray();
   }
   this->SetupOpExecs();
 }
@@ -321,11 +379,16 @@ void GraphRuntime::SetupStorage() {
 void GraphRuntime::SetupOpExecs() {
   op_execs_.resize(this->GetNumOfNodes());
   input_dltensors_.resize(num_node_entries());
+  output_dltensors_.resize(num_node_entries());
   std::unordered_set<uint32_t> input_node_eids;
   for (size_t i = 0; i < input_nodes_.size(); i++) {
     uint32_t nid = input_nodes_[i];
     input_node_eids.insert(entry_id(nid, 0));
   }
+  std::unordered_set<uint32_t> output_node_eids;
+  for (size_t i = 0; i < outputs_.size(); i++) {
+    output_node_eids.insert(entry_id(outputs_[i]));
+  }
 
   // setup the array and requirements.
   for (uint32_t nid = 0; nid < this->GetNumOfNodes(); ++nid) {
@@ -353,6 +416,19 @@ void GraphRuntime::SetupOpExecs() {
         input_dltensors_[eid].push_back(
             static_cast<DLTensor*>(op_args->arg_values[i].v_handle));
       }
+      // check if op input is a model output computed by an earlier op
+      if (output_node_eids.count(eid) > 0 && input_node_eids.count(eid) == 0) {
+        output_dltensors_[eid].push_back(
+            static_cast<DLTensor*>(op_args->arg_values[i].v_handle));
+      }
+    }
+    for (uint32_t index = 0; index < inode.param.num_outputs; ++index) {
+      uint32_t eid = this->entry_id(nid, index);
+      // check if op output is model output
+      if (output_node_eids.count(eid) > 0) {
+        output_dltensors_[eid].push_back(static_cast<DLTensor*>(
+            op_args->arg_values[inode.inputs.size() + index].v_handle));
+      }
     }
   }
 }
@@ -423,12 +499,24 @@ PackedFunc GraphRuntime::GetFunction(
         }
       });
   } else if (name == "set_input_zero_copy") {
+    // takes one or more (key, array) pairs, so that all inputs are bound in one call
     return PackedFunc([sptr_to_self, this](TVMArgs args, TVMRetValue* rv) {
-      if (args[0].type_code() == kStr) {
-        int in_idx = this->GetInputIndex(args[0]);
-        if (in_idx >= 0) this->SetInputZeroCopy(in_idx, args[1]);
-      } else {
-        this->SetInputZeroCopy(args[0], args[1]);
+      CHECK_EQ(args.num_args % 2, 0);
+      for (int i = 0; i < args.num_args; i += 2) {
+        if (args[i].type_code() == kStr) {
+          int in_idx = this->GetInputIndex(args[i]);
+          if (in_idx >= 0) this->SetInputZeroCopy(in_idx, args[i + 1]);
+        } else {
+          this->SetInputZeroCopy(args[i], args[i + 1]);
+        }
+      }
+    });
+  } else if (name == "set_output_zero_copy") {
+    // takes one or more (index, array) pairs
+    return PackedFunc([sptr_to_self, this](TVMArgs args, TVMRetValue* rv) {
+      CHECK_EQ(args.num_args % 2, 0);
+      for (int i = 0; i < args.num_args; i += 2) {
+        this->SetOutputZeroCopy(args[i], args[i + 1]);
       }
     });
   } else if (name == "get_output") {
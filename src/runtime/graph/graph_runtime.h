@@ -111,7 +111,7 @@ class GraphRuntime : public ModuleNode {
    * \param name The name of the input.
    * \return The index of input.
    */
-  int GetInputIndex(const std::string& name);
+  int GetInputIndex(const std::string& name) const;
 
   /*!
    * \brief set index-th input to the graph.
@@ -125,6 +125,12 @@ class GraphRuntime : public ModuleNode {
    * \param data_ref The input data that is referred.
    */
   void SetInputZeroCopy(int index, DLTensor* data_ref);
+  /*!
+   * \brief set index-th output of the graph to a buffer owned by the caller.
+   * \param index The output index.
+   * \param data_ref The output buffer that is referred.
+   */
+  void SetOutputZeroCopy(int index, DLTensor* data_ref);
   /*!
    * \brief Get the number of outputs
    *
@@ -402,6 +408,8 @@ class GraphRuntime : public ModuleNode {
   std::unordered_map<std::string, uint32_t> input_map_;
   /*! \brief Used for quick node input DLTensor* lookup given an input eid. */
   std::vector<std::vector<DLTensor*>> input_dltensors_;
+  /*! \brief Used for quick op argument DLTensor* lookup given an output eid. */
+  std::vector<std::vector<DLTensor*>> output_dltensors_;
   /*! \brief Used for quick entry indexing. */
   std::vector<uint32_t> node_row_ptr_;
   /*! \brief Output entries. */
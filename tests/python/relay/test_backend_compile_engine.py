@@ -14,6 +14,8 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import os
+
 import tvm
 import tvm.testing
 import numpy as np
@@ -108,6 +110,70 @@ def test_compile_nhwc_pack():
     relay.build(mod, target="llvm")
 
 
+def test_compile_cache():
+    from tvm.contrib import graph_runtime, util
+    from tvm.relay.backend import compile_cache
+
+    x = relay.var("x", shape=(4, 8))
+    y = relay.nn.relu(relay.add(x, relay.const(1.0)))
+    z = relay.exp(relay.sum(y, axis=1))
+    func = relay.Function([x], z)
+    data = np.random.uniform(size=(4, 8)).astype("float32")
+
+    def _run():
+        relay.backend.compile_engine.get().clear()
+        graph, lib, params = relay.build(relay.Module.from_expr(func), "llvm")
+        m = graph_runtime.create(graph, lib, tvm.cpu())
+        m.set_input("x", data)
+        m.run()
+        return m.get_output(0).asnumpy()
+
+    tmp = util.tempdir()
+    cache = compile_cache.enable(tmp.relpath("cache"))
+    try:
+        expected = _run()
+        assert cache.hits == 0 and cache.misses > 0
+        assert cache.size() > 0
+        # the functions get new unique names after the in-memory cache is cleared
+        tvm.testing.assert_allclose(_run(), expected)
+        assert cache.hits == cache.misses
+
+        cache.max_size = 1
+        cache.put("0" * 40, "f", [])
+        assert cache.size() == 0
+    finally:
+        compile_cache.disable()
+    tvm.testing.assert_allclose(_run(), expected)
+
+
+def test_compile_cache_cross_process():
+    import subprocess
+    import sys
+    from tvm.contrib import util
+    from tvm.relay.backend import compile_cache
+
+    build_py = """
+import tvm
+from tvm import relay
+x = relay.var("x", shape=(4, 8))
+y = relay.nn.relu(relay.add(x, relay.const(1.0)))
+func = relay.Function([x], relay.exp(relay.sum(y, axis=1)))
+relay.backend.compile_engine.get().clear()
+relay.build(relay.Module.from_expr(func), "llvm")
+"""
+    tmp = util.tempdir()
+    env = dict(os.environ, TVM_RELAY_COMPILE_CACHE=tmp.relpath("cache"))
+    subprocess.check_call([sys.executable, "-c", build_py], env=env)
+
+    # the entries written by the other process are found by this one
+    cache = compile_cache.enable(tmp.relpath("cache"))
+    try:
+        exec(build_py, {})
+        assert cache.hits > 0 and cache.misses == 0
+    finally:
+        compile_cache.disable()
+
+
 if __name__ == "__main__":
     test_compile_engine()
     test_compile_placeholder_bypass()
@@ -115,3 +181,5 @@ if __name__ == "__main__":
     test_compile_tuple_dup()
     test_compile_full()
     test_compile_nhwc_pack()
+    test_compile_cache()
+    test_compile_cache_cross_process()
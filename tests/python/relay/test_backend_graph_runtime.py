@@ -179,6 +179,77 @@ def test_gru_like():
             ref = unit_numpy(x, y)
             tvm.testing.assert_allclose(out, ref, rtol=1e-5, atol=1e-5)
 
+def test_parallel_build():
+    from tvm.contrib import util
+    x = relay.var("x", shape=(8, 16))
+    w = relay.var("w", shape=(4, 16))
+    y = relay.nn.relu(relay.nn.dense(x, w))
+    z = relay.sum(relay.exp(y), axis=1) + relay.const(1.0)
+    func = relay.Function([x, w], relay.Tuple([z, relay.sigmoid(y)]))
+    data = {"x": np.random.uniform(size=(8, 16)).astype("float32"),
+            "w": np.random.uniform(size=(4, 16)).astype("float32")}
+
+    def _run(graph, lib):
+        m = graph_runtime.create(graph, lib, tvm.cpu())
+        m.set_input(**data)
+        m.run()
+        return [m.get_output(i).asnumpy() for i in range(2)]
+
+    graph, lib, _ = relay.build(Module.from_expr(func), "llvm")
+    expected = _run(graph, lib)
+    pgraph, plib, _ = relay.build(Module.from_expr(func), "llvm", n_parallel=2)
+    assert pgraph == graph
+    for out, ref in zip(_run(pgraph, plib), expected):
+        tvm.testing.assert_allclose(out, ref)
+
+    temp = util.tempdir()
+    path = temp.relpath("lib.so")
+    plib.export_library(path)
+    for out, ref in zip(_run(pgraph, tvm.module.load(path)), expected):
+        tvm.testing.assert_allclose(out, ref)
+
+    # a system library is not linked on the host, it is built like in a serial build
+    _, slib, _ = relay.build(Module.from_expr(func), "llvm -system-lib", n_parallel=2)
+    assert slib.type_key == "llvm"
+
+    # without fused functions, the module is the one of a serial build
+    x = relay.var("x", shape=(8, 16))
+    ident = relay.Function([x], x)
+    graph, lib, _ = relay.build(Module.from_expr(ident), "llvm")
+    pgraph, plib, _ = relay.build(Module.from_expr(ident), "llvm", n_parallel=2)
+    assert pgraph == graph
+    assert type(plib) == type(lib)
+
+def test_dynamic_batching():
+    from tvm.contrib.dynamic_batching import DynamicBatcher
+    w_np = np.random.uniform(size=(4, 16)).astype("float32")
+
+    def build(batch_size):
+        x = relay.var("x", shape=(batch_size, 16))
+        w = relay.var("w", shape=(4, 16))
+        func = relay.Function([x, w], relay.nn.relu(relay.nn.dense(x, w)))
+        return relay.build(func, "llvm", params={"w": w_np})
+
+    with DynamicBatcher(build, [1, 2, 4], tvm.cpu(), max_latency=0.01) as batcher:
+        inputs = [np.random.uniform(size=(n, 16)).astype("float32")
+                  for n in [1, 2, 1, 3, 1, 1, 4, 2]]
+        futures = [batcher.submit({"x": x}) for x in inputs]
+        for x, future in zip(inputs, futures):
+            out = future.result()[0]
+            assert out.shape == (x.shape[0], 4)
+            tvm.testing.assert_allclose(out, np.maximum(x.dot(w_np.T), 0), rtol=1e-5)
+        stats = batcher.stats()
+        assert stats["requests"] == len(inputs)
+        assert stats["samples"] == 15
+        assert stats["batches"] == sum(stats["batch_sizes"].values())
+        assert 0 < stats["fill_ratio"] <= 1
+
+    try:
+        batcher.submit({"x": inputs[0]})
+        assert False
+    except RuntimeError:
+        pass
+
 
 if __name__ == "__main__":
     test_plan_memory()
@@ -187,3 +258,5 @@ if __name__ == "__main__":
     test_add_op_tensor()
     test_add_op_broadcast()
     test_gru_like()
+    test_parallel_build()
+    test_dynamic_batching()
@@ -16,10 +16,12 @@
 # under the License.
 """Test database"""
 import copy
+import os
 import logging
 
+from tvm.contrib import util
 from tvm.autotvm import database
-from tvm.autotvm.record import encode, MeasureResult
+from tvm.autotvm.record import encode, measure_str_key, ApplyHistoryBest, MeasureResult
 
 from test_autotvm_common import get_sample_records
 
@@ -110,9 +112,102 @@ def test_db_filter():
     records = _db.filter(lambda inp, ress: any(r.costs[0] <= 2 for r in ress))
     assert len(records) == 2
 
+def test_record_store():
+    logging.info("test record store ...")
+    temp = util.tempdir()
+    path = temp.relpath("store")
+    records = get_sample_records(5)
+    inp0, _ = records[0]
+    failed = (records[4][0], MeasureResult((0.001,), 4, 0, 0))
+
+    with database.RecordStore(path) as store:
+        for inp, res in records[2:] + [failed] + records[:2]:
+            store.save(inp, res)
+        best_inp, best_res = store.query_best(inp0.target, inp0.task.workload)
+        assert measure_str_key(best_inp) == measure_str_key(inp0)
+        assert best_res.costs == (1,)
+        assert len(list(store)) == 6
+
+    # reopen, the index is loaded from disk
+    store = database.RecordStore(path)
+    assert [measure_str_key(inp) for inp, _ in store] == \
+        [measure_str_key(inp) for inp, _ in records[2:] + [failed] + records[:2]]
+    hist_best = ApplyHistoryBest(store)
+    assert str(hist_best.query(inp0.target, inp0.task.workload)) == str(inp0.config)
+
+    # frames appended after the last flush are indexed on open
+    store.save(records[1][0], MeasureResult((0.5,), 0, 0, 0))
+    store._fdata.close()
+    store = database.RecordStore(path)
+    best_inp, _ = store.query_best(inp0.target, inp0.task.workload)
+    assert measure_str_key(best_inp) == measure_str_key(records[1][0])
+    store.close()
+
+def test_record_store_readonly():
+    logging.info("test read-only record store ...")
+    temp = util.tempdir()
+    path = temp.relpath("store")
+    records = get_sample_records(3)
+    inp0, res0 = records[0]
+    data_file = os.path.join(path, "records.bin")
+    tables_file = os.path.join(path, "tables.json")
+
+    writer = database.RecordStore(path)
+    writer.save(inp0, res0)
+    reader = database.RecordStore(path, readonly=True)
+    assert len(list(reader)) == 1
+
+    # frames appended by the writer are picked up on refresh
+    for inp, res in records[1:]:
+        writer.save(inp, res)
+    reader.refresh()
+    assert len(list(reader)) == 3
+    reader.close()
+    writer.close()
+
+    # frames that refer to table entries missing on disk are skipped, not truncated
+    size = os.path.getsize(data_file)
+    tables = open(tables_file).read()
+    with open(tables_file, "w") as fout:
+        fout.write("".join(tables.splitlines(True)[:1]))
+    with database.RecordStore(path, readonly=True) as reader:
+        assert len(list(reader)) == 0
+    with open(tables_file, "w") as fout:
+        fout.write(tables)
+    assert os.path.getsize(data_file) == size
+
+    hist_best = ApplyHistoryBest(path)
+    with hist_best:
+        assert str(hist_best.query(inp0.target, inp0.task.workload)) == str(inp0.config)
+    assert not hist_best._stores
+    assert os.path.getsize(data_file) == size
+
+def test_record_store_two_writers():
+    logging.info("test record store with two writers ...")
+    from tvm import target as _target
+    from tvm.autotvm.measure import MeasureInput
+    temp = util.tempdir()
+    path = temp.relpath("store")
+    (inp0, res0), (inp1, res1) = get_sample_records(2)
+    inp1 = MeasureInput(_target.create("llvm -device=arm_cpu"), inp1.task, inp1.config)
+
+    # both writers intern a new target, the ids must not collide
+    writer0 = database.RecordStore(path)
+    writer1 = database.RecordStore(path)
+    writer0.save(inp0, res0)
+    writer1.save(inp1, res1)
+    writer0.close()
+    writer1.close()
+
+    with database.RecordStore(path, readonly=True) as reader:
+        assert [str(inp.target) for inp, _ in reader] == [str(inp0.target), str(inp1.target)]
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     test_save_load()
     test_db_hash()
     test_db_latest_all()
     test_db_filter()
+    test_record_store()
+    test_record_store_readonly()
+    test_record_store_two_writers()
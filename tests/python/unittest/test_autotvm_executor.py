@@ -15,9 +15,10 @@
 # specific language governing permissions and limitations
 # under the License.
 """Test local executor"""
+import os
 import time
 
-from tvm.autotvm.measure import LocalExecutor, executor
+from tvm.autotvm.measure import LocalExecutor, PoolExecutor, executor
 
 def slow(n):
     r = 0
@@ -58,6 +59,36 @@ def test_timeout():
     res = f1.get()
     assert isinstance(res, executor.TimeoutError)
 
+def crash_job(n):
+    os._exit(n)
+
+def test_pool_executor():
+    ex = PoolExecutor(timeout=0.5, n_workers=2)
+
+    f1 = ex.submit(slow, 99999)
+    f2 = ex.submit(fast, 99999)
+    assert f1.get() == f2.get()
+
+    # more jobs than workers are queued and streamed to idle workers
+    futures = [ex.submit(fast, i) for i in range(10)]
+    assert [f.get() for f in futures] == [fast(i) for i in range(10)]
+
+    # hang and crash recycle the worker, later jobs still run
+    f1 = ex.submit(timeout_job, 0.5)
+    f2 = ex.submit(crash_job, 1)
+    assert isinstance(f1.get(), executor.TimeoutError)
+    assert isinstance(f2.get(), executor.ExecutionError)
+    assert ex.submit(fast, 10).get() == fast(10)
+
+    # workers that died while idle are replaced when a job is sent to them
+    for worker in ex._workers:
+        worker.process.terminate()
+        worker.process.join()
+    futures = [ex.submit(fast, i) for i in range(4)]
+    assert [f.get() for f in futures] == [fast(i) for i in range(4)]
+    ex.shutdown()
+
 if __name__ == "__main__":
     test_local_measure_async()
     test_timeout()
+    test_pool_executor()
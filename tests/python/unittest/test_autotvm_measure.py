@@ -16,6 +16,7 @@
 # under the License.
 """Test builder and runner"""
 import logging
+import os
 import time
 
 import numpy as np
@@ -25,20 +26,20 @@ from tvm import autotvm
 from test_autotvm_common import get_sample_task, bad_matmul
 from tvm.autotvm.measure.measure import Runner, MeasureResult, MeasureErrorNo
 
-def test_task_tuner_without_measurement():
-    """test task and tuner without measurement"""
-    task, target = get_sample_task()
+class DummyRunner(Runner):
+    def __init__(self, n_parallel=1):
+        super(DummyRunner, self).__init__(1, n_parallel)
 
-    class DummyRunner(Runner):
-        def __init__(self):
-            super(DummyRunner, self).__init__(1, 1)
+    def run(self, measure_inputs, build_results):
+        return [MeasureResult((np.random.random(),), 0, 0.2, time.time())
+                for _ in range(len(measure_inputs))]
 
-        def run(self, measure_inputs, build_results):
-            return [MeasureResult((np.random.random(),), 0, 0.2, time.time())
-                    for _ in range(len(measure_inputs))]
+    def get_build_kwargs(self):
+        return {}
 
-        def get_build_kwargs(self):
-            return {}
+def test_task_tuner_without_measurement():
+    """test task and tuner without measurement"""
+    task, target = get_sample_task()
 
     measure_option = autotvm.measure_option(
         builder=autotvm.LocalBuilder(),
@@ -55,6 +56,169 @@ def test_task_tuner_without_measurement():
         tuner.tune(n_trial=10, measure_option=measure_option)
         assert tuner.best_flops > 1
 
+def test_builder_pool_closed():
+    """test that tuning stops the build workers and the builder can be reused"""
+    task, target = get_sample_task()
+
+    builder = autotvm.LocalBuilder(n_parallel=2, use_pool=True)
+    measure_option = autotvm.measure_option(builder=builder, runner=DummyRunner())
+
+    for _ in range(2):
+        tuner = autotvm.tuner.RandomTuner(task)
+        tuner.tune(n_trial=4, measure_option=measure_option)
+        assert tuner.best_flops > 1
+        assert builder.executor is None
+
+def test_pipelined_measurement():
+    """test that pipelined measurement returns results in order"""
+    task, target = get_sample_task()
+
+    class IndexRunner(DummyRunner):
+        def run(self, measure_inputs, build_results):
+            time.sleep(np.random.random() * 0.01)
+            # the library must survive the build of the next batch
+            assert all(os.path.isfile(res.filename) for res in build_results)
+            return [MeasureResult((inp.config.index + 1.0,), 0, 0.2, time.time())
+                    for inp in measure_inputs]
+
+    measure_option = autotvm.measure_option(
+        builder=autotvm.LocalBuilder(n_parallel=2),
+        runner=IndexRunner(n_parallel=2),
+        pipeline=True
+    )
+
+    n_measured = [0]
+    def _callback(tuner, measure_inputs, measure_results):
+        for inp, res in zip(measure_inputs, measure_results):
+            assert res.costs[0] == inp.config.index + 1.0
+        n_measured[0] += len(measure_inputs)
+
+    tuner = autotvm.tuner.RandomTuner(task)
+    tuner.tune(n_trial=9, measure_option=measure_option, callbacks=[_callback])
+    assert n_measured[0] == 9
+
+    # the batch in flight when tuning stops early is still recorded
+    n_run = [0]
+    class ConstRunner(DummyRunner):
+        def run(self, measure_inputs, build_results):
+            n_run[0] += len(measure_inputs)
+            return [MeasureResult((1.0,), 0, 0.2, time.time()) for _ in measure_inputs]
+
+    def _count(tuner, measure_inputs, measure_results):
+        n_measured[0] += len(measure_inputs)
+
+    measure_option = autotvm.measure_option(
+        builder=autotvm.LocalBuilder(n_parallel=2),
+        runner=ConstRunner(n_parallel=2),
+        pipeline=True
+    )
+    n_measured[0] = 0
+    tuner = autotvm.tuner.RandomTuner(task)
+    tuner.tune(n_trial=20, measure_option=measure_option, early_stopping=2,
+               callbacks=[_count])
+    # the first batch stops the tuning, the second one is in flight
+    assert n_measured[0] == n_run[0] == 4
+
+def test_session_lease():
+    """test measurement that reuses the rpc session"""
+    task, target = get_sample_task()
+
+    measure_option = autotvm.measure_option(
+        builder=autotvm.LocalBuilder(),
+        runner=autotvm.LocalRunner(timeout=4, session_lease=60)
+    )
+
+    def _callback(tuner, measure_inputs, measure_results):
+        for inp, res in zip(measure_inputs, measure_results):
+            assert res.error_no == 0
+
+    tuner = autotvm.tuner.RandomTuner(task)
+    tuner.tune(n_trial=4, measure_option=measure_option, callbacks=[_callback])
+
+    # a lease no longer than the timeout would expire before its first measurement
+    try:
+        autotvm.LocalRunner(timeout=4, session_lease=4)
+        assert False
+    except ValueError:
+        pass
+
+def test_session_lease_key():
+    """test that calls with different timeouts share one leased session"""
+    from tvm.autotvm.measure import measure_methods
+
+    requested = []
+    def _request_remote(*args, **kwargs):
+        requested.append(args)
+        return object()
+
+    old_request_remote = measure_methods.request_remote
+    measure_methods.request_remote = _request_remote
+    try:
+        lease = measure_methods._lease_session(('dev', 'localhost', 9190, 1, 10), 600)
+        # a batch or an adaptive measurement only scales the timeout
+        assert measure_methods._lease_session(('dev', 'localhost', 9190, 1, 40), 600) is lease
+        assert len(requested) == 1
+        # a call that may outlive the lease gets a new session
+        assert measure_methods._lease_session(('dev', 'localhost', 9190, 1, 600), 600) \
+            is not lease
+        assert len(requested) == 2
+    finally:
+        measure_methods.request_remote = old_request_remote
+        measure_methods._SESSION_LEASES.clear()
+
+def test_upload_through_content_cache():
+    """test that uploaded libraries go through the content cache of the server"""
+    from tvm import rpc
+    from tvm.contrib import util
+    from tvm.rpc.tracker import Tracker
+    from tvm.autotvm.measure import measure_methods
+
+    temp = util.tempdir()
+    tracker = Tracker('localhost', port=9000, port_end=10000, silent=True)
+    server = rpc.Server('localhost', port=9000, port_end=10000, key='cache',
+                        tracker_addr=(tracker.host, tracker.port), silent=True,
+                        cache_dir=temp.relpath("cache"), cache_size=1 << 20)
+    time.sleep(0.5)
+
+    blob = bytearray(np.random.randint(0, 255, size=(1000,)).astype("uint8"))
+    path = temp.relpath("lib.tar")
+    with open(path, "wb") as out_file:
+        out_file.write(blob)
+    remote_args = ('cache', tracker.host, tracker.port, 1, 10)
+
+    measure_methods._upload_library(path, remote_args, 0)
+    assert os.listdir(temp.relpath("cache")) == [rpc.base.file_digest(path)]
+    # a new session gets the library from the cache
+    remote, _ = measure_methods._upload_library(path, remote_args, 0)
+    assert remote.download("lib.tar") == blob
+    server.terminate()
+    tracker.terminate()
+
+def test_task_scheduler():
+    """test that the scheduler spends trials on the task that matters most"""
+    tasks = [get_sample_task(n)[0] for n in (32, 64)]
+
+    class CostRunner(DummyRunner):
+        def run(self, measure_inputs, build_results):
+            # the second task is 100x slower, so improving it pays off more
+            return [MeasureResult(((100.0 if inp.task is tasks[1] else 1.0) /
+                                   (inp.config.index + 1),), 0, 0.2, time.time())
+                    for inp in measure_inputs]
+
+    measure_option = autotvm.measure_option(
+        builder=autotvm.LocalBuilder(n_parallel=2),
+        runner=CostRunner(n_parallel=2)
+    )
+
+    scheduler = autotvm.tuner.TaskScheduler(tasks, tuner='random', task_weights=[1, 1])
+    scheduler.tune(n_trial=40, measure_option=measure_option)
+
+    assert sum(scheduler.task_cts) == 40
+    assert scheduler.task_cts[1] > scheduler.task_cts[0] > 0
+    assert np.isfinite(scheduler.estimated_latency())
+    for tuner in scheduler.tuners:
+        assert tuner.best_config is not None
+
 def test_check_correctness():
     task, target = get_sample_task()
 
@@ -84,10 +248,74 @@ def test_check_correctness():
     tuner.tune(n_trial=2, measure_option=measure_option,
                callbacks=[_callback_wrong])
 
+def test_batched_measurement():
+    """test measurement of several programs packed into one library"""
+    task, target = get_sample_task()
+
+    def _callback(tuner, measure_inputs, measure_results):
+        assert len(measure_results) == len(measure_inputs)
+        for inp, res in zip(measure_inputs, measure_results):
+            assert res.error_no == 0
+            assert res.costs[0] > 0
+
+    for check_correctness in [False, True]:
+        measure_option = autotvm.measure_option(
+            builder=autotvm.LocalBuilder(n_parallel=4, batch_size=4),
+            runner=autotvm.LocalRunner(timeout=4, check_correctness=check_correctness)
+        )
+        tuner = autotvm.tuner.RandomTuner(task)
+        tuner.tune(n_trial=8, measure_option=measure_option, callbacks=[_callback])
+
+def test_adaptive_measurement():
+    """test measurement that repeats until the confidence interval is tight enough"""
+    task, target = get_sample_task()
+
+    def _callback(tuner, measure_inputs, measure_results):
+        for inp, res in zip(measure_inputs, measure_results):
+            assert res.error_no == 0
+            # the largest and smallest costs are dropped, as in a fixed measurement
+            assert 1 <= len(res.costs) <= 10
+            assert res.variance is not None
+            # the variance survives a round trip through the log
+            _, res2 = autotvm.record.decode(autotvm.record.encode(inp, res))
+            assert res2.variance == res.variance
+
+    measure_option = autotvm.measure_option(
+        builder=autotvm.LocalBuilder(n_parallel=4),
+        runner=autotvm.LocalRunner(timeout=4, repeat=3, adaptive=True,
+                                   ci_target=0.01, max_repeat=12)
+    )
+    tuner = autotvm.tuner.RandomTuner(task)
+    tuner.tune(n_trial=4, measure_option=measure_option, callbacks=[_callback])
+
+    # robust statistics for ranking
+    res = MeasureResult((1.0, 1.0, 1.0, 10.0), 0, 0, 0)
+    assert autotvm.measure.result_cost(res, 'mean') == 3.25
+    assert autotvm.measure.result_cost(res, 'median') == 1.0
+    assert autotvm.measure.result_cost(res, 'upper') > 3.25
+    mean, half = autotvm.measure.confidence_interval((2.0,))
+    assert mean == 2.0 and half == float('inf')
+
+    # adaptive costs are trimmed like fixed ones
+    from tvm.autotvm.measure import measure_methods
+    class _Timer(object):
+        results = (1.0, 2.0, 3.0, 100.0)
+    costs, variance = measure_methods._measure_adaptive(lambda: _Timer(), (), 0.5, 4, None)
+    assert costs == measure_methods._trim_costs(_Timer.results) == (2.0, 3.0)
+    assert variance == 0.5
+
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
 
     test_task_tuner_without_measurement()
+    test_builder_pool_closed()
+    test_pipelined_measurement()
+    test_session_lease()
+    test_session_lease_key()
+    test_upload_through_content_cache()
+    test_task_scheduler()
     test_check_correctness()
+    test_batched_measurement()
+    test_adaptive_measurement()
 
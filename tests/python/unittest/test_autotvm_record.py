@@ -15,6 +15,7 @@
 # specific language governing permissions and limitations
 # under the License.
 """test the correctness of dump and load of data log"""
+import json
 import time
 
 import tvm
@@ -43,6 +44,14 @@ def test_load_dump():
         assert result.error_no == result_2.error_no
         assert result.timestamp == result_2.timestamp
 
+    # the variance of an adaptive measurement keeps the layout of "r" readable by older versions
+    result = result._replace(variance=0.01)
+    row = encode(inp, result)
+    assert len(json.loads(row)["r"]) == 4
+    for protocol in ['json', 'pickle']:
+        _, result_2 = decode(encode(inp, result, protocol=protocol), protocol=protocol)
+        assert result_2.variance == 0.01
+
 
 def test_file_io():
     temp = util.tempdir()
@@ -75,7 +84,28 @@ def test_apply_history_best():
     assert str(x) == str(tsk.config_space.get(2))
 
 
+def test_apply_history_best_lazy():
+    temp = util.tempdir()
+    file_path = temp.relpath("temp.log")
+    tsk, target = get_sample_task()
+
+    costs = [0.3, 0.1, 0.01, 0.4]
+    inputs = [MeasureInput(target, tsk, tsk.config_space.get(i)) for i in range(len(costs))]
+    results = [MeasureResult((c,), 0, 2.3, 0) for c in costs]
+    inputs.append(MeasureInput(target, tsk, tsk.config_space.get(5)))
+    results.append(MeasureResult((0.001,), MeasureErrorNo.RUNTIME_DEVICE, 2.3, 0))
+    autotvm.callback.log_to_file(file_path)(None, inputs, results)
+
+    hist_best = ApplyHistoryBest(file_path, lazy=True, cache_size=1)
+    assert not hist_best.best_by_targetkey
+    for _ in range(2):
+        x = hist_best.query(target, tsk.workload)
+        assert str(x) == str(tsk.config_space.get(2))
+    assert len(hist_best._lazy_cache) == 1
+
+
 if __name__ == "__main__":
     test_load_dump()
     test_apply_history_best()
+    test_apply_history_best_lazy()
     test_file_io()
@@ -0,0 +1,62 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""Test simulated annealing model optimizer"""
+import numpy as np
+
+from tvm.autotvm.tuner.model_based_tuner import point2knob, knob2point_batch, point2knob_batch
+from tvm.autotvm.tuner.sa_model_optimizer import SimulatedAnnealingOptimizer, random_walk_batch
+
+from test_autotvm_common import get_sample_task
+
+
+def test_knob_batch():
+    dims = [3, 1, 5, 4]
+    points = np.random.randint(0, 60, size=100)
+    knobs = point2knob_batch(points, dims)
+    for p, knob in zip(points, knobs):
+        assert list(knob) == point2knob(int(p), dims)
+    assert np.array_equal(knob2point_batch(knobs, dims), points)
+
+
+def test_random_walk_batch():
+    dims = [3, 1, 5, 4]
+    points = np.random.randint(0, 60, size=100)
+    new_points = random_walk_batch(points, dims)
+    diff = point2knob_batch(points, dims) != point2knob_batch(new_points, dims)
+    assert np.all(np.sum(diff, axis=1) == 1)
+
+
+def test_find_maximums():
+    task, _ = get_sample_task()
+    n_space = len(task.config_space)
+
+    class DummyModel(object):
+        def predict(self, xs):
+            return n_space - np.abs(np.asarray(xs) - n_space // 2).astype('float32')
+
+    opt = SimulatedAnnealingOptimizer(task, n_iter=200, parallel_size=16, log_interval=0)
+    exclusive = {n_space // 2}
+    maximums = opt.find_maximums(DummyModel(), 4, exclusive)
+    assert len(maximums) == 4
+    assert len(set(maximums)) == 4
+    assert not exclusive & set(maximums)
+
+
+if __name__ == "__main__":
+    test_knob_batch()
+    test_random_walk_batch()
+    test_find_maximums()
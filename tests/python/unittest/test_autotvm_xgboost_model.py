@@ -20,6 +20,7 @@ import numpy as np
 
 import tvm
 from tvm import autotvm
+from tvm.contrib import util
 from tvm.autotvm import MeasureInput, MeasureResult
 from tvm.autotvm.tuner.xgboost_cost_model import XGBoostCostModel
 
@@ -42,6 +43,26 @@ def test_fit():
     upper_model.fit(xs, ys, plan_size=32)
 
 
+def test_fit_incremental():
+    task, target = get_sample_task()
+
+    model = XGBoostCostModel(task, feature_type='knob', loss_type='rank',
+                             incremental=True, refit_interval=2)
+    xs = np.arange(256)
+    ys = np.random.random(256) + np.arange(256)
+    y_norms = []
+    for n in range(64, 257, 64):
+        model.fit(xs[:n], ys[:n], plan_size=32)
+        y_norms.append(model._y_norm)
+    assert [mode for _, mode, _ in model.fit_history] == \
+        ['full', 'incremental', 'incremental', 'full']
+    # the label normalizer only changes on a full fit
+    assert y_norms[:3] == [np.max(ys[:64])] * 3
+    assert y_norms[3] == np.max(ys)
+    assert len(model.predict(xs)) == len(xs)
+    model._close_pool()
+
+
 def test_tuner():
     task, target = get_sample_task()
     records = get_sample_records(n=100)
@@ -50,7 +71,92 @@ def test_tuner():
     tuner.load_history(records)
 
 
+def test_persistent_feature_cache():
+    task, target = get_sample_task()
+    cache_dir = util.tempdir().relpath("feature_cache")
+
+    model = XGBoostCostModel(task, feature_type='itervar', loss_type='rank',
+                             feature_cache_dir=cache_dir)
+    feas = model._get_feature(np.arange(10))
+    model._close_pool()
+    assert model.feature_cache.size('itervar') == 10
+
+    # a new session of the same workload reuses the extracted features
+    model = XGBoostCostModel(task, feature_type='itervar', loss_type='rank',
+                             feature_cache_dir=cache_dir)
+    assert model.feature_cache.size('itervar') == 10
+    np.testing.assert_allclose(model._get_feature(np.arange(10)), feas)
+    model._close_pool()
+
+
+def test_feature_table_two_sessions():
+    from tvm.autotvm.tuner.model_based_tuner import _FeatureTable
+    path = util.tempdir().relpath("table")
+
+    writer = _FeatureTable(path, 10)
+    for i in range(10):
+        writer[i] = np.full(4, i, dtype=np.float32)
+    # a second session of the same workload maps the table read-only
+    reader = _FeatureTable(path, 10)
+    assert writer.writable and not reader.writable
+    np.testing.assert_allclose(reader[3], np.full(4, 3))
+
+    # rows reused by the writer for other configs are misses of the reader
+    for i in range(10, 20):
+        writer[i] = np.full(4, i, dtype=np.float32)
+    assert not any(i in reader for i in range(10))
+    try:
+        reader[3]
+        assert False
+    except KeyError:
+        pass
+
+    # the reader keeps its new features in memory
+    reader[20] = np.full(4, 20, dtype=np.float32)
+    assert 20 in reader and 20 not in writer
+    writer.close()
+    reader.close()
+
+
+def _uneven_feature(index):
+    return np.ones(3 if index % 2 else 4, dtype=np.float32)
+
+
+def test_shared_feature_extraction():
+    from tvm.autotvm.tuner import xgboost_cost_model
+    task, target = get_sample_task()
+
+    model = XGBoostCostModel(task, feature_type='knob', loss_type='rank')
+    # the first call learns the feature length, later ones use the shared buffer
+    model._get_feature(np.arange(10))
+    feas = model._get_feature(np.arange(10, 30))
+    expected = [xgboost_cost_model._extract_knob_feature_index(i) for i in range(10, 30)]
+    np.testing.assert_allclose(feas, expected)
+    # cached rows are copies, not views of the shared buffer
+    assert all(model.feature_cache.get('knob')[i].base is None for i in range(10, 30))
+
+    # the buffer is kept across calls and holds cached and new rows alike
+    filename = model._shared_buffer[0]
+    feas = model._get_feature(np.arange(20, 40))
+    expected = [xgboost_cost_model._extract_knob_feature_index(i) for i in range(20, 40)]
+    np.testing.assert_allclose(feas, expected)
+    assert model._shared_buffer[0] == filename
+
+    # features of a different length are an error, not a failed extraction
+    model.feature_extract_func = _uneven_feature
+    try:
+        model._get_feature(np.arange(40, 50))
+        assert False
+    except RuntimeError:
+        pass
+    model._close_pool()
+
+
 if __name__ == "__main__":
     test_fit()
+    test_fit_incremental()
     test_tuner()
+    test_persistent_feature_cache()
+    test_feature_table_two_sessions()
+    test_shared_feature_extraction()
 
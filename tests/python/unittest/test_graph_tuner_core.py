@@ -31,6 +31,8 @@ from tvm import relay
 from tvm.autotvm.task import ConfigEntity
 from tvm.autotvm.measure import MeasureResult, MeasureInput
 from tvm.autotvm.graph_tuner import DPTuner, PBQPTuner
+from tvm.autotvm.graph_tuner.base_graph_tuner import _fit_layout_transform_model
+from tvm.autotvm.graph_tuner.dynamic_programming_stage import DPStage
 from test_graph_tuner_utils import create_workload
 
 
@@ -150,6 +152,57 @@ def test_graph_tuner_layout_transform():
                                                                        out_time)
 
 
+def test_graph_tuner_layout_transform_db():
+    log_file = "%s/test_tuner.log" % (os.getcwd())
+    db_file = "%s/test_layout_db.log" % (os.getcwd())
+    target = "llvm"
+    dshape = (1, 3, 8, 8)
+    dtype = "float32"
+    layout = "NCHW"
+    target_ops = [relay.nn.conv2d]
+
+    g, records, ltf_records, ltf_keys, _ = _create_data(target, dshape, dtype, layout)
+    with open(db_file, "w") as out_file:
+        for inp, res in ltf_records:
+            inp = MeasureInput(inp.target, inp.task, inp.task.config_space.get(0))
+            out_file.write(autotvm.record.encode(inp, res) + "\n")
+
+    executor = DPTuner(g, {"data": dshape}, records, target_ops, target=target, log_file=log_file)
+    executor.benchmark_layout_transform(layout_records=ltf_records, infer_layout=True)
+    db_executor = DPTuner(g, {"data": dshape}, records, target_ops, target=target,
+                          log_file=log_file)
+    db_executor.benchmark_layout_transform(layout_db=db_file, infer_layout=True)
+    os.remove(db_file)
+
+    # a missing database leaves nothing to infer from
+    empty_executor = DPTuner(g, {"data": dshape}, records, target_ops, target=target,
+                             log_file=log_file)
+    try:
+        empty_executor.benchmark_layout_transform(layout_db=db_file, infer_layout=True)
+        assert False, "Inferring without records should fail"
+    except RuntimeError:
+        pass
+
+    expected = executor.layout_transform_perf_records
+    out = db_executor.layout_transform_perf_records
+    assert set(expected.keys()) == set(out.keys())
+    for ltf_workload in expected:
+        assert expected[ltf_workload][1].costs == out[ltf_workload][1].costs, \
+            "Layout transformation time mismatch for %s" % str(ltf_workload)
+
+    # Fit the bytes-time model on records with a known linear relation.
+    fit_records = []
+    for ltf_workload in ltf_keys:
+        task = copy.deepcopy(ltf_records[0][0].task)
+        task.workload = ltf_workload
+        nbytes = 2 * 4 * np.prod(ltf_workload[1][1])
+        ms_output = MeasureResult(costs=(1e-6 + 1e-9 * nbytes,), error_no=0,
+                                  all_cost=-1, timestamp=-1)
+        fit_records.append((MeasureInput(target=target, task=task, config=None), ms_output))
+    intercept, slope = _fit_layout_transform_model(fit_records)
+    np.testing.assert_allclose([intercept, slope], [1e-6, 1e-9], rtol=1e-5)
+
+
 def test_DPTuner_run():
     log_file = "%s/test_tuner.log" % (os.getcwd())
     target = "llvm"
@@ -201,6 +254,24 @@ def test_DPTuner_run():
                                 % (str(expected_out), str(out))
     assert os.path.isfile(log_file), "No log file with name %s exists." % log_file
 
+    # Evaluating the output states in chunks must not change the result.
+    executor = DPTuner(mod, {"data": dshape}, records, target_ops, target, log_file=log_file)
+    executor.benchmark_layout_transform(layout_records=ltf_records, infer_layout=True)
+    executor.run(chunk_size=1)
+    out = [record[0].config for record in executor.get_optimal_records()]
+    assert expected_out == out, "Output mismatch: expecting %s but got %s" \
+                                % (str(expected_out), str(out))
+
+
+def test_DPStage_argmin_states():
+    states_list = [np.broadcast_to(np.random.uniform(size=(5, 1, 7)), (5, 6, 7)),
+                   np.broadcast_to(np.random.uniform(size=(1, 6, 7)), (5, 6, 7))]
+    expected = np.argmin(states_list[0] + states_list[1])
+    for chunk_size in [None, 1, 7, 13, 1000]:
+        out = DPStage.argmin_states(states_list, chunk_size)
+        assert out == expected, "Output mismatch: expecting %d but got %d with chunk size %s" \
+                                % (expected, out, chunk_size)
+
 
 def test_PBQPTuner_run():
     target = "llvm"
@@ -584,7 +655,9 @@ def test_triangle_block():
 
 if __name__=="__main__":
     test_graph_tuner_layout_transform()
+    test_graph_tuner_layout_transform_db()
     test_DPTuner_run()
+    test_DPStage_argmin_states()
     test_PBQPTuner_run()
     test_many_sub_graphs()
     test_tuple()
@@ -110,6 +110,14 @@ def test_graph_simple():
             out = mod.get_output(0, tvm.nd.empty((1, 10)))
             np.testing.assert_equal(out.asnumpy(), x_in + a)
 
+        # output bindings made before sharing are kept
+        bound = graph_runtime.create(graph, lib, tvm.cpu(0))
+        b = graph_runtime.empty_aligned((1, 10), "float32")
+        bound.bind_outputs([b])
+        bound.share_params(mod_shared, relay.save_param_dict(params))
+        bound.run(y=a)
+        np.testing.assert_equal(b, x_in + a)
+
         # Explicitly delete the shared module and verify correctness.
         del mod_shared
         for mod in mods:
@@ -118,9 +126,66 @@ def test_graph_simple():
             np.testing.assert_equal(out.asnumpy(), x_in + a)
             del mod
 
+    def check_zero_copy():
+        if not tvm.module.enabled("llvm"):
+            print("Skip because llvm is not enabled")
+            return
+        mlib = tvm.build(s, [A, B], "llvm", name="myadd")
+        mod = graph_runtime.create(graph, mlib, tvm.cpu(0))
+        a = graph_runtime.empty_aligned((n,), A.dtype)
+        b = graph_runtime.empty_aligned((n,), B.dtype)
+        mod.bind_inputs({"x": a})
+        mod.bind_outputs([b])
+        for _ in range(2):
+            a[:] = np.random.uniform(size=(n,))
+            mod.run()
+            np.testing.assert_equal(b, a + 1)
+
+        # an NDArray can be bound as well
+        c = tvm.nd.empty((n,))
+        mod.bind_outputs({0: c})
+        mod.run()
+        np.testing.assert_equal(c.asnumpy(), a + 1)
+        # get_output of a bound output returns its buffer
+        np.testing.assert_equal(mod.get_output(0).asnumpy(), a + 1)
+
+        unaligned = graph_runtime.empty_aligned((n + 1,), A.dtype)[1:]
+        try:
+            mod.bind_inputs([unaligned])
+            assert False
+        except ValueError:
+            pass
+
+    def check_pool():
+        from tvm import relay
+        x = relay.var('x', shape=(1, 10))
+        y = relay.var('y', shape=(1, 10))
+        func = relay.Function([x, y], relay.add(x, y))
+
+        x_in = np.ones((1, 10)).astype("float32")
+        graph, lib, params = relay.build(func, target="llvm", params={'x': x_in})
+
+        if not tvm.module.enabled("llvm"):
+            print("Skip because llvm is not enabled")
+            return
+        for p in [params, relay.save_param_dict(params)]:
+            with graph_runtime.GraphModulePool(graph, lib, tvm.cpu(0), p,
+                                               num_instances=3) as pool:
+                inputs = [np.random.uniform(size=(1, 10)).astype("float32")
+                          for _ in range(20)]
+                futures = [pool.submit({'y': a}) for a in inputs]
+                for a, future in zip(inputs, futures):
+                    np.testing.assert_equal(future.result()[0], x_in + a)
+                np.testing.assert_equal(pool.run({'y': inputs[0]})[0], x_in + inputs[0])
+                stats = pool.stats()
+                assert len(stats["instances"]) == 3
+                assert sum(x["requests"] for x in stats["instances"]) == 21
+
     check_verify()
     check_remote()
     check_sharing()
+    check_zero_copy()
+    check_pool()
 
 if __name__ == "__main__":
     test_graph_simple()
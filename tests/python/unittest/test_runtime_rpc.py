@@ -16,14 +16,16 @@
 # under the License.
 import tvm
 import os
+import sys
 import logging
 import time
 import multiprocessing
+import threading
 
 import numpy as np
 from tvm import rpc
 from tvm.contrib import util
-from tvm.rpc.tracker import Tracker
+from tvm.rpc.tracker import Tracker, TrackerConnection, TrackerServerHandler, _ServerStats
 
 
 def test_bigendian_rpc():
@@ -109,6 +111,81 @@ def test_rpc_file_exchange():
     rev = remote.download("dat.bin")
     assert(rev == blob)
 
+def test_rpc_file_stream():
+    if not tvm.module.enabled("rpc"):
+        return
+    temp = util.tempdir()
+    os.environ["TVM_RPC_STAGE_DIR"] = temp.relpath("stage")
+    server = rpc.Server("localhost")
+    remote = rpc.connect(server.host, server.port)
+
+    blob = bytearray(np.random.randint(0, 255, size=(100000,)).astype("uint8"))
+    path = temp.relpath("dat.bin")
+    with open(path, "wb") as out_file:
+        out_file.write(blob)
+
+    assert remote.upload_stream(path, chunk_size=4096, compress=True) == len(blob)
+    assert remote.download_stream("dat.bin", chunk_size=4096) == blob
+    assert remote.download_stream("dat.bin", temp.relpath("rev.bin"), compress=True) == \
+        temp.relpath("rev.bin")
+    assert bytearray(open(temp.relpath("rev.bin"), "rb").read()) == blob
+    # unchanged content is not sent again, even under another name
+    assert remote.upload_stream(path) == 0
+    assert remote.upload_stream(path, "copy.bin") == 0
+    assert remote.download("copy.bin") == blob
+
+    # resume from a partial upload left by a dropped connection
+    blob2 = blob[::-1]
+    path2 = temp.relpath("dat2.bin")
+    with open(path2, "wb") as out_file:
+        out_file.write(blob2)
+    part = os.path.join(temp.relpath("stage"), rpc.base.file_digest(path2) + ".part")
+    with open(part, "wb") as out_file:
+        out_file.write(blob2[:30000])
+    assert remote.upload_stream(path2, chunk_size=4096) == len(blob2) - 30000
+    assert remote.download("dat2.bin") == blob2
+
+    # a concurrent upload of the same content does not touch the part file
+    # owned by another session
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is not None:
+        blob3 = blob[1:]
+        path3 = temp.relpath("dat3.bin")
+        with open(path3, "wb") as out_file:
+            out_file.write(blob3)
+        digest = rpc.base.file_digest(path3)
+        part = os.path.join(temp.relpath("stage"), digest + ".part")
+        with open(part, "wb") as out_file:
+            out_file.write(blob3[:30000])
+        with open(os.path.join(temp.relpath("stage"), digest + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            assert remote.upload_stream(path3, chunk_size=4096) == len(blob3)
+        assert remote.download("dat3.bin") == blob3
+        assert open(part, "rb").read() == blob3[:30000]
+    del os.environ["TVM_RPC_STAGE_DIR"]
+
+def test_rpc_file_cache():
+    if not tvm.module.enabled("rpc"):
+        return
+    temp = util.tempdir()
+    server = rpc.Server("localhost", cache_dir=temp.relpath("cache"), cache_size=1 << 20)
+    blob = bytearray(np.random.randint(0, 255, size=(10000,)).astype("uint8"))
+    path = temp.relpath("dat.bin")
+    with open(path, "wb") as out_file:
+        out_file.write(blob)
+
+    remote = rpc.connect(server.host, server.port)
+    assert remote.upload_stream(path) == len(blob)
+    del remote
+    time.sleep(0.5)
+    # a new session with a fresh work dir gets the content from the cache
+    remote = rpc.connect(server.host, server.port)
+    assert remote.upload_stream(path) == 0
+    assert remote.download("dat.bin") == blob
+
 def test_rpc_remote_module():
     if not tvm.module.enabled("rpc"):
         return
@@ -329,6 +406,242 @@ def test_rpc_tracker_request():
     server.terminate()
     tracker.terminate()
 
+def test_rpc_tracker_slots():
+    # test a server serving several sessions at once
+    tracker = Tracker('localhost', port=9000, port_end=10000)
+    device_key = 'test_device'
+    server = rpc.Server('localhost', port=9000, port_end=10000,
+                        key=device_key,
+                        tracker_addr=(tracker.host, tracker.port),
+                        num_slots=2)
+    time.sleep(1)
+    client = rpc.connect_tracker(tracker.host, tracker.port)
+
+    summary = client.summary()
+    assert summary['queue_info'][device_key]['free'] == 2
+
+    remote1 = client.request(device_key)
+    remote2 = client.request(device_key)
+    summary = client.summary()
+    assert summary['queue_info'][device_key]['free'] == 0
+
+    # every slot has its own work dir
+    remote1.upload(bytearray(b"slot1"), "data.bin")
+    remote2.upload(bytearray(b"slot2"), "data.bin")
+    assert remote1.download("data.bin") == bytearray(b"slot1")
+    assert remote2.download("data.bin") == bytearray(b"slot2")
+
+    del remote1, remote2
+    time.sleep(1)
+
+    summary = client.summary()
+    assert summary['queue_info'][device_key]['free'] == 2
+
+    server.terminate()
+    tracker.terminate()
+
+
+def test_rpc_tracker_fairshare():
+    # a user at its lease quota waits while other users are served
+    tracker = Tracker('localhost', port=9000, port_end=10000,
+                      scheduler="fairshare", scheduler_kwargs={"max_leases": 1})
+    device_key = 'test_device'
+    server = rpc.Server('localhost', port=9000, port_end=10000,
+                        key=device_key,
+                        tracker_addr=(tracker.host, tracker.port),
+                        num_slots=2)
+    time.sleep(1)
+    alice = rpc.connect_tracker(tracker.host, tracker.port, user="alice")
+    bob = rpc.connect_tracker(tracker.host, tracker.port, user="bob")
+
+    remote1 = alice.request(device_key)
+    remotes = []
+    def request_second():
+        remotes.append(rpc.connect_tracker(tracker.host, tracker.port,
+                                           user="alice").request(device_key))
+    thread = threading.Thread(target=request_second)
+    thread.start()
+    time.sleep(1)
+
+    summary = bob.summary()['queue_info'][device_key]
+    assert summary['free'] == 1
+    assert summary['users']['alice']['active'] == 1
+    assert summary['users']['alice']['pending'] == 1
+    assert not remotes
+
+    remote2 = bob.request(device_key)
+    summary = bob.summary()['queue_info'][device_key]
+    assert summary['users']['bob']['active'] == 1
+    assert summary['users']['bob']['granted'] == 1
+
+    # ending the first session of alice serves the waiting request
+    del remote1
+    thread.join(10)
+    assert len(remotes) == 1
+    summary = bob.summary()['queue_info'][device_key]
+    assert summary['users']['alice']['granted'] == 2
+    assert summary['users']['alice']['pending'] == 0
+
+    del remote2, remotes
+    server.terminate()
+    tracker.terminate()
+
+
+def test_rpc_tracker_release():
+    # a server only releases the lease it names
+    class FakeTracker(object):
+        def __init__(self):
+            self._connections = set()
+            self.released = []
+
+        def release(self, key, matchkey):
+            self.released.append(matchkey)
+
+        def put(self, key, value):
+            pass
+
+    class FakeConnection(TrackerConnection):
+        def write_message(self, message, binary=False):
+            pass
+
+    tracker = FakeTracker()
+    conn = FakeConnection(tracker, ("localhost", 9190))
+    conn.leased_matchkeys = ["a", "b"]
+    PUT = rpc.base.TrackerCode.PUT
+    conn.call_handler([PUT, "dev", [9091, "c"], None])
+    conn.call_handler([PUT, "dev", [9091, "d"], None, "x"])
+    assert tracker.released == []
+    assert conn.leased_matchkeys == ["a", "b"]
+    conn.call_handler([PUT, "dev", [9091, "e"], None, "b"])
+    assert tracker.released == ["b"]
+    # without a name, only the single remaining lease can be meant
+    conn.call_handler([PUT, "dev", [9091, "f"], None])
+    assert tracker.released == ["b", "a"]
+    assert not conn.leased_matchkeys
+
+
+def test_rpc_tracker_server_stats():
+    # the tracker records the sessions of every server
+    tracker = Tracker('localhost', port=9000, port_end=10000)
+    device_key = 'test_device'
+    server1 = rpc.Server('localhost', port=9000, port_end=10000,
+                         key=device_key,
+                         tracker_addr=(tracker.host, tracker.port))
+    server2 = rpc.Server('localhost', port=9000, port_end=10000,
+                         key=device_key,
+                         tracker_addr=(tracker.host, tracker.port))
+    time.sleep(1)
+    client = rpc.connect_tracker(tracker.host, tracker.port)
+
+    remote = client.request(device_key, prefer="least_loaded")
+    del remote
+    time.sleep(1)
+    # the server without history comes first
+    remote = client.request(device_key, prefer="fastest")
+    del remote
+    time.sleep(1)
+
+    summary = client.summary()
+    assert summary['queue_info'][device_key]['free'] == 2
+    stats = [info['stats'] for info in summary['server_info']]
+    assert sorted(item['sessions'] for item in stats) == [1, 1]
+    for item in stats:
+        assert item['success_rate'] == 1.0
+        assert item['latency'] is not None
+        assert not item['quarantined']
+    assert "quarantined" not in client.text_summary()
+
+    server1.terminate()
+    server2.terminate()
+    tracker.terminate()
+
+
+def test_rpc_tracker_quarantine():
+    stats = _ServerStats()
+    assert not stats.add_session(1.0, True)
+    assert not stats.add_session(1.0, False)
+    assert not stats.add_session(1.0, False)
+    # sessions the server killed on timeout are not failures of the device
+    assert not stats.add_session(10.0, False, timeout=True)
+    assert stats.add_session(1.0, False)
+    assert stats.summary()['failures'] == 3
+    assert stats.summary()['timeouts'] == 1
+    stats.quarantine()
+    assert stats.quarantined()
+
+    stats = _ServerStats()
+    assert stats.update_health({"load": 0.5, "temperature": 95.0})
+    assert not stats.quarantined()
+
+    class _Conn(object):
+        def __init__(self):
+            self._info = {"key": "server:test_device"}
+            self.stats = _ServerStats()
+
+    handler = TrackerServerHandler.__new__(TrackerServerHandler)
+    handler._scheduler_map = {}
+    handler._ioloop = type("_Loop", (), {"call_later": lambda *args: None})()
+    conn1, conn2 = _Conn(), _Conn()
+    handler._connections = set([conn1, conn2])
+    # quarantine is opt-in
+    handler._quarantine = False
+    handler.quarantine(conn1)
+    assert not conn1.stats.quarantined()
+    handler._quarantine = True
+    handler.quarantine(conn1)
+    assert conn1.stats.quarantined()
+    # the last server of a key stays in service
+    handler.quarantine(conn2)
+    assert not conn2.stats.quarantined()
+
+
+def test_rpc_asyncio():
+    if sys.version_info < (3, 5):
+        return
+    import asyncio
+    from tvm.rpc import aio
+
+    async def run():
+        loop = asyncio.get_event_loop()
+        tracker = await aio.start_tracker('localhost', port=9000, port_end=10000)
+        device_key = 'test_device'
+        server1 = rpc.Server('localhost', port=9000, port_end=10000,
+                             key=device_key,
+                             tracker_addr=(tracker.host, tracker.port))
+        server2 = rpc.Server('localhost', port=9000, port_end=10000,
+                             key=device_key,
+                             tracker_addr=(tracker.host, tracker.port))
+        await asyncio.sleep(1)
+        client = aio.connect_tracker(tracker.host, tracker.port)
+        summary = await client.summary()
+        assert summary['queue_info'][device_key]['free'] == 2
+
+        # the requests wait concurrently on the same event loop
+        waiters = [asyncio.ensure_future(client.request_address(device_key))
+                   for _ in range(3)]
+        await asyncio.sleep(1)
+        assert sum(waiter.done() for waiter in waiters) == 2
+        summary = await client.summary()
+        assert summary['queue_info'][device_key]['pending'] == 1
+        waiters[-1].cancel()
+
+        # connect through the asyncio proxy
+        proxy = await aio.start_proxy('localhost', port=8000, port_end=9000)
+        server3 = rpc.Server(proxy.host, port=proxy.port, key="x1", is_proxy=True)
+        remote = await loop.run_in_executor(None, rpc.connect, proxy.host, proxy.port, "x1")
+        remote.upload(bytearray(b"proxy"), "data.bin")
+        assert remote.download("data.bin") == bytearray(b"proxy")
+
+        del remote
+        server1.terminate()
+        server2.terminate()
+        server3.terminate()
+        proxy.close()
+        client.close()
+        tracker.stop()
+
+    asyncio.get_event_loop().run_until_complete(run())
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -337,8 +650,16 @@ if __name__ == "__main__":
     test_bigendian_rpc()
     test_rpc_remote_module()
     test_rpc_file_exchange()
+    test_rpc_file_stream()
+    test_rpc_file_cache()
     test_rpc_array()
     test_rpc_simple()
     test_local_func()
     test_rpc_tracker_register()
     test_rpc_tracker_request()
+    test_rpc_tracker_slots()
+    test_rpc_tracker_fairshare()
+    test_rpc_tracker_release()
+    test_rpc_tracker_server_stats()
+    test_rpc_tracker_quarantine()
+    test_rpc_asyncio()